@@ -258,3 +258,6 @@ def añadir_cartas():
 
 if __name__ == "__main__":
     añadir_cartas()
+    # Miniaturas y WebP de las cartas (solo rehace las nuevas o cambiadas)
+    from generar_variantes import generar_variantes
+    generar_variantes()
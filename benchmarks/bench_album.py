@@ -0,0 +1,73 @@
+"""
+Benchmark del álbum en cuadrícula (core/composicion.py, views/navegador.py).
+
+Con un álbum de N cartas distintas al azar (algunas repetidas) mide lo que
+tarda en dibujarse una página en frío con 3x3 y 4x4, y lo que espera el
+usuario al pasar de página recorriendo el álbum: sin precarga (cada página
+se dibuja al pulsar) y con precarga (la siguiente se dibuja mientras mira la
+actual, `pausa` ms por página). Además, cuántas ediciones de mensaje hacen
+falta para verlo entero frente a carta a carta.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_album [cartas_distintas] [pausa_ms]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from core import composicion
+from core.cartas import catalogo
+from core.metricas import percentil
+
+
+async def recorrer(paginas: list[list], columnas: int, pausa: float, precarga: bool, version: str) -> list[float]:
+    """Espera (ms) en cada cambio de página recorriendo el álbum de principio a fin."""
+    esperas = []
+    siguiente = None
+    for n, cartas in enumerate(paginas):
+        inicio = time.perf_counter()
+        await composicion.imagen_pagina((version, columnas, n), cartas, columnas)
+        esperas.append((time.perf_counter() - inicio) * 1000)
+        if precarga and n + 1 < len(paginas):
+            siguiente = asyncio.ensure_future(
+                composicion.imagen_pagina((version, columnas, n + 1), paginas[n + 1], columnas)
+            )
+        await asyncio.sleep(pausa)
+    if siguiente is not None:
+        await siguiente
+    return esperas
+
+
+def main():
+    distintas = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    pausa = (int(sys.argv[2]) if len(sys.argv) > 2 else 1500) / 1000
+    rng = random.Random(25)
+    cartas = [(c, rng.choice([1, 1, 1, 2, 3])) for c in rng.sample(catalogo().cartas, distintas)]
+    total = sum(n for _, n in cartas)
+    print(f"Álbum de {distintas} cartas distintas ({total} en total), {pausa * 1000:.0f} ms mirando cada página\n")
+    print(f"{'cuadrícula':<12}{'páginas':>8}{'frío p50':>10}{'frío p95':>10}"
+          f"{'sin precarga p95':>18}{'con precarga p95':>18}")
+
+    for columnas in (3, 4):
+        por_pagina = columnas * columnas
+        paginas = [cartas[i:i + por_pagina] for i in range(0, len(cartas), por_pagina)]
+        frio = []
+        for pagina in paginas:
+            inicio = time.perf_counter()
+            composicion.componer_pagina(pagina, columnas)
+            frio.append((time.perf_counter() - inicio) * 1000)
+
+        composicion._paginas.vaciar()
+        sin = asyncio.run(recorrer(paginas, columnas, pausa, False, "sin"))
+        con = asyncio.run(recorrer(paginas, columnas, pausa, True, "con"))
+        # La primera página siempre se dibuja al abrir: se cuentan los cambios de página
+        print(f"{f'{columnas}x{columnas}':<12}{len(paginas):>8}{percentil(frio, 50):>10.1f}{percentil(frio, 95):>10.1f}"
+              f"{percentil(sin[1:], 95):>18.1f}{percentil(con[1:], 95):>18.1f}")
+
+    print(f"\nEdiciones de mensaje para verlo entero: {total} carta a carta, "
+          f"{-(-distintas // 9)} con 3x3, {-(-distintas // 16)} con 4x4")
+
+
+if __name__ == "__main__":
+    main()
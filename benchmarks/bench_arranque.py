@@ -0,0 +1,105 @@
+"""
+Benchmark de arranque: tiempo hasta estar listo para conectar y coste de los imports.
+
+Lanza un proceso nuevo con `python -X importtime` que hace lo mismo que
+main.py antes de bot.start(): importar los módulos y los cogs, cargar el
+catálogo y su índice y recuperar el diario de inventario. Mide el tiempo
+hasta ese punto (la conexión al gateway va después) y lista los imports más
+caros. Comprueba además que Firebase no se ha importado ni inicializado:
+desde que el cliente es diferido eso ocurre tras on_ready.
+
+No necesita credenciales ni red, pero sí las dependencias de requirements.txt.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_arranque [repeticiones] [imports_a_mostrar]
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Mismos módulos que main.py, sin conectar (main.py arranca el bot al importarlo)
+PROGRAMA = """
+import time
+inicio = time.perf_counter()
+import asyncio, importlib, json, sys, tempfile
+import discord
+from discord.ext import commands
+import config, keep_alive
+from core.cartas import catalogo
+from core.busqueda import indice_busqueda
+from core.cache_settings import cache_settings
+from core.inventario_diferido import InventarioDiferido
+for cog in ("commands.generales", "commands.cartas", "commands.wiki",
+            "commands.moderation", "commands.battle", "commands.debug"):
+    importlib.import_module(cog)
+catalogo()
+indice_busqueda()
+
+async def diario():
+    with tempfile.TemporaryDirectory() as carpeta:
+        d = InventarioDiferido(carpeta)
+        await d.iniciar()
+        await d.detener()
+asyncio.run(diario())
+
+print(json.dumps({
+    "listo": time.perf_counter() - inicio,
+    "firebase_importado": "firebase_admin" in sys.modules,
+    "firebase_inicializado": getattr(sys.modules.get("core.firebase_client"), "_db", None) is not None,
+}))
+"""
+
+
+def _importtime(stderr: str) -> list[tuple[int, int, int, str]]:
+    """Líneas de -X importtime como (propio_us, acumulado_us, nivel, módulo)."""
+    filas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, modulo = linea[len("import time:"):].split("|", 2)
+        # Un espacio tras la barra y dos más por cada nivel de anidamiento
+        nivel = (len(modulo) - len(modulo.lstrip()) - 1) // 2
+        filas.append((int(propio), int(acumulado), nivel, modulo.strip()))
+    return filas
+
+
+def ejecutar() -> tuple[float, dict, list]:
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROGRAMA],
+        capture_output=True, text=True
+    )
+    total = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        print(proceso.stderr.strip().splitlines()[-1])
+        sys.exit(1)
+    return total, json.loads(proceso.stdout.strip().splitlines()[-1]), _importtime(proceso.stderr)
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    mostrar = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+    procesos, listos = [], []
+    for _ in range(repeticiones):
+        total, resultado, filas = ejecutar()
+        procesos.append(total)
+        listos.append(resultado["listo"])
+
+    print(f"{repeticiones} arranques (mediana)")
+    print(f"  listo para conectar: {statistics.median(listos) * 1000:8.1f} ms")
+    print(f"  proceso completo:    {statistics.median(procesos) * 1000:8.1f} ms")
+    print(f"  firebase_admin importado: {'sí' if resultado['firebase_importado'] else 'no'}, "
+          f"cliente creado: {'sí' if resultado['firebase_inicializado'] else 'no'}")
+
+    # Imports de primer nivel (sin sangría) del último arranque, por tiempo acumulado
+    raiz = sorted((f for f in filas if f[2] == 0), key=lambda f: -f[1])
+    print("\nImports más caros (acumulado, último arranque):")
+    for propio, acumulado, _, modulo in raiz[:mostrar]:
+        print(f"  {acumulado / 1000:8.1f} ms  {modulo}  (propio {propio / 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
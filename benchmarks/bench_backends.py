@@ -0,0 +1,91 @@
+"""
+Benchmark sin red de los backends locales (memoria y SQLite).
+
+Simula la carga de un servidor activo: reclamos de spawns, aperturas de packs,
+intercambios, cambios de mazo y lecturas de inventario, repartidos entre
+varios usuarios y lanzados desde el pool de hilos como en el bot. También
+comprueba que el total de copias se conserva al final.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_backends [operaciones] [usuarios]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import inventario
+from core.backends.memoria import BackendMemoria
+from core.backends.sqlite import BackendSQLite
+from core.transferencias import Movimiento, TransferenciaRechazada
+
+SERVIDOR = "bench"
+CARTAS = [str(i) for i in range(1, 61)]
+
+
+def operacion(backend, usuarios: list[str], rng: random.Random) -> int:
+    """Ejecuta una operación al azar. Devuelve las copias creadas."""
+    uid = rng.choice(usuarios)
+    tipo = rng.random()
+    if tipo < 0.35:
+        backend.agregar_cartas_inventario(SERVIDOR, uid, [rng.choice(CARTAS)])
+        return 1
+    if tipo < 0.50:
+        pack = rng.sample(CARTAS, 5)
+        datos = backend.cargar_pack_usuario(SERVIDOR, uid)
+        backend.agregar_cartas_inventario(SERVIDOR, uid, pack)
+        backend.guardar_pack_usuario(SERVIDOR, uid, {"packs_opened": datos.get("packs_opened", 0) + 1})
+        return len(pack)
+    if tipo < 0.65:
+        otro = rng.choice([u for u in usuarios if u != uid])
+        inv_a = backend.cargar_inventario_usuario(SERVIDOR, uid)
+        inv_b = backend.cargar_inventario_usuario(SERVIDOR, otro)
+        if inv_a and inv_b:
+            try:
+                backend.transferir_cartas(SERVIDOR, [
+                    Movimiento(uid, otro, rng.choice(list(inv_a))),
+                    Movimiento(otro, uid, rng.choice(list(inv_b))),
+                ])
+            except TransferenciaRechazada:
+                pass
+        return 0
+    if tipo < 0.75:
+        inv = backend.cargar_inventario_usuario(SERVIDOR, uid)
+        cartas = [int(cid) for cid in inventario.expandir(inv)][:8]
+        backend.guardar_mazo(SERVIDOR, uid, rng.choice("ABC"), cartas)
+        return 0
+    backend.cargar_inventario_usuario(SERVIDOR, uid)
+    backend.cargar_reservas(SERVIDOR, uid)
+    return 0
+
+
+def medir(backend, operaciones: int, usuarios: list[str]) -> None:
+    rng = random.Random(1)
+    semillas = [rng.randrange(1 << 30) for _ in range(operaciones)]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        creadas = sum(pool.map(lambda s: operacion(backend, usuarios, random.Random(s)), semillas))
+    segundos = time.perf_counter() - inicio
+
+    total = sum(inventario.total(backend.cargar_inventario_usuario(SERVIDOR, u)) for u in usuarios)
+    estado = "OK" if total == creadas else f"ERROR: {total} copias, se esperaban {creadas}"
+    print(f"{backend.nombre:<9}{operaciones / segundos:>10.0f} op/s{segundos * 1000:>10.1f} ms   copias {estado}")
+
+
+def main():
+    operaciones = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    usuarios = [str(1000 + i) for i in range(int(sys.argv[2]) if len(sys.argv) > 2 else 20)]
+    print(f"{operaciones} operaciones, {len(usuarios)} usuarios, 8 hilos\n")
+
+    medir(BackendMemoria(), operaciones, usuarios)
+    with tempfile.TemporaryDirectory() as carpeta:
+        sqlite = BackendSQLite(os.path.join(carpeta, "bench.sqlite3"))
+        medir(sqlite, operaciones, usuarios)
+        sqlite.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: escrituras al backend por segundo con y sin escritura diferida.
+
+Simula un servidor concurrido: cada segundo llegan `altas` reclamos y
+aperturas de packs de varios usuarios. Sin escritura diferida cada alta es
+una escritura; con core/inventario_diferido se escriben los incrementos
+acumulados cada INTERVALO_VACIADO segundos. Usa el backend SQLite y el
+diario en una carpeta temporal, así que no necesita red.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_escritura_diferida [altas_por_segundo] [segundos]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core import firebase_storage as fs
+from core.backends.sqlite import BackendSQLite
+from core.inventario_diferido import InventarioDiferido
+
+SERVIDOR = "bench"
+
+
+class BackendContado(BackendSQLite):
+    """Backend SQLite que cuenta las escrituras de inventario."""
+
+    def __init__(self, ruta: str):
+        super().__init__(ruta)
+        self.escrituras = 0
+
+    def agregar_cartas_inventario(self, server_id, user_id, nuevas_cartas):
+        self.escrituras += 1
+        super().agregar_cartas_inventario(server_id, user_id, nuevas_cartas)
+
+    def aplicar_incrementos(self, incrementos, marca=None):
+        self.escrituras += 1
+        super().aplicar_incrementos(incrementos, marca)
+
+
+async def simular(carpeta: str, con_diferido: bool, altas_por_segundo: int, segundos: float) -> tuple[int, int]:
+    backend = BackendContado(os.path.join(carpeta, "bench.sqlite3"))
+    fs.usar_backend(backend)
+    rng = random.Random(1)
+    usuarios = [str(1000 + i) for i in range(30)]
+
+    diferido = None
+    if con_diferido:
+        diferido = InventarioDiferido(os.path.join(carpeta, "diario"))
+        await diferido.iniciar()
+
+    agregar = diferido.agregar if diferido is not None else (
+        lambda s, u, c: asyncio.to_thread(fs.agregar_cartas_inventario, s, u, c)
+    )
+
+    inicio = time.perf_counter()
+    total = int(altas_por_segundo * segundos)
+    for i in range(total):
+        # Un reclamo (1 carta) o un pack (5 cartas)
+        cartas = [str(rng.randint(1, 400)) for _ in range(1 if rng.random() < 0.7 else 5)]
+        await agregar(SERVIDOR, rng.choice(usuarios), cartas)
+        espera = inicio + (i + 1) / altas_por_segundo - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    if diferido is not None:
+        await diferido.detener()
+    backend.cerrar()
+    return total, backend.escrituras
+
+
+async def main():
+    altas_por_segundo = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 6
+    print(f"{altas_por_segundo} altas/s durante {segundos:.0f} s\n")
+
+    for nombre, con_diferido in (("directo", False), ("diferido", True)):
+        with tempfile.TemporaryDirectory() as carpeta:
+            altas, escrituras = await simular(carpeta, con_diferido, altas_por_segundo, segundos)
+        print(f"{nombre:<10}{escrituras:>6} escrituras   {escrituras / segundos:>6.1f}/s   ({altas} altas)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+"""
+Inyección de fallos: reintentos, plazos y cortocircuito (core/resiliencia).
+
+Envuelve el backend en memoria con uno que falla o se cuelga a voluntad y
+recorre los escenarios: errores sueltos que se superan reintentando, una
+llamada colgada que corta el plazo (y que, como el cliente de Firestore con
+timeout=, devuelve el hilo al agotarlo), una caída completa que abre el
+cortocircuito (fallos instantáneos y lecturas servidas de la última copia),
+la recuperación con la llamada de prueba y una escritura no idempotente que
+no se repite. Sale con código 1 si alguna comprobación falla.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_fallos
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from core import firebase_async as fa
+from core import firebase_storage as fs
+from core.backends.memoria import BackendMemoria
+from core.lectura_unica import lecturas
+from core.resiliencia import AlmacenNoDisponible, Cortocircuito, ErrorTransitorio, plazo_restante, resiliencia
+
+SERVIDOR = "bench"
+USUARIO = "1"
+
+
+class BackendConFallos:
+    """Delega en otro backend y antes de cada llamada puede colgarse o fallar."""
+
+    def __init__(self, real, semilla: int = 1):
+        self._real = real
+        self._rng = random.Random(semilla)
+        self.tasa_error = 0.0
+        self.retraso = 0.0
+        self.llamadas: Counter = Counter()
+        # Llamadas ocupando un hilo ahora mismo
+        self.en_curso = 0
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._real, nombre)
+        if not callable(atributo):
+            return atributo
+
+        def inyectado(*args, **kwargs):
+            self.llamadas[nombre] += 1
+            self.en_curso += 1
+            try:
+                return llamada(*args, **kwargs)
+            finally:
+                self.en_curso -= 1
+
+        def llamada(*args, **kwargs):
+            if self.retraso:
+                # Como Firestore con timeout=: la llamada corta al acabarse el plazo que recibe
+                restante = plazo_restante()
+                if restante is not None and restante < self.retraso:
+                    time.sleep(restante)
+                    raise TimeoutError(f"{nombre}: plazo agotado")
+                time.sleep(self.retraso)
+            if self._rng.random() < self.tasa_error:
+                raise ErrorTransitorio(f"fallo inyectado en {nombre}")
+            return atributo(*args, **kwargs)
+        return inyectado
+
+
+fallidas = 0
+
+
+def comprobar(condicion: bool, texto: str) -> None:
+    global fallidas
+    print(f"  [{'OK' if condicion else 'FALLO'}] {texto}")
+    fallidas += not condicion
+
+
+def leer_sin_cache():
+    # Sin memo ni caché de lecturas: cada llamada llega al backend
+    lecturas._cache.clear()
+    return fa.cargar_inventario_usuario(SERVIDOR, USUARIO)
+
+
+async def main():
+    backend = BackendConFallos(BackendMemoria())
+    fs.usar_backend(backend)
+    resiliencia.cortocircuito = Cortocircuito(fallos_para_abrir=5, segundos_abierto=1.0)
+    await fa.agregar_cartas_inventario(SERVIDOR, USUARIO, ["1", "1", "2"])
+    esperado = {"1": 2, "2": 1}
+
+    print("1. Errores transitorios sueltos (20 %)")
+    backend.tasa_error = 0.2
+    correctas = 0
+    for _ in range(200):
+        try:
+            correctas += await leer_sin_cache() == esperado
+        except AlmacenNoDisponible:
+            pass
+        # Entre lecturas correctas el cortocircuito no llega a abrirse
+        resiliencia.cortocircuito.exito()
+    comprobar(correctas >= 195, f"{correctas}/200 lecturas correctas, {resiliencia.contadores['reintentos']} reintentos")
+    backend.tasa_error = 0.0
+
+    print("2. Llamada colgada")
+    backend.retraso = 4.0
+    inicio = time.perf_counter()
+    try:
+        await fa.guardar_pack_usuario(SERVIDOR, USUARIO, {"count": 1})
+        cortada = False
+    except AlmacenNoDisponible:
+        cortada = True
+    espera = time.perf_counter() - inicio
+    comprobar(cortada and espera < 3.0, f"el comando deja de esperar a los {espera:.2f} s (interacción: 3 s)")
+    # El hilo corta con el plazo que ha recibido, poco después que el comando
+    await asyncio.sleep(0.3)
+    comprobar(backend.en_curso == 0, "el hilo del pool queda libre sin esperar a que Firestore conteste")
+    comprobar(resiliencia.cortocircuito.fallos_seguidos >= 1,
+              f"la llamada colgada cuenta como fallo ({resiliencia.cortocircuito.fallos_seguidos} seguidos)")
+    backend.retraso = 0.0
+    resiliencia.cortocircuito.exito()
+
+    print("3. Caída completa")
+    backend.tasa_error = 1.0
+    for _ in range(3):
+        try:
+            await leer_sin_cache()
+        except AlmacenNoDisponible:
+            pass
+    comprobar(resiliencia.cortocircuito.estado == Cortocircuito.ABIERTO,
+              f"cortocircuito {resiliencia.cortocircuito.estado} tras {resiliencia.cortocircuito.fallos_seguidos} fallos")
+    antes = sum(backend.llamadas.values())
+    inicio = time.perf_counter()
+    obsoleta = await leer_sin_cache()
+    try:
+        await fa.guardar_pack_usuario(SERVIDOR, USUARIO, {"count": 2})
+        rechazada = False
+    except AlmacenNoDisponible:
+        rechazada = True
+    espera = (time.perf_counter() - inicio) * 1000
+    comprobar(obsoleta == esperado, "la lectura devuelve el último inventario leído")
+    comprobar(rechazada, "la escritura falla sin intentarlo")
+    comprobar(sum(backend.llamadas.values()) == antes, f"ninguna llamada llega al backend ({espera:.1f} ms en total)")
+
+    print("4. Recuperación")
+    backend.tasa_error = 0.0
+    await asyncio.sleep(resiliencia.cortocircuito.segundos_abierto + 0.1)
+    await fa.guardar_pack_usuario(SERVIDOR, USUARIO, {"count": 3})
+    comprobar(resiliencia.cortocircuito.estado == Cortocircuito.CERRADO, "la llamada de prueba cierra el cortocircuito")
+    comprobar((await fa.cargar_pack_usuario(SERVIDOR, USUARIO)).get("count") == 3, "la escritura se ha guardado")
+
+    print("5. Escritura no idempotente")
+    backend.tasa_error = 1.0
+    antes = backend.llamadas["quitar_cartas_inventario"]
+    try:
+        await fa.quitar_cartas_inventario(SERVIDOR, USUARIO, ["1"])
+    except AlmacenNoDisponible:
+        pass
+    comprobar(backend.llamadas["quitar_cartas_inventario"] - antes == 1, "una baja fallida no se reintenta")
+    backend.tasa_error = 0.0
+
+    print(f"\n{resiliencia.estadisticas()}")
+    sys.exit(1 if fallidas else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Prueba de carga local del servidor de imágenes de cartas (keep_alive.py).
+
+Levanta dos servidores en procesos aparte (benchmarks/bench_servidor.py):
+"antes", la ruta original de Flask (send_from_directory con sus cabeceras
+por defecto), y "después", el servidor de keep_alive con ETag por contenido
+y Cache-Control inmutable. Varios clientes piden cartas al azar (las
+populares más a menudo) con una caché como la de un navegador o el proxy de
+Discord: no piden lo que siga fresco según Cache-Control y revalidan con
+If-None-Match lo que no.
+
+Cuenta peticiones que llegan al servidor, respuestas 200/304, bytes
+recibidos y peticiones por segundo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_imagenes [clientes] [cargas_por_cliente]
+"""
+import http.client
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote
+
+from benchmarks.bench_servidor import CARPETA, arrancar
+
+
+class Cliente:
+    """Cliente HTTP con keep-alive y caché privada que respeta Cache-Control y ETag."""
+
+    def __init__(self, puerto: int, cuenta: Counter):
+        self.conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+        self.cuenta = cuenta
+        self.cache: dict[str, tuple[float, str | None]] = {}  # nombre -> (fresco_hasta, etag)
+
+    def cargar(self, nombre: str) -> None:
+        guardado = self.cache.get(nombre)
+        if guardado is not None and guardado[0] > time.monotonic():
+            self.cuenta["desde_cache"] += 1
+            return
+        cabeceras = {"If-None-Match": guardado[1]} if guardado and guardado[1] else {}
+        self.conexion.request("GET", "/cartas/" + quote(nombre), headers=cabeceras)
+        respuesta = self.conexion.getresponse()
+        cuerpo = respuesta.read()
+        self.cuenta["peticiones"] += 1
+        self.cuenta[respuesta.status] += 1
+        self.cuenta["bytes"] += len(cuerpo)
+
+        control = respuesta.getheader("Cache-Control") or ""
+        edad = re.search(r"max-age=(\d+)", control)
+        fresco = 0 if "no-cache" in control or edad is None else int(edad.group(1))
+        etag = respuesta.getheader("ETag") or (guardado[1] if guardado else None)
+        self.cache[nombre] = (time.monotonic() + fresco, etag)
+
+
+def carga(puerto: int, nombres: list[str], clientes: int, cargas: int) -> tuple[Counter, float]:
+    cuenta = Counter()
+    lock = threading.Lock()
+
+    def trabajar(semilla: int):
+        rng = random.Random(semilla)
+        local = Counter()
+        cliente = Cliente(puerto, local)
+        # Zipf aproximado: unas pocas cartas concentran la mayoría de cargas
+        pesos = [1 / (i + 1) for i in range(len(nombres))]
+        for nombre in rng.choices(nombres, weights=pesos, k=cargas):
+            cliente.cargar(nombre)
+        cliente.conexion.close()
+        with lock:
+            cuenta.update(local)
+
+    hilos = [threading.Thread(target=trabajar, args=(i,)) for i in range(clientes)]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return cuenta, time.perf_counter() - inicio
+
+
+def main():
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    cargas = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    nombres = sorted(n for n in os.listdir(CARPETA) if n.lower().endswith(".png"))[:200]
+    print(f"{clientes} clientes x {cargas} cargas sobre {len(nombres)} cartas\n")
+
+    for etiqueta, tipo in (("antes", "flask-original"), ("después", "aiohttp")):
+        proceso, puerto = arrancar(tipo)
+        try:
+            cuenta, segundos = carga(puerto, nombres, clientes, cargas)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+        print(
+            f"{etiqueta:<8} {cuenta['peticiones']:>6} peticiones ({cuenta[200]} x 200, {cuenta[304]} x 304), "
+            f"{cuenta['desde_cache']:>6} desde caché, {cuenta['bytes'] / 2**20:8.1f} MiB, "
+            f"{cuenta['peticiones'] / segundos:8.0f} pet/s, {clientes * cargas / segundos:8.0f} cargas/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
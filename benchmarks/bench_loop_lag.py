@@ -0,0 +1,61 @@
+"""
+Benchmark: retraso del bucle de eventos con llamadas bloqueantes síncronas
+frente a las mismas llamadas delegadas al pool de core/hilos.py.
+
+Simula N comandos concurrentes que hacen cada uno una "lectura de Firestore"
+bloqueante de LATENCIA segundos, y mide el lag con core.metricas.MonitorLag.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_loop_lag [comandos] [latencia_ms]
+"""
+import asyncio
+import sys
+import time
+
+from core.hilos import en_hilo
+from core.metricas import MonitorLag
+
+
+def lectura_bloqueante(latencia: float) -> dict:
+    time.sleep(latencia)
+    return {}
+
+
+async def comando_sincrono(latencia: float):
+    # Lo que hacían los cogs: llamada síncrona dentro de la corrutina
+    lectura_bloqueante(latencia)
+
+
+async def comando_asincrono(latencia: float):
+    await en_hilo(lectura_bloqueante, latencia)
+
+
+async def medir(comando, n: int, latencia: float) -> tuple[float, dict]:
+    monitor = MonitorLag(intervalo=0.01)
+    monitor.iniciar()
+    await asyncio.sleep(0.05)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(comando(latencia) for _ in range(n)))
+    total = time.perf_counter() - inicio
+
+    await asyncio.sleep(0.05)
+    monitor.detener()
+    return total, monitor.resumen()
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    latencia = (int(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+
+    print(f"{n} comandos concurrentes, {latencia * 1000:.0f} ms por lectura\n")
+    for nombre, comando in (("síncrono", comando_sincrono), ("en_hilo", comando_asincrono)):
+        total, lag = await medir(comando, n, latencia)
+        print(
+            f"{nombre:>9}: total {total * 1000:7.0f} ms | lag p50 {lag['p50_ms']:7.1f} ms "
+            f"p95 {lag['p95_ms']:7.1f} ms max {lag['max_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark de la imagen compuesta de /pack (core/composicion.py).
+
+Dibuja packs de 5 cartas al azar del catálogo y mide la latencia en frío
+(caché vaciada antes de cada pack) usando las miniaturas precalculadas y
+usando solo los PNG originales, y en caliente (pack repetido, sale de la
+LRU). La última prueba lanza varios packs a la vez desde el bucle de eventos
+con imagen_paquete(), como harían varios /pack simultáneos.
+
+Para la prueba con variantes hay que ejecutar antes `python generar_variantes.py`.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_paquete [packs] [simultaneos]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from core import composicion, variantes
+from core.cartas import catalogo
+from core.metricas import percentil
+
+
+def _linea(etiqueta: str, tiempos: list[float], tamanos: list[int]) -> None:
+    print(f"{etiqueta:<22}{percentil(tiempos, 50):>9.1f}{percentil(tiempos, 95):>9.1f}"
+          f"{percentil(tiempos, 99):>9.1f}{sum(tamanos) / max(1, len(tamanos)) / 1024:>10.1f}")
+
+
+def en_frio(packs: list[list[int]], info) -> tuple[list[float], list[int]]:
+    tiempos, tamanos = [], []
+    for ids in packs:
+        composicion._paquetes.vaciar()
+        inicio = time.perf_counter()
+        datos = composicion.componer_paquete(ids, info)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        tamanos.append(len(datos or b""))
+    return tiempos, tamanos
+
+
+async def simultaneos(packs: list[list[int]], info, n: int) -> tuple[float, float]:
+    composicion._paquetes.vaciar()
+    inicio = time.perf_counter()
+    tiempos = []
+
+    async def uno(ids):
+        t = time.perf_counter()
+        await composicion.imagen_paquete(ids, info)
+        tiempos.append((time.perf_counter() - t) * 1000)
+
+    for i in range(0, len(packs), n):
+        await asyncio.gather(*(uno(ids) for ids in packs[i:i + n]))
+    return len(packs) / (time.perf_counter() - inicio), percentil(tiempos, 95)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cat = catalogo()
+    rng = random.Random(5)
+    packs = [[c["id"] for c in rng.sample(cat.cartas, 5)] for _ in range(total)]
+    con_miniatura = sum(
+        1 for c in cat.cartas
+        if (nombre := variantes.archivo(c)) and os.path.isfile(variantes.ruta(nombre, "thumb"))
+    )
+    print(f"{total} packs de 5 cartas; {con_miniatura}/{len(cat.cartas)} cartas con miniatura\n")
+    print(f"{'prueba':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KiB':>10}")
+
+    if con_miniatura:
+        _linea("frío, miniaturas", *en_frio(packs, cat.por_id))
+
+    # Sin variantes: se apunta a una carpeta vacía y se reducen los originales
+    carpeta = variantes.CARPETA_VARIANTES
+    with tempfile.TemporaryDirectory() as vacia:
+        variantes.CARPETA_VARIANTES = vacia
+        _linea("frío, originales", *en_frio(packs, cat.por_id))
+        variantes.CARPETA_VARIANTES = carpeta
+
+    composicion.componer_paquete(packs[0], cat.por_id)
+    tiempos = []
+    for _ in range(total):
+        inicio = time.perf_counter()
+        composicion.componer_paquete(list(reversed(packs[0])), cat.por_id)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    _linea("caliente (LRU)", tiempos, [])
+
+    por_segundo, p95 = asyncio.run(simultaneos(packs, cat.por_id, n))
+    print(f"\n{n} packs a la vez en el pool de las imágenes: {por_segundo:.0f} packs/s, p95 {p95:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
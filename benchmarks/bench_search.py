@@ -0,0 +1,47 @@
+"""
+Micro-benchmark de /search: comprensión de lista sobre todo el catálogo
+(implementación anterior) frente al índice de n-gramas de core/busqueda.py.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_search [repeticiones]
+"""
+import sys
+import time
+
+from core.busqueda import indice_busqueda
+from core.cartas import catalogo
+
+CONSULTAS = ["kiryu", "majima", "ur", "lively", "a", "nishikiyama kiwami", "zzz"]
+
+
+def busqueda_lineal(cartas, term: str) -> list:
+    coincidencias = [c for c in cartas if term.lower() in c["nombre"].lower()]
+    return sorted(coincidencias, key=lambda x: x["nombre"])
+
+
+def cronometrar(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cartas = catalogo().cartas
+
+    inicio = time.perf_counter()
+    indice = indice_busqueda()
+    print(f"Índice construido en {(time.perf_counter() - inicio) * 1000:.1f} ms "
+          f"({len(indice.postings)} n-gramas, {len(cartas)} cartas)\n")
+
+    print(f"{'consulta':<22}{'resultados':>11}{'lineal µs':>12}{'índice µs':>12}{'x':>7}")
+    for consulta in CONSULTAS:
+        lineal = cronometrar(lambda: busqueda_lineal(cartas, consulta), repeticiones)
+        indexada = cronometrar(lambda: indice.buscar(consulta), repeticiones)
+        n = len(indice.buscar(consulta))
+        print(f"{consulta:<22}{n:>11}{lineal:>12.1f}{indexada:>12.1f}{lineal / indexada:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark del servidor de imágenes: Flask (servidor de desarrollo en un hilo,
+como se ejecutaba antes) frente al servidor aiohttp de keep_alive.py.
+
+Cada servidor corre en su propio proceso. Un cliente aiohttp descarga
+imágenes de cartas al azar con 50 y 200 clientes simultáneos (conexiones
+keep-alive, sin caché) y mide peticiones por segundo, MiB/s, latencias
+p50/p95/p99 y errores. El servidor Flask necesita `pip install flask`, que ya
+no está en requirements.txt.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_servidor [peticiones_por_prueba] [concurrencias...]
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import quote
+
+import aiohttp
+
+from core.metricas import percentil
+
+CARPETA = os.path.join(os.getcwd(), "cartas")
+
+
+# ------------------------------
+# Servidores (se ejecutan en un proceso aparte con --servir)
+# ------------------------------
+def _app_flask(original: bool):
+    from flask import Flask, abort, send_file, send_from_directory
+    from core import estaticos
+
+    app = Flask("bench")
+
+    @app.route("/")
+    def home():
+        return "Servidor Flask funcionando."
+
+    @app.route("/cartas/<nombre>")
+    def servir_imagen(nombre):
+        if original:
+            return send_from_directory(CARPETA, nombre)
+        # Misma respuesta que keep_alive.py con Flask (ETag por contenido, inmutable)
+        ruta = estaticos.resolver(CARPETA, nombre)
+        if ruta is None:
+            abort(404)
+        meta = estaticos.metadatos(ruta)
+        respuesta = send_file(ruta, conditional=True, etag=meta.etag, last_modified=meta.modificado)
+        respuesta.headers["Cache-Control"] = estaticos.CACHE_CONTROL
+        return respuesta
+
+    return app
+
+
+def servir(tipo: str, puerto: int) -> None:
+    if tipo == "aiohttp":
+        from aiohttp import web
+        import keep_alive
+        web.run_app(keep_alive.crear_app(), host="127.0.0.1", port=puerto,
+                    keepalive_timeout=keep_alive.KEEPALIVE_SEGUNDOS, print=None, access_log=None)
+    else:
+        import logging
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        # Igual que iniciar_servidor() antes: app.run en modo threaded por defecto
+        _app_flask(original=tipo == "flask-original").run(host="127.0.0.1", port=puerto)
+
+
+def arrancar(tipo: str) -> tuple[subprocess.Popen, int]:
+    """Lanza el servidor `tipo` en un proceso y espera a que responda."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_servidor", "--servir", tipo, str(puerto)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    limite = time.monotonic() + 15
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.2):
+                return proceso, puerto
+        except OSError:
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError(f"El servidor {tipo} no arrancó")
+
+
+# ------------------------------
+# Cliente
+# ------------------------------
+async def prueba(puerto: int, nombres: list[str], concurrencia: int, peticiones: int) -> dict:
+    rng = random.Random(concurrencia)
+    cola = [rng.choice(nombres) for _ in range(peticiones)]
+    latencias: list[float] = []
+    cuenta = Counter()
+
+    conector = aiohttp.TCPConnector(limit=concurrencia)
+    tiempo = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=conector, timeout=tiempo) as sesion:
+        async def trabajar():
+            while cola:
+                nombre = cola.pop()
+                inicio = time.perf_counter()
+                try:
+                    async with sesion.get(f"http://127.0.0.1:{puerto}/cartas/{quote(nombre)}") as r:
+                        cuerpo = await r.read()
+                        cuenta[r.status] += 1
+                        cuenta["bytes"] += len(cuerpo)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    cuenta["errores"] += 1
+                    continue
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajar() for _ in range(concurrencia)))
+        segundos = time.perf_counter() - inicio
+
+    return {
+        "pet_s": len(latencias) / segundos,
+        "mib_s": cuenta["bytes"] / 2**20 / segundos,
+        "p50": percentil(latencias, 50),
+        "p95": percentil(latencias, 95),
+        "p99": percentil(latencias, 99),
+        "errores": cuenta["errores"] + sum(n for k, n in cuenta.items() if isinstance(k, int) and k != 200),
+    }
+
+
+def main():
+    peticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrencias = [int(c) for c in sys.argv[2:]] or [50, 200]
+    nombres = sorted(n for n in os.listdir(CARPETA) if n.lower().endswith(".png"))
+    print(f"{peticiones} descargas por prueba sobre {len(nombres)} cartas\n")
+    print(f"{'servidor':<10}{'clientes':>9}{'pet/s':>9}{'MiB/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>9}")
+
+    for tipo in ("flask", "aiohttp"):
+        proceso, puerto = arrancar(tipo)
+        try:
+            # Calentamiento: hashes de las imágenes y conexiones
+            asyncio.run(prueba(puerto, nombres, 10, min(len(nombres), 500)))
+            for concurrencia in concurrencias:
+                r = asyncio.run(prueba(puerto, nombres, concurrencia, peticiones))
+                print(f"{tipo:<10}{concurrencia:>9}{r['pet_s']:>9.0f}{r['mib_s']:>9.1f}"
+                      f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['errores']:>9}")
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--servir":
+        servir(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
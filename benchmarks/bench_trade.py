@@ -0,0 +1,100 @@
+"""
+Benchmark: viajes de red a Firestore por intercambio completado.
+
+Compara la secuencia que hacía ConfirmTradeView.confirm (dos puede_trade,
+dos quitar_cartas_inventario y dos agregar_cartas_inventario) con una sola
+llamada a firebase_storage.transferir_cartas. Cuenta las RPC contando las
+llamadas al cliente gRPC de Firestore (lecturas, commits, begin/rollback).
+
+Escribe datos, así que solo se ejecuta contra el emulador de Firestore:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.bench_trade [intercambios]
+"""
+import os
+import sys
+import time
+from collections import Counter
+
+if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+    sys.exit("Define FIRESTORE_EMULATOR_HOST: este benchmark escribe en Firestore.")
+
+from core import firebase_storage as fs
+from core.backends.firestore import INVENTARIO_COLLECTION, MAZOS_COLLECTION, BackendFirestore
+from core.transferencias import Movimiento
+
+# Siempre Firestore, aunque STORAGE_BACKEND diga otra cosa
+fs.usar_backend(BackendFirestore())
+db = fs.backend().db
+
+SERVIDOR = "bench_trade"
+U1, U2 = "1001", "1002"
+C1, C2 = "1", "2"
+
+RPC = ("batch_get_documents", "get_document", "run_query", "commit", "begin_transaction", "rollback")
+llamadas = Counter()
+
+
+def contar_rpc():
+    api = db._firestore_api
+    for nombre in RPC:
+        original = getattr(api, nombre)
+
+        def envoltura(*args, _nombre=nombre, _original=original, **kwargs):
+            llamadas[_nombre] += 1
+            return _original(*args, **kwargs)
+
+        setattr(api, nombre, envoltura)
+
+
+def preparar(copias: int):
+    db.collection(INVENTARIO_COLLECTION).document(SERVIDOR).set({U1: {C1: copias}, U2: {C2: copias}})
+    db.collection(MAZOS_COLLECTION).document(SERVIDOR).set({})
+
+
+def puede_trade(uid: str, cid: str) -> bool:
+    # Equivalente síncrono del puede_trade de las vistas
+    inv = fs.cargar_inventario_usuario(SERVIDOR, uid)
+    en_mazos = sum(
+        [str(c) for c in fs.cargar_mazo(SERVIDOR, uid, letra)].count(cid)
+        for letra in ("A", "B", "C")
+    )
+    return inv.get(cid, 0) > en_mazos
+
+
+def intercambio_antes(ida: bool):
+    (a, ca), (b, cb) = ((U1, C1), (U2, C2)) if ida else ((U1, C2), (U2, C1))
+    puede_trade(a, ca)
+    puede_trade(b, cb)
+    fs.quitar_cartas_inventario(SERVIDOR, a, [ca])
+    fs.quitar_cartas_inventario(SERVIDOR, b, [cb])
+    fs.agregar_cartas_inventario(SERVIDOR, a, [cb])
+    fs.agregar_cartas_inventario(SERVIDOR, b, [ca])
+
+
+def intercambio_despues(ida: bool):
+    (a, ca), (b, cb) = ((U1, C1), (U2, C2)) if ida else ((U1, C2), (U2, C1))
+    fs.transferir_cartas(SERVIDOR, [Movimiento(a, b, ca), Movimiento(b, a, cb)])
+
+
+def medir(nombre: str, funcion, intercambios: int):
+    preparar(intercambios)
+    llamadas.clear()
+    inicio = time.perf_counter()
+    for i in range(intercambios):
+        # Se alterna el sentido para que ambos conserven copias
+        funcion(i % 2 == 0)
+    ms = (time.perf_counter() - inicio) / intercambios * 1000
+    total = sum(llamadas.values())
+    detalle = ", ".join(f"{k}={v / intercambios:.1f}" for k, v in sorted(llamadas.items()))
+    print(f"{nombre:<10}{total / intercambios:>8.1f} RPC/intercambio{ms:>10.1f} ms   ({detalle})")
+
+
+def main():
+    intercambios = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    contar_rpc()
+    print(f"{intercambios} intercambios por variante\n")
+    medir("antes", intercambio_antes, intercambios)
+    medir("después", intercambio_despues, intercambios)
+
+
+if __name__ == "__main__":
+    main()
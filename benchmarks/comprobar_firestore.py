@@ -0,0 +1,107 @@
+"""
+Comprobación contra el emulador de Firestore de las lecturas con máscara de
+campos (field_paths) del backend de producción.
+
+Los IDs de Discord empiezan por dígito, así que cada ruta de campo tiene que
+ir entre comillas invertidas; ni el backend en memoria ni los benchmarks sin
+emulador pasan por ahí. Cada prueba prepara sus documentos con IDs reales,
+llama al backend y compara el resultado.
+
+Escribe datos, así que solo se ejecuta contra el emulador:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.comprobar_firestore
+"""
+import os
+import sys
+
+if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+    sys.exit("Define FIRESTORE_EMULATOR_HOST: esta comprobación escribe en Firestore.")
+
+from core.backends.firestore import (
+    INVENTARIO_COLLECTION, MAZOS_COLLECTION, PACKS_COLLECTION, PACKS_DOC, PACKS_USUARIOS, BackendFirestore,
+)
+from core.transferencias import Movimiento
+
+backend = BackendFirestore()
+db = backend.db
+
+SERVIDOR = "286617766516228096"
+U1, U2 = "182920174276575232", "1441990735883800607"
+
+PRUEBAS = []
+
+
+def prueba(funcion):
+    PRUEBAS.append(funcion)
+    return funcion
+
+
+def igual(obtenido, esperado, que: str) -> None:
+    if obtenido != esperado:
+        raise AssertionError(f"{que}: se esperaba {esperado!r} y llegó {obtenido!r}")
+
+
+@prueba
+def inventario_leer_y_quitar():
+    db.collection(INVENTARIO_COLLECTION).document(SERVIDOR).set({U1: {"5": 3, "7": 1}, U2: {"5": 1}})
+    igual(backend.cargar_inventario_usuario(SERVIDOR, U1), {"5": 3, "7": 1}, "inventario de U1")
+    igual(backend.quitar_cartas_inventario(SERVIDOR, U1, ["5", "7"]), True, "quitar")
+    igual(backend.cargar_inventario_usuario(SERVIDOR, U1), {"5": 2}, "inventario tras quitar")
+    igual(backend.quitar_cartas_inventario(SERVIDOR, U1, ["7"]), False, "quitar una que no tiene")
+    igual(backend.cargar_inventario_usuario(SERVIDOR, U2), {"5": 1}, "inventario de U2 intacto")
+
+
+@prueba
+def transferencia():
+    db.collection(INVENTARIO_COLLECTION).document(SERVIDOR).set({U1: {"5": 2}, U2: {"9": 1}})
+    db.collection(MAZOS_COLLECTION).document(SERVIDOR).set({})
+    backend.transferir_cartas(SERVIDOR, [Movimiento(U1, U2, "5"), Movimiento(U2, U1, "9")])
+    igual(backend.cargar_inventario_usuario(SERVIDOR, U1), {"5": 1, "9": 1}, "inventario de U1")
+    igual(backend.cargar_inventario_usuario(SERVIDOR, U2), {"5": 1}, "inventario de U2")
+
+
+@prueba
+def mazos_leer():
+    db.collection(MAZOS_COLLECTION).document(SERVIDOR).set({
+        U1: {"A": [5, 7], "B": [], "C": [9], "reservas": {"5": 1, "7": 1, "9": 1}},
+        U2: {"A": [1]},
+    })
+    igual(backend.cargar_mazos(SERVIDOR, U1), {"A": [5, 7], "B": [], "C": [9]}, "mazos de U1")
+    igual(backend.cargar_reservas(SERVIDOR, U1), {"5": 1, "7": 1, "9": 1}, "reservas de U1")
+    igual(backend.cargar_mazo(SERVIDOR, U2, "A"), [1], "mazo A de U2")
+
+
+@prueba
+def mazos_guardar():
+    db.collection(MAZOS_COLLECTION).document(SERVIDOR).set({U1: {"A": [5], "B": [7]}, U2: {"A": [1]}})
+    backend.guardar_mazo(SERVIDOR, U1, "A", [5, 9])
+    igual(backend.cargar_mazos(SERVIDOR, U1), {"A": [5, 9], "B": [7], "C": []}, "mazos de U1")
+    igual(backend.cargar_reservas(SERVIDOR, U1), {"5": 1, "9": 1, "7": 1}, "reservas de U1")
+    igual(backend.cargar_mazo(SERVIDOR, U2, "A"), [1], "mazo A de U2 intacto")
+
+
+@prueba
+def pack_desde_global():
+    db.collection(PACKS_COLLECTION).document(SERVIDOR).collection(PACKS_USUARIOS).document(U1).delete()
+    db.collection(PACKS_COLLECTION).document(PACKS_DOC).set({
+        SERVIDOR: {U1: {"restantes": 2}, U2: {"restantes": 1}},
+    })
+    igual(backend.cargar_pack_usuario(SERVIDOR, U1), {"restantes": 2}, "pack de U1 copiado de global")
+    doc = db.collection(PACKS_COLLECTION).document(SERVIDOR).collection(PACKS_USUARIOS).document(U1).get()
+    igual(doc.to_dict(), {"restantes": 2}, "documento propio de U1")
+
+
+def main():
+    fallos = 0
+    for funcion in PRUEBAS:
+        try:
+            funcion()
+            print(f"OK    {funcion.__name__}")
+        except Exception as e:
+            fallos += 1
+            print(f"FALLO {funcion.__name__}: {type(e).__name__} - {e}")
+    print(f"\n{len(PRUEBAS) - fallos}/{len(PRUEBAS)} comprobaciones correctas")
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == "__main__":
+    main()
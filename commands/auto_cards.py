@@ -3,16 +3,17 @@ CartasAuto: sistema de aparición automática de cartas en canales de Discord.
 
 Características principales:
 - Permite activar/desactivar el spawn automático de cartas por servidor.
-- Usa un sistema de autosave para reducir llamadas al Gist (se guarda cada 60s si hay cambios).
+- Usa un sistema de autosave: cada 60s sube a Firestore solo los campos modificados de cada servidor.
 - Captura errores de límite de GitHub y avisa en el canal configurado del servidor.
 """
 
 import discord, random, asyncio, datetime, os
 from discord.ext import commands
 from discord import app_commands
-from core.firebase_storage import cargar_settings, guardar_settings
+from core.cache_settings import cache_settings
 
-from core.cartas import cargar_cartas
+from core.cartas import catalogo
+from core import variantes
 from views.reclamar import ReclamarCarta
 from github.GithubException import RateLimitExceededException
 
@@ -22,23 +23,25 @@ class CartasAuto(commands.Cog):
         # Guardamos referencia al bot
         self.bot = bot
 
-        # Cargamos settings desde el Gist remoto
-        self.settings = cargar_settings()
-        if "guilds" not in self.settings:
-            self.settings["guilds"] = {}
+        # Los settings se cargan en cog_load, que sí puede hacer await
+        self.settings: dict = {"guilds": {}}
 
         # Diccionario de tareas activas por servidor (gid -> asyncio.Task)
         self.tasks: dict[str, asyncio.Task] = {}
 
-        # Bandera para indicar si hay cambios pendientes de guardar
-        self._pending_save: bool = False
+        # Campos modificados pendientes de guardar por servidor (gid -> {campo})
+        self._sucios: dict[str, set[str]] = {}
+
+        self.send_semaphore = asyncio.Semaphore(5)   # máximo 5 envíos concurrentes
+
+    async def cog_load(self):
+        # Copia propia de la configuración de los servidores, tomada de la caché
+        self.settings = {"guilds": await cache_settings.guilds()}
 
         # Arrancamos el bucle de autosave (cada 60s guarda si hay cambios)
         asyncio.create_task(self._autosave_loop())
 
         print("[INFO] CartasAuto inicializado.")
-        
-        self.send_semaphore = asyncio.Semaphore(5)   # máximo 5 envíos concurrentes
 
         # Recreamos tareas activas desde settings (por si el bot se reinicia)
         for gid, config in self.settings["guilds"].items():
@@ -65,38 +68,39 @@ class CartasAuto(commands.Cog):
             self.settings["guilds"][gid]["enabled"] = False
             self.settings["guilds"][gid]["count"] = 0
             self.settings["guilds"][gid].pop("next_spawn", None)
-
-        self.marcar_cambios()
+            self.marcar_cambios(gid, "enabled", "count", "next_spawn")
 
     # ================================================================
     # Sistema de autosave
     # ================================================================
-    def marcar_cambios(self):
-        """Marca que hay cambios pendientes para guardar en el Gist."""
-        self._pending_save = True
+    def marcar_cambios(self, gid, *campos: str):
+        """Marca los campos de un servidor que el autosave tiene que subir."""
+        self._sucios.setdefault(str(gid), set()).update(campos)
 
     async def _autosave_loop(self):
-        """Bucle de autosave: guarda en Firestore cada 60s si hay cambios."""
+        """
+        Bucle de autosave: cada 60s sube solo los servidores y campos
+        modificados, todos en un único lote. Un campo que ya no está en la
+        configuración (next_spawn, por ejemplo) se borra.
+        """
         while True:
             await asyncio.sleep(60)
-            if self._pending_save:
-                try:
-                    current = cargar_settings()
-                    guilds = current.setdefault("guilds", {})
-    
-                    # Actualizar solo las claves de auto_cards, sin tocar pack_limit
-                    for gid, config in self.settings.get("guilds", {}).items():
-                        guild_conf = guilds.setdefault(gid, {})
-                        for key in ["enabled", "channel_id", "interval", "max_daily", "count", "last_reset", "next_spawn"]:
-                            if key in config:
-                                guild_conf[key] = config[key]
-    
-                    guardar_settings(current)
-                    print("[OK] Autosave ejecutado en Firestore.")
-                    self._pending_save = False
-                except Exception as e:
-                    print("[ERROR] autosave:", e)
-                    self._pending_save = True
+            if not self._sucios:
+                continue
+
+            sucios, self._sucios = self._sucios, {}
+            cambios = {
+                gid: {campo: self.settings["guilds"].get(gid, {}).get(campo) for campo in campos}
+                for gid, campos in sucios.items()
+            }
+            try:
+                await cache_settings.guardar(cambios)
+                print(f"[OK] Autosave ejecutado en Firestore ({len(cambios)} servidores).")
+            except Exception as e:
+                print("[ERROR] autosave:", e)
+                # Se devuelven los campos para reintentarlo en el siguiente ciclo
+                for gid, campos in sucios.items():
+                    self._sucios.setdefault(gid, set()).update(campos)
 
 
 
@@ -137,7 +141,7 @@ class CartasAuto(commands.Cog):
                     self.tasks.pop(gid, None)
                 config["count"] = 0
                 config.pop("next_spawn", None)
-                self.marcar_cambios()
+                self.marcar_cambios(gid, "enabled", "count", "next_spawn")
                 await interaction.followup.send("❌ Automatic card spawning deactivated.")
                 
                 # Enviar log al servidor/canal de logs
@@ -189,7 +193,7 @@ class CartasAuto(commands.Cog):
             "last_reset": datetime.date.today().isoformat()
         })
     
-        self.marcar_cambios()
+        self.marcar_cambios(gid, "enabled", "channel_id", "interval", "max_daily", "count", "last_reset")
         self.tasks[gid] = asyncio.create_task(self.spawn_for_guild(interaction.guild_id))
         
         # Enviar log al servidor/canal de logs
@@ -234,7 +238,7 @@ class CartasAuto(commands.Cog):
                     self.tasks.pop(gid, None)
                 config["count"] = 0
                 config.pop("next_spawn", None)
-                self.marcar_cambios()
+                self.marcar_cambios(gid, "enabled", "count", "next_spawn")
                 await ctx.send("❌ Automatic card spawning deactivated.")
             else:
                 await ctx.send("⚠️ Automatic card spawning is already deactivated. Use `y!auto_cards #channel (max_hour_wait) (max_daily_number)` to activate it.")
@@ -267,7 +271,7 @@ class CartasAuto(commands.Cog):
             "last_reset": datetime.date.today().isoformat()
         })
 
-        self.marcar_cambios()
+        self.marcar_cambios(gid, "enabled", "channel_id", "interval", "max_daily", "count", "last_reset")
         self.tasks[gid] = asyncio.create_task(self.spawn_for_guild(ctx.guild.id))
 
         await ctx.send(f"✅ Automatic card spawning enabled in {canal.mention}, every 0–{max_horas}h, max {max_diarias} cards/day.")
@@ -294,7 +298,7 @@ class CartasAuto(commands.Cog):
             if config.get("last_reset") != hoy:
                 config["count"] = 0
                 config["last_reset"] = hoy
-                self.marcar_cambios()
+                self.marcar_cambios(gid, "count", "last_reset")
 
             # Si alcanzó el máximo diario, esperar y revisar más tarde
             if config["count"] >= config["max_daily"]:
@@ -305,7 +309,7 @@ class CartasAuto(commands.Cog):
             wait = random.randint(300, config["interval"][1] * 3600)
             next_spawn = (datetime.datetime.now() + datetime.timedelta(seconds=wait)).isoformat()
             config["next_spawn"] = next_spawn
-            self.marcar_cambios()
+            self.marcar_cambios(gid, "next_spawn")
 
             # Dormir hasta el próximo spawn
             await asyncio.sleep(wait)
@@ -324,11 +328,11 @@ class CartasAuto(commands.Cog):
             if not channel:
                 # Si el canal no existe/acceso denegado, desactivar para evitar bucles vacíos
                 config["enabled"] = False
-                self.marcar_cambios()
+                self.marcar_cambios(gid, "enabled")
                 continue
 
             # Cargar base de cartas y elegir una aleatoria
-            cartas = cargar_cartas()
+            cartas = catalogo().cartas
             if not cartas:
                 await asyncio.sleep(30)
                 continue
@@ -387,7 +391,7 @@ class CartasAuto(commands.Cog):
             )
 
             # Imagen: remota o adjunta si es local; si no existe, avisar en la descripción
-            ruta_img = carta.get("imagen")
+            ruta_img = variantes.url(carta, "full")
             archivo = None
             if ruta_img and isinstance(ruta_img, str) and ruta_img.startswith("http"):
                 embed.set_image(url=ruta_img)
@@ -415,7 +419,7 @@ class CartasAuto(commands.Cog):
             # Incrementar contador de cartas diarias
             config["count"] += 1
             # Marcar cambios para que autosave suba el nuevo estado
-            self.marcar_cambios()
+            self.marcar_cambios(gid, "count")
 
 
 # Setup para registrar el cog en el bot
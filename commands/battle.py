@@ -3,14 +3,17 @@ import discord
 import random
 from discord.ext import commands
 from discord import app_commands
-from core.firebase_storage import (
+from core.firebase_async import (
     cargar_inventario_usuario,
     cargar_mazo,
+    cargar_mazos,
+    cargar_reservas,
     guardar_mazo,
     cargar_propiedades,
 )
-from core.cartas import cargar_cartas, cartas_por_id
+from core.cartas import catalogo, resolver_carta, texto_sugerencias
 from views.navegador_mazo import NavegadorMazo
+from core import autocompletado, inventario, variantes
 
 from typing import Dict, Tuple, Optional
 from views.battle_views import AcceptDuelView, ChooseDeckView, ChooseCardView
@@ -70,7 +73,8 @@ class BattleSession:
         self.current_stat: Optional[str] = None
 
         # Info de cartas
-        self.cartas_info = cartas_por_id()
+        # Índice compartido del catálogo (no se copia por sesión)
+        self.cartas_info = catalogo().por_id
 
         # Elecciones pendientes
         self.waiting_p1_card: Optional[Tuple[int, str]] = None
@@ -112,6 +116,7 @@ class Battle(commands.Cog):
         deck="Deck name: A, B, C or 1, 2, 3",
         card_name="Exact name of the card",
     )
+    @app_commands.autocomplete(card_name=autocompletado.carta_disponible)
     async def deck_add_slash(
         self, interaction: discord.Interaction, deck: str, card_name: str
     ):
@@ -120,44 +125,34 @@ class Battle(commands.Cog):
 
         letra_mazo = normalizar_mazo(deck)
 
-        cards = cargar_cartas()
-        card = next(
-            (c for c in cards if c["nombre"].lower() == card_name.lower()), None
-        )
+        card, sugerencias = resolver_carta(card_name)
 
         if not card:
             await interaction.response.send_message(
-                f"No card found with the name '{card_name}'.",
+                f"No card found with the name '{card_name}'.{texto_sugerencias(sugerencias)}",
                 ephemeral=False,
             )
             return
 
         card_id = str(card["id"])
 
-        user_cards = cargar_inventario_usuario(server_id, user_id)
+        user_cards = await cargar_inventario_usuario(server_id, user_id)
+
+        owned_count = inventario.copias(user_cards, card_id)
 
-        if card_id not in map(str, user_cards):
+        if owned_count == 0:
             await interaction.response.send_message(
                 f"You do not own the card '{card['nombre']}'.",
                 ephemeral=False,
             )
             return
 
-        # Cargar los tres mazos
-        mazo_a = cargar_mazo(server_id, user_id, "A")
-        mazo_b = cargar_mazo(server_id, user_id, "B")
-        mazo_c = cargar_mazo(server_id, user_id, "C")
-
-        # Comprobar si la carta ya está en otro mazo
-        total_en_mazos = (
-            sum(1 for c in mazo_a if str(c) == card_id)
-            + sum(1 for c in mazo_b if str(c) == card_id)
-            + sum(1 for c in mazo_c if str(c) == card_id)
-        )
-
-        owned_count = sum(1 for c in user_cards if str(c) == card_id)
+        # Mazos y reservas salen de la misma lectura (memo del comando)
+        mazos = await cargar_mazos(server_id, user_id)
+        reservas = await cargar_reservas(server_id, user_id)
 
-        if total_en_mazos >= owned_count:
+        # Comprobar si quedan copias fuera de los mazos
+        if inventario.libres(user_cards, reservas, card_id) == 0:
             await interaction.response.send_message(
                 f"You only own {owned_count} copies of '{card['nombre']}', "
                 f"and all of them are already in other decks.",
@@ -165,8 +160,8 @@ class Battle(commands.Cog):
             )
             return
 
-        # Cargar el mazo elegido
-        user_deck = cargar_mazo(server_id, user_id, letra_mazo)
+        # El mazo elegido ya viene en la misma lectura
+        user_deck = mazos[letra_mazo]
 
         if len(user_deck) >= DECK_SIZE:
             await interaction.response.send_message(
@@ -176,7 +171,7 @@ class Battle(commands.Cog):
             return
 
         user_deck.append(card_id)
-        guardar_mazo(server_id, user_id, letra_mazo, user_deck)
+        await guardar_mazo(server_id, user_id, letra_mazo, user_deck)
 
         await interaction.response.send_message(
             f"The card '{card['nombre']}' has been added to deck {letra_mazo}.",
@@ -195,43 +190,33 @@ class Battle(commands.Cog):
 
         letra_mazo = normalizar_mazo(deck)
 
-        cards = cargar_cartas()
-        card = next(
-            (c for c in cards if c["nombre"].lower() == card_name.lower()), None
-        )
+        card, sugerencias = resolver_carta(card_name)
 
         if not card:
-            await ctx.send(f"No card found with the name '{card_name}'.")
+            await ctx.send(f"No card found with the name '{card_name}'.{texto_sugerencias(sugerencias)}")
             return
 
         card_id = str(card["id"])
 
-        user_cards = cargar_inventario_usuario(server_id, user_id)
+        user_cards = await cargar_inventario_usuario(server_id, user_id)
 
-        if card_id not in map(str, user_cards):
+        owned_count = inventario.copias(user_cards, card_id)
+
+        if owned_count == 0:
             await ctx.send(f"You do not own the card '{card['nombre']}'.")
             return
 
-        mazo_a = cargar_mazo(server_id, user_id, "A")
-        mazo_b = cargar_mazo(server_id, user_id, "B")
-        mazo_c = cargar_mazo(server_id, user_id, "C")
-
-        total_en_mazos = (
-            sum(1 for c in mazo_a if str(c) == card_id)
-            + sum(1 for c in mazo_b if str(c) == card_id)
-            + sum(1 for c in mazo_c if str(c) == card_id)
-        )
-
-        owned_count = sum(1 for c in user_cards if str(c) == card_id)
+        mazos = await cargar_mazos(server_id, user_id)
+        reservas = await cargar_reservas(server_id, user_id)
 
-        if total_en_mazos >= owned_count:
+        if inventario.libres(user_cards, reservas, card_id) == 0:
             await ctx.send(
                 f"You only own {owned_count} copies of '{card['nombre']}', "
                 f"and all of them are already in other decks."
             )
             return
 
-        user_deck = cargar_mazo(server_id, user_id, letra_mazo)
+        user_deck = mazos[letra_mazo]
 
         if len(user_deck) >= DECK_SIZE:
             await ctx.send(
@@ -240,7 +225,7 @@ class Battle(commands.Cog):
             return
 
         user_deck.append(card_id)
-        guardar_mazo(server_id, user_id, letra_mazo, user_deck)
+        await guardar_mazo(server_id, user_id, letra_mazo, user_deck)
 
         await ctx.send(
             f"The card '{card['nombre']}' has been added to deck {letra_mazo}."
@@ -264,7 +249,7 @@ class Battle(commands.Cog):
 
         letra_mazo = normalizar_mazo(deck)
 
-        user_deck = cargar_mazo(server_id, user_id, letra_mazo)
+        user_deck = await cargar_mazo(server_id, user_id, letra_mazo)
 
         if not user_deck:
             await interaction.followup.send(
@@ -272,7 +257,7 @@ class Battle(commands.Cog):
             )
             return
 
-        cartas_info = cartas_por_id()
+        cartas_info = catalogo().por_id
         vista = NavegadorMazo(interaction, user_deck, cartas_info, interaction.user)
 
         await vista.enviar()
@@ -287,7 +272,7 @@ class Battle(commands.Cog):
 
         letra_mazo = normalizar_mazo(deck)
 
-        user_deck = cargar_mazo(server_id, user_id, letra_mazo)
+        user_deck = await cargar_mazo(server_id, user_id, letra_mazo)
 
         if not user_deck:
             await ctx.send(
@@ -295,7 +280,7 @@ class Battle(commands.Cog):
             )
             return
 
-        cartas_info = cartas_por_id()
+        cartas_info = catalogo().por_id
         vista = NavegadorMazo(ctx, user_deck, cartas_info, ctx.author)
 
         await vista.enviar()
@@ -311,6 +296,7 @@ class Battle(commands.Cog):
         deck="Deck name: A, B, C or 1, 2, 3",
         card_name="Exact name of the card",
     )
+    @app_commands.autocomplete(card_name=autocompletado.carta_en_mazos)
     async def deck_remove_slash(
         self, interaction: discord.Interaction, deck: str, card_name: str
     ):
@@ -319,21 +305,18 @@ class Battle(commands.Cog):
 
         letra_mazo = normalizar_mazo(deck)
 
-        cards = cargar_cartas()
-        card = next(
-            (c for c in cards if c["nombre"].lower() == card_name.lower()), None
-        )
+        card, sugerencias = resolver_carta(card_name)
 
         if not card:
             await interaction.response.send_message(
-                f"No card found with the name '{card_name}'.",
+                f"No card found with the name '{card_name}'.{texto_sugerencias(sugerencias)}",
                 ephemeral=False,
             )
             return
 
         card_id = str(card["id"])
 
-        user_deck = cargar_mazo(server_id, user_id, letra_mazo)
+        user_deck = await cargar_mazo(server_id, user_id, letra_mazo)
 
         if card_id not in map(str, user_deck):
             await interaction.response.send_message(
@@ -343,7 +326,7 @@ class Battle(commands.Cog):
             return
 
         user_deck.remove(card_id)
-        guardar_mazo(server_id, user_id, letra_mazo, user_deck)
+        await guardar_mazo(server_id, user_id, letra_mazo, user_deck)
 
         await interaction.response.send_message(
             f"The card '{card['nombre']}' has been removed from deck {letra_mazo}.",
@@ -362,18 +345,15 @@ class Battle(commands.Cog):
 
         letra_mazo = normalizar_mazo(deck)
 
-        cards = cargar_cartas()
-        card = next(
-            (c for c in cards if c["nombre"].lower() == card_name.lower()), None
-        )
+        card, sugerencias = resolver_carta(card_name)
 
         if not card:
-            await ctx.send(f"No card found with the name '{card_name}'.")
+            await ctx.send(f"No card found with the name '{card_name}'.{texto_sugerencias(sugerencias)}")
             return
 
         card_id = str(card["id"])
 
-        user_deck = cargar_mazo(server_id, user_id, letra_mazo)
+        user_deck = await cargar_mazo(server_id, user_id, letra_mazo)
 
         if card_id not in map(str, user_deck):
             await ctx.send(
@@ -382,7 +362,7 @@ class Battle(commands.Cog):
             return
 
         user_deck.remove(card_id)
-        guardar_mazo(server_id, user_id, letra_mazo, user_deck)
+        await guardar_mazo(server_id, user_id, letra_mazo, user_deck)
 
         await ctx.send(
             f"The card '{card['nombre']}' has been removed from deck {letra_mazo}."
@@ -406,16 +386,12 @@ class Battle(commands.Cog):
         key = self._battle_key(session.guild_id, session.p1.id, session.p2.id)
         self.active_battles.pop(key, None)
 
-    def mazos_llenos(self, server_id: str, user_id: str) -> list[str]:
-        llenos = []
-        for letra in ("A", "B", "C"):
-            mazo = cargar_mazo(server_id, user_id, letra)
-            if len(mazo) == DECK_SIZE:
-                llenos.append(letra)
-        return llenos
+    async def mazos_llenos(self, server_id: str, user_id: str) -> list[str]:
+        mazos = await cargar_mazos(server_id, user_id)
+        return [letra for letra, mazo in mazos.items() if len(mazo) == DECK_SIZE]
 
-    def tiene_mazo_lleno(self, server_id: str, user_id: str) -> bool:
-        return len(self.mazos_llenos(server_id, user_id)) > 0
+    async def tiene_mazo_lleno(self, server_id: str, user_id: str) -> bool:
+        return len(await self.mazos_llenos(server_id, user_id)) > 0
 
     def obtener_stat(self, carta: dict, stat: str) -> int:
         try:
@@ -462,7 +438,7 @@ class Battle(commands.Cog):
             return
 
         # Comprobar que el retador tiene al menos un mazo lleno
-        if not self.tiene_mazo_lleno(server_id, str(interaction.user.id)):
+        if not await self.tiene_mazo_lleno(server_id, str(interaction.user.id)):
             await interaction.response.send_message(
                 "You need at least one full deck to battle.",
                 ephemeral=True,
@@ -470,7 +446,7 @@ class Battle(commands.Cog):
             return
 
         # Comprobar que el retado también tiene un mazo lleno
-        if not self.tiene_mazo_lleno(server_id, str(user.id)):
+        if not await self.tiene_mazo_lleno(server_id, str(user.id)):
             await interaction.response.send_message(
                 f"{user.display_name} has no full decks.",
                 ephemeral=True,
@@ -594,7 +570,7 @@ class Battle(commands.Cog):
     ):
         # Obtener qué mazos del jugador están llenos
         server_id = str(session.guild_id)
-        llenos = self.mazos_llenos(server_id, str(player.id))
+        llenos = await self.mazos_llenos(server_id, str(player.id))
 
         # Si ya no tiene mazos llenos, cancelar batalla
         if not llenos:
@@ -649,7 +625,7 @@ class Battle(commands.Cog):
 
         # Cargar el mazo
         server_id = str(session.guild_id)
-        deck = cargar_mazo(server_id, str(player.id), letra)
+        deck = await cargar_mazo(server_id, str(player.id), letra)
 
         if len(deck) != DECK_SIZE:
             await session.public_channel.send(
@@ -863,7 +839,7 @@ class Battle(commands.Cog):
             color=color1
         )
         if c1.get("imagen"):
-            embed1.set_image(url=c1["imagen"])
+            embed1.set_image(url=variantes.url(c1, "medium"))
         embed1.add_field(name="Stats", value=fmt(c1), inline=False)
 
         # Construir texto de stats combinados (1 o varios)
@@ -889,7 +865,7 @@ class Battle(commands.Cog):
             color=color2
         )
         if c2.get("imagen"):
-            embed2.set_image(url=c2["imagen"])
+            embed2.set_image(url=variantes.url(c2, "medium"))
         embed2.add_field(name="Stats", value=fmt(c2), inline=False)
 
 
@@ -4,15 +4,16 @@ from discord.ext import commands
 from discord import app_commands
 import os
 import random
-import datetime
-from core.firebase_client import db
 from collections import Counter
 
 # Core: carga/guardado en Gist y acceso a la base de cartas
-from core.firebase_storage import cargar_settings, guardar_settings
-from core.firebase_storage import cargar_packs, guardar_packs, cargar_mazo, agregar_cartas_inventario, quitar_cartas_inventario, cargar_inventario_usuario
+from core.cache_settings import cache_settings, guardar_settings_guild
+from core.firebase_async import cargar_pack_usuario, guardar_pack_usuario, agregar_cartas_inventario, cargar_inventario_usuario
 
-from core.cartas import cargar_cartas, cartas_por_id
+from core.cartas import catalogo, resolver_carta, texto_sugerencias
+from core.busqueda import buscar_cartas
+from core.packs import EstadoPacks, formato_restante, zona_servidor, zona_valida
+from core import autocompletado, composicion, inventario, transferencias, variantes
 
 # Views: componentes interactivos
 from views.navegador import Navegador
@@ -24,40 +25,6 @@ from views.gift_view import GiftView
 # ID del dueño (ocultamos /carta solo para él)
 OWNER_ID = 182920174276575232
 
-def carta_en_mazo(servidor_id: str, usuario_id: str, carta_id: str) -> bool:
-    """Devuelve True si la carta está en el mazo del usuario en el servidor."""
-    decks = cargar_mazo()
-    server_decks = decks.get(servidor_id, {})
-    user_deck = server_decks.get(usuario_id, [])
-    return str(carta_id) in [str(cid) for cid in user_deck]
-
-
-def puede_trade(sid: str, uid: str, cid: str):
-    """
-    Devuelve (True, None) si puede intercambiar.
-    Devuelve (False, razon) si no puede.
-    """
-    cid = str(cid)
-
-    inv = [str(c) for c in cargar_inventario_usuario(sid, uid)]
-    total_inv = inv.count(cid)
-
-    if total_inv == 0:
-        return False, "You do,'t own that card."
-
-    ma = [str(c) for c in cargar_mazo(sid, uid, "A")]
-    mb = [str(c) for c in cargar_mazo(sid, uid, "B")]
-    mc = [str(c) for c in cargar_mazo(sid, uid, "C")]
-
-    total_mazos = ma.count(cid) + mb.count(cid) + mc.count(cid)
-
-    if total_inv <= total_mazos:
-        return False, "All your copies of that card are currently in your decks."
-
-    return True, None
-
-
-    
 class Cartas(commands.Cog):
     """Cog principal para gestionar cartas y comandos del sistema RGGO."""
 
@@ -85,13 +52,14 @@ class Cartas(commands.Cog):
         servidor_id, usuario_id = str(interaction.guild.id), str(objetivo.id)
 
         # Cargar inventario del usuario
-        cartas_ids = cargar_inventario_usuario(servidor_id, usuario_id)
+        inv = await cargar_inventario_usuario(servidor_id, usuario_id)
+        cartas_ids = inventario.expandir(inv)
 
         if not cartas_ids:
             await interaction.followup.send(f"{objetivo.display_name} has no cards yet.")
             return
 
-        cartas_info = cartas_por_id()
+        cartas_info = catalogo().por_id
         vista = Navegador(interaction, cartas_ids, cartas_info, objetivo)
         await vista.enviar()
 
@@ -103,13 +71,14 @@ class Cartas(commands.Cog):
         servidor_id, usuario_id = str(ctx.guild.id), str(objetivo.id)
 
         # Cargar inventario del usuario
-        cartas_ids = cargar_inventario_usuario(servidor_id, usuario_id)
+        inv = await cargar_inventario_usuario(servidor_id, usuario_id)
+        cartas_ids = inventario.expandir(inv)
 
         if not cartas_ids:
             await ctx.send(f"{objetivo.display_name} has no cards yet.")
             return
 
-        cartas_info = cartas_por_id()
+        cartas_info = catalogo().por_id
         vista = Navegador(ctx, cartas_ids, cartas_info, objetivo)
         await vista.enviar()
 
@@ -127,21 +96,17 @@ class Cartas(commands.Cog):
         servidor_id, usuario_id = str(interaction.guild.id), str(objetivo.id)
 
         # Cargar inventario del usuario
-        cartas_ids = cargar_inventario_usuario(servidor_id, usuario_id)
-        if not cartas_ids:
+        inv = await cargar_inventario_usuario(servidor_id, usuario_id)
+        if not inv:
             await interaction.followup.send(f"{objetivo.display_name} has no cards yet.")
             return
 
-        cartas_info = cartas_por_id()
+        cartas_info = catalogo().por_id
 
-        # Convertir IDs a nombres
-        nombres = [
-            cartas_info.get(str(cid), {}).get("nombre", f"ID {cid}")
-            for cid in cartas_ids
-        ]
-
-        # Contar duplicados
-        contador = Counter(nombres)
+        # Convertir IDs a nombres; el inventario ya trae las copias
+        contador = Counter()
+        for cid, copias in inv.items():
+            contador[cartas_info.get(cid, {}).get("nombre", f"ID {cid}")] += copias
         nombres_final = [
             f"{nombre} **[{cantidad}]**" if cantidad > 1 else nombre
             for nombre, cantidad in contador.items()
@@ -150,7 +115,7 @@ class Cartas(commands.Cog):
         nombres_final = sorted(nombres_final, key=lambda s: s.lower())
 
         # Construir bloques sin cortar nombres
-        encabezado = f"{objetivo.mention}, these are your cards ({len(cartas_ids)}):\n"
+        encabezado = f"{objetivo.mention}, these are your cards ({inventario.total(inv)}):\n"
         bloques, bloque_actual = [], encabezado
 
         for nombre in nombres_final:
@@ -178,21 +143,17 @@ class Cartas(commands.Cog):
         servidor_id, usuario_id = str(ctx.guild.id), str(objetivo.id)
 
         # Cargar inventario del usuario
-        cartas_ids = cargar_inventario_usuario(servidor_id, usuario_id)
-        if not cartas_ids:
+        inv = await cargar_inventario_usuario(servidor_id, usuario_id)
+        if not inv:
             await ctx.send(f"{objetivo.display_name} has no cards yet.")
             return
 
-        cartas_info = cartas_por_id()
+        cartas_info = catalogo().por_id
 
-        # Convertir IDs a nombres
-        nombres = [
-            cartas_info.get(str(cid), {}).get("nombre", f"ID {cid}")
-            for cid in cartas_ids
-        ]
-
-        # Contar duplicados
-        contador = Counter(nombres)
+        # Convertir IDs a nombres; el inventario ya trae las copias
+        contador = Counter()
+        for cid, copias in inv.items():
+            contador[cartas_info.get(cid, {}).get("nombre", f"ID {cid}")] += copias
         nombres_final = [
             f"{nombre} **[{cantidad}]**" if cantidad > 1 else nombre
             for nombre, cantidad in contador.items()
@@ -200,7 +161,7 @@ class Cartas(commands.Cog):
 
         nombres_final = sorted(nombres_final, key=lambda s: s.lower())
 
-        encabezado = f"{objetivo.mention}, these are your cards ({len(cartas_ids)}):\n"
+        encabezado = f"{objetivo.mention}, these are your cards ({inventario.total(inv)}):\n"
         bloques, bloque_actual = [], encabezado
 
         for nombre in nombres_final:
@@ -250,77 +211,33 @@ class Cartas(commands.Cog):
     # Lógica compartida
     # -----------------------------
     async def _mostrar_estado(self, servidor_id: str, usuario_id: str, nombre_usuario: str, enviar):
-        # Leer settings y pack_limit desde guilds
-        settings = cargar_settings()
-        servidor_settings = settings.get("guilds", {}).get(servidor_id, {})
+        # Settings del servidor desde la caché en memoria
+        servidor_settings = await cache_settings.guild(servidor_id)
         pack_limit = servidor_settings.get("pack_limit", 1)
 
-        # Leer colección principal packs
-        packs = cargar_packs()
-        servidor_packs = packs.get(servidor_id, {})
-        usuario_packs = servidor_packs.get(usuario_id, {"packs_opened": 0, "ultimo_paquete": None})
-
-        ahora = datetime.datetime.now()  # misma referencia temporal que /pack (naive local/server time)
-        inicio_dia = datetime.datetime.combine(ahora.date(), datetime.time.min)
-        medianoche = inicio_dia + datetime.timedelta(days=1)
-
-        packs_opened = usuario_packs.get("packs_opened", 0)
-        ultimo_str = usuario_packs.get("ultimo_paquete")
-
-        # Normalizar ultimo_paquete si solo trae fecha (YYYY-MM-DD)
-        ultimo_dt = None
-        if ultimo_str:
-            try:
-                ultimo_dt = datetime.datetime.fromisoformat(ultimo_str)
-            except ValueError:
-                ultimo_dt = datetime.datetime.fromisoformat(ultimo_str + "T00:00:00")
-            # no persisto aquí para no escribir desde status; /pack sí persiste la normalización
-
-        # Si es otro día, el conteo diario se considera 0 desde la lógica de /pack al abrir.
-        # Aquí mostramos estado actual sin mutar datos, pero reflejamos correctamente el límite.
-        # Calcular franjas con la misma lógica que /pack
-        intervalo_horas = 24 / pack_limit
-        franja_actual = int(ahora.hour // intervalo_horas)
-
-        # Determinar si ya se abrió en la franja actual
-        ya_abierto_en_franja = False
-        if ultimo_dt and ultimo_dt.date() == ahora.date():
-            franja_ultimo = int(ultimo_dt.hour // intervalo_horas)
-            if franja_actual == franja_ultimo:
-                ya_abierto_en_franja = True
-
-        # Calcular horas de refresco en GMT y mostrarlas como timestamps de Discord
-        ahora_utc = datetime.datetime.now(datetime.timezone.utc)
-        ventanas_utc = []
-        for i in range(pack_limit):
-            # ventanas en UTC: inicio del día UTC + i * intervalo
-            base_utc = datetime.datetime.combine(ahora_utc.date(), datetime.time.min, tzinfo=datetime.timezone.utc)
-            ventana_dt = base_utc + datetime.timedelta(hours=i * intervalo_horas)
-            # si la ventana ya pasó hoy en UTC, se empuja a mañana
-            if ventana_dt < ahora_utc:
-                ventana_dt += datetime.timedelta(days=1)
-            ventanas_utc.append(ventana_dt)
-        ventanas_utc.sort()
-        ventanas_str = ", ".join([f"<t:{int(v.timestamp())}:t>" for v in ventanas_utc])
+        # Leer solo el registro de packs del usuario
+        usuario_packs = await cargar_pack_usuario(servidor_id, usuario_id)
+
+        # Mismo cálculo que /pack, en la zona horaria del servidor
+        estado = EstadoPacks(usuario_packs, pack_limit, zona_servidor(servidor_settings))
+        packs_opened = estado.abiertos_hoy
+
+        # Horas de refresco como timestamps de Discord (cada cliente las ve en su hora)
+        ventanas_str = ", ".join([f"<t:{int(v.timestamp())}:t>" for v in estado.ventanas()])
 
         # Calcular tiempo restante
         # 1) Si alcanzó el máximo diario → hasta medianoche
-        if packs_opened >= pack_limit:
-            restante = medianoche - ahora
-            horas, resto = divmod(int(restante.total_seconds()), 3600)
-            minutos = resto // 60
-            estado_pack = f"⏳ Next reset in {horas}h {minutos}m (<t:{int(medianoche.replace(tzinfo=datetime.timezone.utc).timestamp())}:t>)"
+        if estado.limite_alcanzado():
+            estado_pack = (
+                f"⏳ Next reset in {formato_restante(estado.hasta_medianoche())} "
+                f"(<t:{int(estado.medianoche.timestamp())}:t>)"
+            )
+        # 2) Si ya abrió en esta franja → hasta inicio siguiente franja
+        elif estado.abierto_en_franja():
+            estado_pack = f"🚫 You must wait {formato_restante(estado.hasta_siguiente_franja())} to open a new pack"
+        # 3) Si no ha abierto en esta franja y no superó el límite → puede abrir
         else:
-            # 2) Si ya abrió en esta franja → hasta inicio siguiente franja
-            if ya_abierto_en_franja:
-                siguiente_inicio = inicio_dia + datetime.timedelta(hours=(franja_actual + 1) * intervalo_horas)
-                restante = siguiente_inicio - ahora
-                horas, resto = divmod(int(restante.total_seconds()), 3600)
-                minutos = resto // 60
-                estado_pack = f"🚫 You must wait {horas}h {minutos}m to open a new pack"
-            else:
-                # 3) Si no ha abierto en esta franja y no superó el límite → puede abrir
-                estado_pack = "✅ You can open a pack now!"
+            estado_pack = "✅ You can open a pack now!"
 
         # Server spawn info SOLO si enabled == True
         config = servidor_settings if servidor_settings else None
@@ -339,6 +256,7 @@ class Cartas(commands.Cog):
             f"📊 **Pack opening status for {nombre_usuario}:**\n"
             f"- Max packs per day: {pack_limit}\n"
             f"- Packs opened today: {packs_opened}\n"
+            f"- Daily reset: midnight {estado.zona.key}\n"
             f"- Refresh times: {ventanas_str}\n"
             f"- {estado_pack}"
             f"{spawn_info}"
@@ -351,6 +269,7 @@ class Cartas(commands.Cog):
     # /search
     # -----------------------------
     @app_commands.command(name="search", description="Searches RGGO cards containing a term")
+    @app_commands.describe(term="Words in the card's name. Filters: rarity:UR, attr:shadow, type:support")
     async def search(self, interaction: discord.Interaction, term: str):
         """Busca cartas que contengan el término en su nombre (slash)."""
         await self._safe_defer(interaction, ephemeral=False)
@@ -359,9 +278,8 @@ class Cartas(commands.Cog):
             await interaction.followup.send("You must provide a search term. Example: /search Yamai")
             return
 
-        cartas = cargar_cartas()
-        coincidencias = [c for c in cartas if term.lower() in c["nombre"].lower()]
-        coincidencias = sorted(coincidencias, key=lambda x: x["nombre"])
+        # Índice de n-gramas: términos en AND y filtros rarity:/attr:/type:
+        coincidencias = buscar_cartas(term)
 
         if not coincidencias:
             await interaction.followup.send(f"No cards found containing '{term}'.")
@@ -370,12 +288,8 @@ class Cartas(commands.Cog):
         # Cargar inventario del usuario
         servidor_id = str(interaction.guild.id)
         usuario_id = str(interaction.user.id)
-        cartas_usuario = cargar_inventario_usuario(servidor_id, usuario_id)
-
-        # Contar copias
-        conteo = {}
-        for cid in cartas_usuario:
-            conteo[cid] = conteo.get(cid, 0) + 1
+        # Inventario como {id_carta: copias}
+        conteo = await cargar_inventario_usuario(servidor_id, usuario_id)
 
         mensaje = "```diff\n"
         for c in coincidencias:
@@ -404,9 +318,8 @@ class Cartas(commands.Cog):
             await ctx.send("You must provide a search term. Example: y!search Yamai")
             return
 
-        cartas = cargar_cartas()
-        coincidencias = [c for c in cartas if term.lower() in c["nombre"].lower()]
-        coincidencias = sorted(coincidencias, key=lambda x: x["nombre"])
+        # Índice de n-gramas: términos en AND y filtros rarity:/attr:/type:
+        coincidencias = buscar_cartas(term)
 
         if not coincidencias:
             await ctx.send(f"No cards found containing '{term}'.")
@@ -415,12 +328,8 @@ class Cartas(commands.Cog):
         # Cargar inventario del usuario
         servidor_id = str(ctx.guild.id)
         usuario_id = str(ctx.author.id)
-        cartas_usuario = cargar_inventario_usuario(servidor_id, usuario_id)
-
-        # Contar copias
-        conteo = {}
-        for cid in cartas_usuario:
-            conteo[cid] = conteo.get(cid, 0) + 1
+        # Inventario como {id_carta: copias}
+        conteo = await cargar_inventario_usuario(servidor_id, usuario_id)
 
         mensaje = "```diff\n"
         for c in coincidencias:
@@ -454,79 +363,51 @@ class Cartas(commands.Cog):
         servidor_id = str(interaction.guild.id)
         usuario_id = str(interaction.user.id)
 
-        # Leer pack_limit desde settings
-        settings = cargar_settings()
-        servidor_settings = settings.get("guilds", {}).get(servidor_id, {})
+        # Leer pack_limit desde la caché de settings
+        servidor_settings = await cache_settings.guild(servidor_id)
         pack_limit = servidor_settings.get("pack_limit", 1)
 
-        # Packs
-        packs = cargar_packs()
-        servidor_packs = packs.setdefault(servidor_id, {})
-        usuario_packs = servidor_packs.setdefault(usuario_id, {})
-
-        ahora = datetime.datetime.now()
-        inicio_dia = datetime.datetime.combine(ahora.date(), datetime.time.min)
-        medianoche = inicio_dia + datetime.timedelta(days=1)
-
-        # Comprobar packs_opened
-        packs_opened = usuario_packs.get("packs_opened", 0)
-        if packs_opened >= pack_limit:
-            restante = medianoche - ahora
-            horas, resto = divmod(int(restante.total_seconds()), 3600)
-            minutos = resto // 60
+        # Packs: solo el registro del usuario
+        usuario_packs = await cargar_pack_usuario(servidor_id, usuario_id)
+
+        estado = EstadoPacks(usuario_packs, pack_limit, zona_servidor(servidor_settings))
+
+        # Comprobar packs abiertos hoy (el contador de otro día cuenta como 0)
+        if estado.limite_alcanzado():
             await interaction.followup.send(
                 f"🚫 {interaction.user.mention}, you have already opened the maximum of {pack_limit} packs today. "
-                f"You can open more in {horas}h {minutos}m."
+                f"You can open more in {formato_restante(estado.hasta_medianoche())}."
             )
             return
 
-        # Intervalos
-        interval_minutes = int(24 * 60 / pack_limit)
-        minutes_since_midnight = ahora.hour * 60 + ahora.minute
-        franja_actual = minutes_since_midnight // interval_minutes
-
-        # Comprobar último pack
-        ultimo_str = usuario_packs.get("ultimo_paquete")
-        if ultimo_str:
-            try:
-                ultimo_dt = datetime.datetime.fromisoformat(ultimo_str)
-            except ValueError:
-                ultimo_dt = datetime.datetime.fromisoformat(ultimo_str + "T00:00:00")
-                usuario_packs["ultimo_paquete"] = ultimo_dt.isoformat()
-                guardar_packs(packs)
-
-            if ultimo_dt.date() == ahora.date():
-                franja_ultimo = (ultimo_dt.hour * 60 + ultimo_dt.minute) // interval_minutes
-                if franja_actual == franja_ultimo:
-                    siguiente_inicio = inicio_dia + datetime.timedelta(minutes=(franja_actual + 1) * interval_minutes)
-                    restante = siguiente_inicio - ahora
-                    horas, resto = divmod(int(restante.total_seconds()), 3600)
-                    minutos = resto // 60
-                    await interaction.followup.send(
-                        f"🚫 {interaction.user.mention}, you must wait {horas}h {minutos}m before opening another pack."
-                    )
-                    return
+        # Comprobar la franja del último pack
+        if estado.abierto_en_franja():
+            await interaction.followup.send(
+                f"🚫 {interaction.user.mention}, you must wait {formato_restante(estado.hasta_siguiente_franja())} before opening another pack."
+            )
+            return
 
         # Cargar cartas
-        cartas = cargar_cartas()
+        cartas = catalogo().cartas
         if not cartas:
             await interaction.followup.send("❌ No cards available.", ephemeral=True)
             return
 
         nuevas_cartas = random.sample(cartas, 5)
+        ids = [c["id"] for c in nuevas_cartas]
+        cartas_info = catalogo().por_id
+        # La imagen del pack se dibuja mientras se guarda en Firebase
+        resumen = asyncio.create_task(composicion.imagen_paquete(ids, cartas_info))
 
-        # Guardar fecha/hora exacta y actualizar packs_opened
-        usuario_packs["ultimo_paquete"] = ahora.isoformat()
-        usuario_packs["packs_opened"] = packs_opened + 1
-        guardar_packs(packs)
+        # Guardar fecha/hora exacta, día y packs abiertos hoy
+        estado.registrar_apertura(usuario_packs)
+        await guardar_pack_usuario(servidor_id, usuario_id, usuario_packs)
 
         # Guardar cartas en la nueva colección inventario
-        ids = [c["id"] for c in nuevas_cartas]
-        agregar_cartas_inventario(servidor_id, usuario_id, ids)
+        await agregar_cartas_inventario(servidor_id, usuario_id, ids)
 
         # Preparar vista
-        cartas_info = cartas_por_id()
-        vista = NavegadorPaquete(interaction, ids, cartas_info, interaction.user)
+        vista = NavegadorPaquete(interaction, ids, cartas_info, interaction.user, await resumen)
         embed, archivo = vista.mostrar()
 
         if archivo:
@@ -543,71 +424,45 @@ class Cartas(commands.Cog):
         servidor_id = str(ctx.guild.id)
         usuario_id = str(ctx.author.id)
 
-        settings = cargar_settings()
-        servidor_settings = settings.get("guilds", {}).get(servidor_id, {})
+        servidor_settings = await cache_settings.guild(servidor_id)
         pack_limit = servidor_settings.get("pack_limit", 1)
 
-        packs = cargar_packs()
-        servidor_packs = packs.setdefault(servidor_id, {})
-        usuario_packs = servidor_packs.setdefault(usuario_id, {})
+        usuario_packs = await cargar_pack_usuario(servidor_id, usuario_id)
 
-        ahora = datetime.datetime.now()
-        inicio_dia = datetime.datetime.combine(ahora.date(), datetime.time.min)
-        medianoche = inicio_dia + datetime.timedelta(days=1)
+        estado = EstadoPacks(usuario_packs, pack_limit, zona_servidor(servidor_settings))
 
-        packs_opened = usuario_packs.get("packs_opened", 0)
-        if packs_opened >= pack_limit:
-            restante = medianoche - ahora
-            horas, resto = divmod(int(restante.total_seconds()), 3600)
-            minutos = resto // 60
+        # Comprobar packs abiertos hoy (el contador de otro día cuenta como 0)
+        if estado.limite_alcanzado():
             await ctx.send(
                 f"🚫 {ctx.author.mention}, you have already opened the maximum of {pack_limit} packs today. "
-                f"You can open more in {horas}h {minutos}m."
+                f"You can open more in {formato_restante(estado.hasta_medianoche())}."
             )
             return
 
-        interval_minutes = int(24 * 60 / pack_limit)
-        minutes_since_midnight = ahora.hour * 60 + ahora.minute
-        franja_actual = minutes_since_midnight // interval_minutes
-
-        ultimo_str = usuario_packs.get("ultimo_paquete")
-        if ultimo_str:
-            try:
-                ultimo_dt = datetime.datetime.fromisoformat(ultimo_str)
-            except ValueError:
-                ultimo_dt = datetime.datetime.fromisoformat(ultimo_str + "T00:00:00")
-                usuario_packs["ultimo_paquete"] = ultimo_dt.isoformat()
-                guardar_packs(packs)
-
-            if ultimo_dt.date() == ahora.date():
-                franja_ultimo = (ultimo_dt.hour * 60 + ultimo_dt.minute) // interval_minutes
-                if franja_actual == franja_ultimo:
-                    siguiente_inicio = inicio_dia + datetime.timedelta(minutes=(franja_actual + 1) * interval_minutes)
-                    restante = siguiente_inicio - ahora
-                    horas, resto = divmod(int(restante.total_seconds()), 3600)
-                    minutos = resto // 60
-                    await ctx.send(
-                        f"🚫 {ctx.author.mention}, you must wait {horas}h {minutos}m before opening another pack."
-                    )
-                    return
+        # Comprobar la franja del último pack
+        if estado.abierto_en_franja():
+            await ctx.send(
+                f"🚫 {ctx.author.mention}, you must wait {formato_restante(estado.hasta_siguiente_franja())} before opening another pack."
+            )
+            return
 
-        cartas = cargar_cartas()
+        cartas = catalogo().cartas
         if not cartas:
             await ctx.send("❌ No cards available.")
             return
 
         nuevas_cartas = random.sample(cartas, 5)
+        ids = [c["id"] for c in nuevas_cartas]
+        cartas_info = catalogo().por_id
+        resumen = asyncio.create_task(composicion.imagen_paquete(ids, cartas_info))
 
-        usuario_packs["ultimo_paquete"] = ahora.isoformat()
-        usuario_packs["packs_opened"] = packs_opened + 1
-        guardar_packs(packs)
+        estado.registrar_apertura(usuario_packs)
+        await guardar_pack_usuario(servidor_id, usuario_id, usuario_packs)
 
         # Guardar cartas en inventario
-        ids = [c["id"] for c in nuevas_cartas]
-        agregar_cartas_inventario(servidor_id, usuario_id, ids)
+        await agregar_cartas_inventario(servidor_id, usuario_id, ids)
 
-        cartas_info = cartas_por_id()
-        vista = NavegadorPaquete(ctx, ids, cartas_info, ctx.author)
+        vista = NavegadorPaquete(ctx, ids, cartas_info, ctx.author, await resumen)
         embed, archivo = vista.mostrar()
 
         # Log opcional
@@ -642,7 +497,7 @@ class Cartas(commands.Cog):
     async def pack_limit(self, interaction: discord.Interaction, value: int):
         """
         Permite al admin del servidor definir cuántos packs diarios se pueden abrir.
-        Actualiza directamente la colección settings.
+        Escribe solo el campo pack_limit del servidor en settings.
         """
 
         if interaction.guild is None:
@@ -660,16 +515,8 @@ class Cartas(commands.Cog):
         await interaction.response.defer()
 
         try:
-            # 1. Cargar settings actuales
-            settings = cargar_settings()
-
-            # 2. Actualizar pack_limit solo para este servidor
-            guilds = settings.setdefault("guilds", {})
-            guild_config = guilds.setdefault(str(interaction.guild.id), {})
-            guild_config["pack_limit"] = value
-
-            # 3. Guardar settings actualizados en la colección principal
-            guardar_settings(settings)
+            # Escribir solo pack_limit de este servidor (sin leer el documento)
+            await guardar_settings_guild(str(interaction.guild.id), {"pack_limit": value})
 
             await interaction.followup.send(
                 f"✅ Daily pack limit set to {value} for **{interaction.guild.name}**.",
@@ -696,13 +543,8 @@ class Cartas(commands.Cog):
             return
 
         try:
-            # Carga los servidores de settings
-            settings = cargar_settings()
-            guilds = settings.setdefault("guilds", {})
-            guild_config = guilds.setdefault(str(ctx.guild.id), {})
-            # Configura el límite de packs
-            guild_config["pack_limit"] = value
-            guardar_settings(settings)
+            # Configura el límite de packs solo para este servidor
+            await guardar_settings_guild(str(ctx.guild.id), {"pack_limit": value})
 
             await ctx.send(
                 f"✅ Daily pack limit set to {value} for **{ctx.guild.name}**."
@@ -711,32 +553,87 @@ class Cartas(commands.Cog):
             await ctx.send("❌ Could not update the pack limit.")
 
 
+    @app_commands.command(
+        name="pack_timezone",
+        description="Define the time zone whose midnight resets the daily packs in this server."
+    )
+    @app_commands.describe(timezone="IANA time zone, e.g. Europe/Madrid, America/New_York or UTC")
+    @app_commands.default_permissions(administrator=True)
+    async def pack_timezone(self, interaction: discord.Interaction, timezone: str):
+        """
+        Permite al admin del servidor elegir la zona horaria del reinicio diario.
+        """
+        if interaction.guild is None:
+            await interaction.response.send_message(
+                "🚫 This command can only be used in servers.", ephemeral=True
+            )
+            return
+
+        if not zona_valida(timezone):
+            await interaction.response.send_message(
+                f"🚫 Unknown time zone '{timezone}'. Use a name like Europe/Madrid or UTC.", ephemeral=True
+            )
+            return
+
+        await interaction.response.defer()
+
+        try:
+            await guardar_settings_guild(str(interaction.guild.id), {"timezone": timezone})
+
+            await interaction.followup.send(
+                f"✅ Daily packs in **{interaction.guild.name}** now reset at midnight {timezone}."
+            )
+
+        except Exception:
+            await interaction.followup.send(
+                "❌ Could not update the time zone", ephemeral=True
+            )
+
+
+    # -----------------------------
+    # Prefijo: y!pack_timezone
+    # -----------------------------
+    @commands.command(name="pack_timezone")
+    @commands.has_permissions(administrator=True)
+    async def pack_timezone_prefix(self, ctx: commands.Context, timezone: str):
+        """Comando de prefijo para definir la zona horaria de los packs."""
+        if not zona_valida(timezone):
+            await ctx.send(f"🚫 Unknown time zone '{timezone}'. Use a name like Europe/Madrid or UTC.")
+            return
+
+        try:
+            await guardar_settings_guild(str(ctx.guild.id), {"timezone": timezone})
+
+            await ctx.send(
+                f"✅ Daily packs in **{ctx.guild.name}** now reset at midnight {timezone}."
+            )
+        except Exception:
+            await ctx.send("❌ Could not update the time zone.")
+
+
     # -----------------------------
     # /gift (regalar carta)
     # -----------------------------
     @app_commands.command(name="gift", description="Gift a card to another user")
     @app_commands.describe(user="User to gift to", card="Exact name of the card to gift")
+    @app_commands.autocomplete(card=autocompletado.carta_disponible)
     async def gift(self, interaction: discord.Interaction, user: discord.Member, card: str):
         servidor_id = str(interaction.guild.id)
         sender_id = str(interaction.user.id)
 
-        sender_cards = cargar_inventario_usuario(servidor_id, sender_id)
-
-        cartas = cargar_cartas()
-        name_lower = card.strip().lower()
-        carta_obj = next((c for c in cartas if c["nombre"].lower() == name_lower), None)
+        carta_obj, sugerencias = resolver_carta(card)
 
         if not carta_obj:
             await interaction.response.send_message(
-                f"❌ No card found with exact name '{card}'.",
+                f"❌ No card found with exact name '{card}'.{texto_sugerencias(sugerencias)}",
                 ephemeral=True
             )
             return
 
         carta_id = str(carta_obj["id"])
 
-        # Validación completa usando puede_trade
-        ok, reason = puede_trade(servidor_id, sender_id, carta_id)
+        # Comprobación previa: que tenga una copia libre de la carta
+        ok, reason = await transferencias.puede_transferir(servidor_id, sender_id, carta_id)
         if not ok:
             await interaction.response.send_message(reason, ephemeral=True)
             return
@@ -756,20 +653,16 @@ class Cartas(commands.Cog):
         servidor_id = str(ctx.guild.id)
         sender_id = str(ctx.author.id)
 
-        sender_cards = cargar_inventario_usuario(servidor_id, sender_id)
-
-        cartas = cargar_cartas()
-        name_lower = card.strip().lower()
-        carta_obj = next((c for c in cartas if c["nombre"].lower() == name_lower), None)
+        carta_obj, sugerencias = resolver_carta(card)
 
         if not carta_obj:
-            await ctx.send(f"❌ No card found with exact name '{card}'.")
+            await ctx.send(f"❌ No card found with exact name '{card}'.{texto_sugerencias(sugerencias)}")
             return
 
         carta_id = str(carta_obj["id"])
 
-        # Validación completa usando puede_trade
-        ok, reason = puede_trade(servidor_id, sender_id, carta_id)
+        # Comprobación previa: que tenga una copia libre de la carta
+        ok, reason = await transferencias.puede_transferir(servidor_id, sender_id, carta_id)
         if not ok:
             await ctx.send(reason)
             return
@@ -783,6 +676,7 @@ class Cartas(commands.Cog):
 
     @app_commands.command(name="show", description="Shows a card's image and data")
     @app_commands.describe(name="Exact name of the card you want to see")
+    @app_commands.autocomplete(name=autocompletado.carta_catalogo)
     async def show(self, interaction: discord.Interaction, name: str):
         """Muestra una carta concreta buscando por nombre exacto (slash)."""
         await self._safe_defer(interaction)
@@ -791,14 +685,11 @@ class Cartas(commands.Cog):
             await interaction.followup.send("⚠️ You must provide a card's name.", ephemeral=True)
             return
 
-        cartas = cargar_cartas()
-        name_lower = name.strip().lower()
-
         # Buscar coincidencia exacta (case-insensitive)
-        carta = next((c for c in cartas if c.get("nombre", "").lower() == name_lower), None)
+        carta, sugerencias = resolver_carta(name)
 
         if not carta:
-            await interaction.followup.send(f"❌ No card found with exact name '{name}'.", ephemeral=True)
+            await interaction.followup.send(f"❌ No card found with exact name '{name}'.{texto_sugerencias(sugerencias)}", ephemeral=True)
             return
 
         # Diccionarios de formato visual
@@ -824,7 +715,7 @@ class Cartas(commands.Cog):
                          f"🛡️ {carta.get('defense', '—')} | 💨 {carta.get('speed', '—')}")
         )
 
-        ruta_img = carta.get("imagen")
+        ruta_img = variantes.url(carta, "full")
         if ruta_img and ruta_img.startswith("http"):
             embed.set_image(url=ruta_img)
         else:
@@ -840,14 +731,11 @@ class Cartas(commands.Cog):
             await ctx.send("⚠️ You must provide a card's name.")
             return
 
-        cartas = cargar_cartas()
-        name_lower = name.strip().lower()
-
         # Buscar coincidencia exacta (case-insensitive)
-        carta = next((c for c in cartas if c.get("nombre", "").lower() == name_lower), None)
+        carta, sugerencias = resolver_carta(name)
 
         if not carta:
-            await ctx.send(f"❌ No card found with exact name '{name}'.")
+            await ctx.send(f"❌ No card found with exact name '{name}'.{texto_sugerencias(sugerencias)}")
             return
 
         # Diccionarios de formato visual
@@ -873,7 +761,7 @@ class Cartas(commands.Cog):
                          f"🛡️ {carta.get('defense', '—')} | 💨 {carta.get('speed', '—')}")
         )
 
-        ruta_img = carta.get("imagen")
+        ruta_img = variantes.url(carta, "full")
         if ruta_img and ruta_img.startswith("http"):
             embed.set_image(url=ruta_img)
         else:
@@ -887,22 +775,21 @@ class Cartas(commands.Cog):
     # -----------------------------
     @app_commands.command(name="trade", description="Trade a card with another user")
     @app_commands.describe(user="User to trade with", card="Card you offer")
+    @app_commands.autocomplete(card=autocompletado.carta_disponible)
     async def trade_slash(self, interaction: discord.Interaction, user: discord.Member, card: str):
     
         sid = str(interaction.guild.id)
         u1 = str(interaction.user.id)
     
-        cartas = cargar_cartas()
-        name = card.strip().lower()
-        c1 = next((c for c in cartas if c["nombre"].lower() == name), None)
+        c1, sugerencias = resolver_carta(card)
     
         if not c1:
-            await interaction.response.send_message(f"No card named '{card}'.", ephemeral=True)
+            await interaction.response.send_message(f"No card named '{card}'.{texto_sugerencias(sugerencias)}", ephemeral=True)
             return
     
         cid1 = str(c1["id"])
     
-        ok, reason = puede_trade(sid, u1, cid1)
+        ok, reason = await transferencias.puede_transferir(sid, u1, cid1)
         if not ok:
             await interaction.response.send_message(reason, ephemeral=True)
             return
@@ -923,17 +810,15 @@ class Cartas(commands.Cog):
         sid = str(ctx.guild.id)
         u1 = str(ctx.author.id)
 
-        cartas = cargar_cartas()
-        name = card.strip().lower()
-        c1 = next((c for c in cartas if c["nombre"].lower() == name), None)
+        c1, sugerencias = resolver_carta(card)
 
         if not c1:
-            await ctx.send(f"No card named '{card}'.")
+            await ctx.send(f"No card named '{card}'.{texto_sugerencias(sugerencias)}")
             return
 
         cid1 = str(c1["id"])
 
-        ok, reason = puede_trade(sid, u1, cid1)
+        ok, reason = await transferencias.puede_transferir(sid, u1, cid1)
         if not ok:
             await ctx.send(reason)
             return
@@ -952,19 +837,18 @@ class Cartas(commands.Cog):
         description="Discard one card from your inventory by exact name."
     )
     @app_commands.describe(nombre_carta="Exact name of the card to discard")
+    @app_commands.autocomplete(nombre_carta=autocompletado.carta_disponible)
     async def discard_slash(self, interaction: discord.Interaction, nombre_carta: str):
         await interaction.response.defer(ephemeral=True)
 
         servidor_id = str(interaction.guild.id)
         usuario_id = str(interaction.user.id)
 
-        cartas = cargar_cartas()
-        name_lower = nombre_carta.strip().lower()
-        carta = next((c for c in cartas if c.get("nombre", "").lower() == name_lower), None)
+        carta, sugerencias = resolver_carta(nombre_carta)
 
         if not carta:
             await interaction.followup.send(
-                f"❌ No card found with the name '{nombre_carta}'.",
+                f"❌ No card found with the name '{nombre_carta}'.{texto_sugerencias(sugerencias)}",
                 ephemeral=True
             )
             return
@@ -972,15 +856,13 @@ class Cartas(commands.Cog):
         carta_id = str(carta["id"])
         carta_nombre = carta.get("nombre", "Unknown")
 
-        # Validación completa usando puede_trade
-        ok, reason = puede_trade(servidor_id, usuario_id, carta_id)
-        if not ok:
-            await interaction.followup.send(reason, ephemeral=True)
+        # Validación y descarte de una copia en una única transacción
+        try:
+            await transferencias.descartar(servidor_id, usuario_id, carta_id)
+        except transferencias.TransferenciaRechazada as e:
+            await interaction.followup.send(e.motivo, ephemeral=True)
             return
 
-        # Quitar una copia
-        quitar_cartas_inventario(servidor_id, usuario_id, [carta_id])
-
         await interaction.followup.send(
             f"✅ Discarded one copy of **{carta_nombre}**.",
             ephemeral=True
@@ -996,26 +878,22 @@ class Cartas(commands.Cog):
         servidor_id = str(ctx.guild.id)
         usuario_id = str(ctx.author.id)
 
-        cartas = cargar_cartas()
-        name_lower = nombre_carta.strip().lower()
-        carta = next((c for c in cartas if c.get("nombre", "").lower() == name_lower), None)
+        carta, sugerencias = resolver_carta(nombre_carta)
 
         if not carta:
-            await ctx.send(f"❌ No card found with the name '{nombre_carta}'.")
+            await ctx.send(f"❌ No card found with the name '{nombre_carta}'.{texto_sugerencias(sugerencias)}")
             return
 
         carta_id = str(carta["id"])
         carta_nombre = carta.get("nombre", "Unknown")
 
-        # Validación completa usando puede_trade
-        ok, reason = puede_trade(servidor_id, usuario_id, carta_id)
-        if not ok:
-            await ctx.send(reason)
+        # Validación y descarte de una copia en una única transacción
+        try:
+            await transferencias.descartar(servidor_id, usuario_id, carta_id)
+        except transferencias.TransferenciaRechazada as e:
+            await ctx.send(e.motivo)
             return
 
-        # Quitar una copia
-        quitar_cartas_inventario(servidor_id, usuario_id, [carta_id])
-
         await ctx.send(
             f"✅ {ctx.author.display_name} discarded a copy of **{carta_nombre}**."
         )
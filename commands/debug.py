@@ -5,13 +5,20 @@ from discord import app_commands
 import os
 import random
 import datetime
-from core.firebase_client import db
 
 # Core: carga/guardado en Gist y acceso a la base de cartas
-from core.firebase_storage import cargar_settings, guardar_settings
-from core.firebase_storage import cargar_packs, guardar_packs, cargar_propiedades, guardar_propiedades
-
-from core.cartas import cargar_cartas, cartas_por_id
+from core.firebase_async import cargar_settings, guardar_settings, cargar_settings_guilds, migrar_settings_guilds
+from core.firebase_async import cargar_packs, cargar_propiedades, guardar_propiedades, migrar_inventarios, migrar_packs_global
+
+from core.cartas import catalogo
+from core.hilos import en_hilo
+from core.metricas import monitor_lag
+from core.cache_settings import cache_settings
+from core.lectura_unica import lecturas
+from core.metricas_almacen import metricas_almacen
+from core.resiliencia import resiliencia
+from core import firebase_storage as fs
+from core import inventario, variantes
 
 # Views: componentes interactivos
 from views.navegador import Navegador
@@ -22,6 +29,14 @@ from views.navegador_trade import TradeView
 # ID del dueño (ocultamos /carta solo para él)
 OWNER_ID = 182920174276575232
 
+
+def _db():
+    # Los backups y las migraciones trabajan directamente sobre Firestore.
+    # Import diferido: con STORAGE_BACKEND=memoria o sqlite no se inicializa Firebase
+    from core.firebase_client import db
+    return db
+
+
 PROPIEDADES_COLLECTION = "propiedades"
 PROPIEDADES_DOC = "global"
 
@@ -51,13 +66,13 @@ class Debug(commands.Cog):
 
         try:
             timestamp = datetime.datetime.now().isoformat()
-            backup_ref = db.collection("propiedades_backup").document(timestamp)
+            backup_ref = _db().collection("propiedades_backup").document(timestamp)
 
             # ⚠️ IMPORTANTE: leer SIN to_dict()
-            doc = (
-                db.collection(PROPIEDADES_COLLECTION)
+            doc = await en_hilo(
+                _db().collection(PROPIEDADES_COLLECTION)
                 .document(PROPIEDADES_DOC)
-                .get()
+                .get
             )
 
             if not doc.exists:
@@ -73,7 +88,7 @@ class Debug(commands.Cog):
             guardados = 0
 
             for servidor_id, datos_servidor in propiedades.items():
-                backup_ref.collection("servidores").document(servidor_id).set(datos_servidor)
+                await en_hilo(backup_ref.collection("servidores").document(servidor_id).set, datos_servidor)
                 guardados += 1
 
                 # ceder control al event loop cada cierto número
@@ -113,14 +128,14 @@ class Debug(commands.Cog):
 
         try:
             # 1. Cargar packs actuales
-            packs = cargar_packs()
+            packs = await cargar_packs()
 
             # 2. Crear ID de backup con timestamp
             timestamp = datetime.datetime.now().isoformat()
             backup_id = f"packs_backup_{timestamp}"
 
             # 3. Guardar en Firebase en colección 'packs_backup'
-            db.collection("packs_backup").document(backup_id).set(packs)
+            await en_hilo(_db().collection("packs_backup").document(backup_id).set, packs)
 
             await interaction.followup.send(
                 f"✅ Packs backup created as `{backup_id}` in Firebase.", ephemeral=True
@@ -147,15 +162,16 @@ class Debug(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            # 1. Cargar settings actuales
-            settings = cargar_settings()
+            # 1. Cargar settings actuales (documento global y documentos por servidor)
+            settings = await cargar_settings()
+            settings["guilds_docs"] = await cargar_settings_guilds()
 
             # 2. Crear ID de backup con timestamp
             timestamp = datetime.datetime.now().isoformat()
             backup_id = f"settings_backup_{timestamp}"
 
             # 3. Guardar en Firebase en colección 'settings_backup'
-            db.collection("settings_backup").document(backup_id).set(settings)
+            await en_hilo(_db().collection("settings_backup").document(backup_id).set, settings)
 
             await interaction.followup.send(
                 f"✅ Settings backup created as `{backup_id}` in Firebase.", ephemeral=True
@@ -183,7 +199,7 @@ class Debug(commands.Cog):
 
         try:
             # 1. Obtener el último backup de la colección packs_backup
-            backups = db.collection("packs_backup").get()
+            backups = _db().collection("packs_backup").get()
             if not backups:
                 await interaction.followup.send("❌ No backups found.", ephemeral=True)
                 return
@@ -218,7 +234,7 @@ class Debug(commands.Cog):
 
             # 3. Guardar backup normalizado en Firebase con nuevo ID
             new_backup_id = f"{latest_backup.id}_normalized"
-            db.collection("packs_backup").document(new_backup_id).set(packs)
+            _db().collection("packs_backup").document(new_backup_id).set(packs)
 
             await interaction.followup.send(
                 f"✅ Normalized {cambios} entries. Saved as `{new_backup_id}`.", ephemeral=True
@@ -246,7 +262,7 @@ class Debug(commands.Cog):
 
         try:
             # 1. Cargar settings actuales
-            settings = cargar_settings()
+            settings = await cargar_settings()
 
             # 2. Asegurar que cada guild tenga pack_limit
             cambios = 0
@@ -257,7 +273,7 @@ class Debug(commands.Cog):
                     cambios += 1
 
             # 3. Guardar settings actualizados
-            guardar_settings(settings)
+            await guardar_settings(settings)
 
             await interaction.followup.send(
                 f"✅ Added pack_limit=1 to {cambios} guilds in settings.", ephemeral=True
@@ -285,12 +301,12 @@ class Debug(commands.Cog):
 
         try:
             # 1. Cargar packs actuales
-            packs = cargar_packs()
+            packs = await cargar_packs()
 
             # 2. Guardar copia de seguridad en Firebase
             timestamp = datetime.datetime.now().isoformat()
             backup_id = f"backup_{timestamp}"
-            db.collection("packs_backup").document(backup_id).set(packs)
+            _db().collection("packs_backup").document(backup_id).set(packs)
 
             # 3. Normalizar fechas antiguas
             cambios = 0
@@ -303,7 +319,7 @@ class Debug(commands.Cog):
                         cambios += 1
 
             # 4. Guardar packs normalizados
-            guardar_packs(packs)
+            await guardar_packs(packs)
 
             await interaction.followup.send(
                 f"✅ Backup created as `{backup_id}`. Normalized {cambios} entries to full datetime format."
@@ -376,12 +392,12 @@ class Debug(commands.Cog):
             # Leer settings.json
             with open("settings.json", "r", encoding="utf-8") as f:
                 settings = json.load(f)
-            db.collection("settings").document("global").set(settings)
+            _db().collection("settings").document("global").set(settings)
 
             # Leer propiedades.json
             with open("propiedades.json", "r", encoding="utf-8") as f:
                 propiedades = json.load(f)
-            db.collection("propiedades").document("global").set(propiedades)
+            _db().collection("propiedades").document("global").set(propiedades)
 
             await interaction.followup.send("✅ Migración completada en Firestore.", ephemeral=True)
         except Exception as e:
@@ -397,7 +413,7 @@ class Debug(commands.Cog):
     async def migrar_packs(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
 
-        settings = cargar_settings()
+        settings = await cargar_settings()
         packs = {}
 
         # Recorremos todos los servidores en settings
@@ -412,7 +428,7 @@ class Debug(commands.Cog):
                     packs[servidor_id][usuario_id] = {"ultimo_paquete": ultimo}
 
         # Guardar en la nueva colección
-        guardar_packs(packs)
+        await guardar_packs(packs)
 
         # Resumen de migración
         servidores = len(packs)
@@ -434,7 +450,7 @@ class Debug(commands.Cog):
     async def borrar_packs_settings(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
 
-        settings = cargar_settings()
+        settings = await cargar_settings()
 
         # ✅ Guardar copia de seguridad antes de borrar
         backup_settings(settings)
@@ -450,7 +466,7 @@ class Debug(commands.Cog):
                     borrados += 1
 
         # Guardar cambios en settings (merge=True ya aplicado en guardar_settings)
-        guardar_settings(settings)
+        await guardar_settings(settings)
 
         await interaction.followup.send(
             f"🗑️ Se han borrado {borrados} registros de 'ultimo_paquete' en settings.\n"
@@ -498,7 +514,7 @@ class Debug(commands.Cog):
     async def carta(self, interaction: discord.Interaction):
         """Muestra una carta aleatoria (solo owner)."""
         await interaction.response.defer()
-        cartas = cargar_cartas()
+        cartas = catalogo().cartas
         if not cartas:
             return await interaction.followup.send("No cards available.", ephemeral=True)
         elegida = random.choice(cartas)
@@ -522,7 +538,7 @@ class Debug(commands.Cog):
                          f"❤️ {elegida.get('health', '—')} | ⚔️ {elegida.get('attack', '—')} | "
                          f"🛡️ {elegida.get('defense', '—')} | 💨 {elegida.get('speed', '—')}")
         )
-        ruta = elegida.get("imagen")
+        ruta = variantes.url(elegida, "full")
         archivo = None
         if ruta and ruta.startswith("http"):
             embed.set_image(url=ruta)
@@ -539,30 +555,88 @@ class Debug(commands.Cog):
     
     @app_commands.default_permissions()
     @app_commands.check(lambda i: i.user.id == OWNER_ID)
-    @app_commands.command(name="resetpacks", description="Owner only: reset packs_opened for all users")
-    async def resetpacks(self, interaction: discord.Interaction):
-        # Verificar que el usuario es el owner del bot
-        app_owner = (await self.bot.application_info()).owner
-        if interaction.user.id != OWNER_ID:
-            await interaction.response.send_message("🚫 Only the bot owner can use this command.", ephemeral=True)
-            return
+    @app_commands.command(
+        name="loop_lag",
+        description="(Owner only) Shows the event loop lag measured in the last minutes."
+    )
+    async def loop_lag(self, interaction: discord.Interaction):
+        """Muestra el retraso del bucle de eventos (p50/p95/p99/max)."""
+        r = monitor_lag.resumen()
+        await interaction.response.send_message(
+            f"⏱️ **Event loop lag** ({r['muestras']} samples)\n"
+            f"- p50: {r['p50_ms']:.1f} ms\n"
+            f"- p95: {r['p95_ms']:.1f} ms\n"
+            f"- p99: {r['p99_ms']:.1f} ms\n"
+            f"- max: {r['max_ms']:.1f} ms",
+            ephemeral=True
+        )
 
-        packs = cargar_packs()
-        total_reseteados = 0
 
-        for servidor_id, servidor_packs in packs.items():
-            for usuario_id, usuario_packs in servidor_packs.items():
-                usuario_packs["packs_opened"] = 0
-                total_reseteados += 1
+    @app_commands.default_permissions()
+    @app_commands.check(lambda i: i.user.id == OWNER_ID)
+    @app_commands.command(
+        name="storage_stats",
+        description="(Owner only) Shows storage latency per operation and today's reads/writes per command."
+    )
+    async def storage_stats(self, interaction: discord.Interaction):
+        """Muestra p50/p95/p99 por operación y las lecturas/escrituras de hoy por comando."""
+        r = metricas_almacen.resumen()
+        operaciones = "\n".join(
+            f"  `{o['operacion']}` ({o['coleccion']}): {o['llamadas']} calls, "
+            f"p50 {o['p50_ms']:.1f} / p95 {o['p95_ms']:.1f} / p99 {o['p99_ms']:.1f} ms"
+            + (f", {o['errores']} errors" if o["errores"] else "")
+            for o in r["operaciones"][:10]
+        ) or "  (none yet)"
+        hoy = r["por_dia"].get(max(r["por_dia"], default=""), {})
+        comandos = "\n".join(
+            f"  `{comando}`: {c.get('lecturas', 0)} reads, {c.get('escrituras', 0)} writes, "
+            f"{c.get('bytes', 0) / 1024:.1f} KiB"
+            for comando, c in sorted(hoy.items(), key=lambda x: -(x[1].get("lecturas", 0) + x[1].get("escrituras", 0)))[:10]
+        ) or "  (none yet)"
+        total_lecturas = sum(c.get("lecturas", 0) for c in hoy.values())
+        total_escrituras = sum(c.get("escrituras", 0) for c in hoy.values())
+        res = resiliencia.estadisticas()
+        await interaction.response.send_message(
+            f"💾 **Storage latency** (backend: {fs.backend().nombre})\n{operaciones}\n\n"
+            f"📈 **Today (UTC)**: {total_lecturas} reads, {total_escrituras} writes\n{comandos}\n\n"
+            f"🛡️ **Resilience**: circuit {res['estado']} (opened {res['aperturas']}x), "
+            f"{res['reintentos']} retries, {res['rechazadas']} fast failures, "
+            f"{res['obsoletas']} stale reads, {res['plazos']} deadlines exceeded",
+            ephemeral=True
+        )
 
-        guardar_packs(packs)
 
+    @app_commands.default_permissions()
+    @app_commands.check(lambda i: i.user.id == OWNER_ID)
+    @app_commands.command(
+        name="cache_stats",
+        description="(Owner only) Shows hit/miss counters of the settings cache and shared reads."
+    )
+    async def cache_stats(self, interaction: discord.Interaction):
+        """Muestra aciertos, fallos y modo de la caché de settings y las lecturas compartidas."""
+        e = cache_settings.estadisticas()
+        ultima = f"<t:{int(e['ultima_actualizacion'])}:R>" if e["ultima_actualizacion"] else "never"
+        lec = lecturas.estadisticas()
+        documentos = "\n".join(
+            f"  `{doc}`: {n} fetched, {compartidas} shared, {aciertos} cached"
+            for doc, n, compartidas, aciertos in lec["por_documento"]
+        ) or "  (none yet)"
         await interaction.response.send_message(
-            f"✅ Reset completed. packs_opened has been reset to 0 for {total_reseteados} users.",
+            f"🗂️ **Settings cache** ({e['modo']})\n"
+            f"- Hits: {e['aciertos']}\n"
+            f"- Misses: {e['fallos']}\n"
+            f"- Hit ratio: {e['ratio'] * 100:.1f}%\n"
+            f"- Refreshes: {e['actualizaciones']} (last {ultima})\n\n"
+            f"📚 **Inventory/deck reads**\n"
+            f"- Fetched: {lec['lecturas']}\n"
+            f"- Shared in flight: {lec['compartidas']}\n"
+            f"- Served from cache: {lec['aciertos']}\n"
+            f"- Round-trips saved: {lec['ahorro'] * 100:.1f}%\n"
+            f"- Busiest documents:\n{documentos}",
             ephemeral=True
         )
-        
-    
+
+
     @app_commands.default_permissions()
     @app_commands.check(lambda i: i.user.id == OWNER_ID)
     @app_commands.command(
@@ -573,7 +647,7 @@ class Debug(commands.Cog):
         await interaction.response.defer(ephemeral=True)
     
         # Leer documento gigante
-        doc = db.collection("propiedades").document("global").get()
+        doc = await en_hilo(_db().collection("propiedades").document("global").get)
         propiedades = doc.to_dict()
     
         if not propiedades:
@@ -587,19 +661,21 @@ class Debug(commands.Cog):
             if not isinstance(usuarios, dict):
                 continue
             
-            server_ref = db.collection("inventario").document(server_id)
-            server_doc = server_ref.get().to_dict() or {}
+            server_ref = _db().collection("inventario").document(server_id)
+            server_doc = (await en_hilo(server_ref.get)).to_dict() or {}
+            nuevos = {}
     
             for user_id, cartas in usuarios.items():
                 # Si ya existe, no sobrescribimos
                 if user_id in server_doc:
                     continue
                 
-                server_doc[user_id] = cartas
+                nuevos[user_id] = inventario.a_mapa(cartas)
                 migrated_users += 1
     
-            # Guardar documento del servidor
-            server_ref.set(server_doc, merge=True)
+            # Guardar solo los usuarios nuevos para no pisar incrementos concurrentes
+            if nuevos:
+                await en_hilo(server_ref.set, nuevos, merge=True)
             migrated_servers += 1
     
         await interaction.followup.send(
@@ -609,7 +685,64 @@ class Debug(commands.Cog):
             f"⚠️ No data was deleted from propiedades/global.",
             ephemeral=True
         )
-            
+
+
+    @app_commands.default_permissions()
+    @app_commands.check(lambda i: i.user.id == OWNER_ID)
+    @app_commands.command(
+        name="migrate_inventory_maps",
+        description="Converts every inventory still stored as a list into the {card_id: copies} map format."
+    )
+    async def migrate_inventory_maps(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        servidores, usuarios = await migrar_inventarios()
+
+        await interaction.followup.send(
+            f"✅ Inventory maps migration completed.\n"
+            f"📁 Servers checked: **{servidores}**\n"
+            f"👤 Users converted: **{usuarios}**",
+            ephemeral=True
+        )
+
+
+    @app_commands.default_permissions()
+    @app_commands.check(lambda i: i.user.id == OWNER_ID)
+    @app_commands.command(
+        name="migrate_packs_docs",
+        description="Copies pack state from 'packs/global' to one document per user (no deletion)."
+    )
+    async def migrate_packs_docs(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        usuarios = await migrar_packs_global()
+
+        await interaction.followup.send(
+            f"✅ Packs migration completed.\n"
+            f"👤 Users copied: **{usuarios}**\n"
+            f"⚠️ No data was deleted from packs/global.",
+            ephemeral=True
+        )
+
+
+    @app_commands.default_permissions()
+    @app_commands.check(lambda i: i.user.id == OWNER_ID)
+    @app_commands.command(
+        name="migrate_settings_docs",
+        description="Copies each guild's config from 'settings/global' to its own document (no deletion)."
+    )
+    async def migrate_settings_docs(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        servidores = await migrar_settings_guilds()
+
+        await interaction.followup.send(
+            f"✅ Settings migration completed.\n"
+            f"📁 Guilds copied: **{servidores}**\n"
+            f"⚠️ No data was deleted from settings/global.",
+            ephemeral=True
+        )
+
 
 # Setup del cog
 async def setup(bot: commands.Bot):
@@ -2,7 +2,6 @@ import discord
 from discord.ext import commands
 import asyncio
 from discord import app_commands
-from core.firebase_client import db
 import json
 import os
 
@@ -0,0 +1,68 @@
+"""
+Autocompletado de nombres de carta para los comandos slash.
+
+Todas las respuestas salen de memoria (índice de core/busqueda y vistas de
+core/propiedad), así cada pulsación se contesta muy por debajo de los 3 s
+que concede Discord y sin leer de Firestore.
+"""
+import discord
+from discord import app_commands
+
+from core import propiedad
+from core.busqueda import indice_busqueda
+
+# Discord admite como máximo 25 opciones y 100 caracteres por opción
+MAX_OPCIONES = 25
+MAX_LARGO = 100
+
+
+def _opciones(cartas, copias: dict[str, int] | None = None) -> list[app_commands.Choice[str]]:
+    opciones = []
+    for c in cartas:
+        nombre = c["nombre"][:MAX_LARGO]
+        etiqueta = nombre
+        n = copias.get(str(c["id"]), 0) if copias else 0
+        if n > 1:
+            etiqueta = f"{nombre} (x{n})"[:MAX_LARGO]
+        opciones.append(app_commands.Choice(name=etiqueta, value=nombre))
+    return opciones
+
+
+async def carta_catalogo(interaction: discord.Interaction, actual: str) -> list[app_commands.Choice[str]]:
+    """Cualquier carta del catálogo (/show)."""
+    return _opciones(indice_busqueda().sugerir(actual, MAX_OPCIONES))
+
+
+async def carta_disponible(interaction: discord.Interaction, actual: str) -> list[app_commands.Choice[str]]:
+    """
+    Cartas propias que no están reservadas en mazos (/gift, /trade, /discard,
+    /deck_add). Si la vista del usuario aún no está en memoria se sugiere el
+    catálogo completo y se precarga para las siguientes pulsaciones.
+    """
+    if interaction.guild is None:
+        return []
+    sid, uid = str(interaction.guild.id), str(interaction.user.id)
+
+    vista = propiedad.vista_en_cache(sid, uid)
+    if vista is None:
+        propiedad.precargar(sid, uid)
+        return await carta_catalogo(interaction, actual)
+
+    disponibles = vista.disponibles()
+    cartas = indice_busqueda().sugerir(actual, MAX_OPCIONES, permitidas=disponibles.keys())
+    return _opciones(cartas, disponibles)
+
+
+async def carta_en_mazos(interaction: discord.Interaction, actual: str) -> list[app_commands.Choice[str]]:
+    """Cartas que el usuario tiene en alguno de sus mazos (/deck_remove)."""
+    if interaction.guild is None:
+        return []
+    sid, uid = str(interaction.guild.id), str(interaction.user.id)
+
+    vista = propiedad.vista_en_cache(sid, uid)
+    if vista is None:
+        propiedad.precargar(sid, uid)
+        return await carta_catalogo(interaction, actual)
+
+    cartas = indice_busqueda().sugerir(actual, MAX_OPCIONES, permitidas=vista.en_mazos.keys())
+    return _opciones(cartas)
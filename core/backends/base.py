@@ -0,0 +1,163 @@
+"""
+Interfaz común de los backends de almacenamiento.
+
+Todo el bot guarda y lee a través de core/firebase_storage, que delega en el
+backend elegido con la variable de entorno STORAGE_BACKEND:
+
+    firestore  (por defecto) Firestore, core/backends/firestore.py
+    memoria    diccionarios en memoria, core/backends/memoria.py (CI, benchmarks)
+    sqlite     un archivo local, core/backends/sqlite.py (STORAGE_SQLITE_PATH)
+
+Los formatos de datos son los mismos en todos: inventarios {id_carta: copias},
+mazos A/B/C, un registro de packs por usuario y configuración por servidor.
+Las operaciones son síncronas; core/firebase_async las lleva al pool de hilos.
+"""
+from typing import Dict, List
+
+from core import inventario
+
+LETRAS_MAZO = ("A", "B", "C")
+
+
+class StorageBackend:
+    """Operaciones de persistencia. Cada backend implementa todas salvo las opcionales."""
+
+    nombre = "base"
+
+    # ------------------------------
+    # Settings
+    # ------------------------------
+    def cargar_settings(self) -> Dict:
+        """Documento global de settings."""
+        raise NotImplementedError
+
+    def guardar_settings(self, settings: Dict) -> None:
+        """Fusiona `settings` con el documento global (merge)."""
+        raise NotImplementedError
+
+    def cargar_settings_guilds(self) -> Dict[str, Dict]:
+        """{guild_id: configuración} de todos los servidores."""
+        raise NotImplementedError
+
+    def guardar_settings_guilds(self, cambios: Dict[str, Dict]) -> None:
+        """
+        Escribe {guild_id: {campo: valor}} de una vez, con merge: solo se tocan
+        los servidores y campos indicados. Un valor None borra el campo.
+        """
+        raise NotImplementedError
+
+    def escuchar_settings_guilds(self, callback):
+        """
+        Opcional. Llama a callback(snapshots, cambios, read_time) cuando cambia
+        la configuración. Sin listener, core/cache_settings sondea.
+        """
+        raise NotImplementedError
+
+    def migrar_settings_guilds(self) -> int:
+        """Copia el formato antiguo a documentos por servidor. Solo Firestore lo tiene."""
+        return 0
+
+    def backup_settings(self, settings: Dict) -> None:
+        raise NotImplementedError
+
+    # ------------------------------
+    # Propiedades (formato antiguo)
+    # ------------------------------
+    def cargar_propiedades(self) -> Dict:
+        raise NotImplementedError
+
+    def guardar_propiedades(self, servidor_id: str, usuario_id: str, cartas: list) -> None:
+        raise NotImplementedError
+
+    # ------------------------------
+    # Packs
+    # ------------------------------
+    def cargar_pack_usuario(self, servidor_id: str, usuario_id: str) -> Dict:
+        """Registro de packs de un usuario ({} si no tiene)."""
+        raise NotImplementedError
+
+    def guardar_pack_usuario(self, servidor_id: str, usuario_id: str, datos: Dict) -> None:
+        """Fusiona `datos` con el registro del usuario (merge)."""
+        raise NotImplementedError
+
+    def cargar_packs(self) -> Dict:
+        """Todos los registros como {servidor: {usuario: datos}}. Solo backups y owner."""
+        raise NotImplementedError
+
+    def guardar_packs(self, packs: Dict) -> None:
+        """Escribe {servidor: {usuario: datos}} con merge por usuario."""
+        raise NotImplementedError
+
+    def migrar_packs_global(self) -> int:
+        return 0
+
+    # ------------------------------
+    # Mazos
+    # ------------------------------
+    def cargar_datos_mazos(self, servidor_id: str, usuario_id: str) -> Dict:
+        """Entrada del usuario: mazos A, B, C y, si se guardan, sus reservas."""
+        raise NotImplementedError
+
+    def guardar_mazo(self, servidor_id: str, usuario_id: str, letra_mazo: str, cartas: List[int]) -> None:
+        """Reemplaza un mazo y actualiza las reservas del usuario de forma atómica."""
+        raise NotImplementedError
+
+    def cargar_mazos(self, servidor_id: str, usuario_id: str) -> Dict[str, List[int]]:
+        datos = self.cargar_datos_mazos(servidor_id, usuario_id)
+        return {letra: list(datos.get(letra, [])) for letra in LETRAS_MAZO}
+
+    def cargar_reservas(self, servidor_id: str, usuario_id: str) -> Dict[str, int]:
+        return inventario.reservas(self.cargar_datos_mazos(servidor_id, usuario_id))
+
+    def cargar_mazo(self, servidor_id: str, usuario_id: str, letra_mazo: str) -> List[int]:
+        return self.cargar_mazos(servidor_id, usuario_id).get(letra_mazo, [])
+
+    # ------------------------------
+    # Inventario
+    # ------------------------------
+    def agregar_cartas_inventario(self, server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
+        """Suma una copia por cada ID sin leer antes ni perder altas concurrentes."""
+        raise NotImplementedError
+
+    def quitar_cartas_inventario(self, server_id: str, user_id: str, cartas_a_quitar: list[str]) -> bool:
+        """Quita una copia por ID. False (y sin escribir) si falta alguna."""
+        raise NotImplementedError
+
+    def cargar_inventario_usuario(self, server_id: str, user_id: str) -> dict[str, int]:
+        raise NotImplementedError
+
+    def transferir_cartas(self, server_id: str, movimientos: list) -> None:
+        """
+        Valida y aplica una lista de transferencias.Movimiento de forma atómica.
+        Lanza transferencias.TransferenciaRechazada sin escribir nada.
+        """
+        raise NotImplementedError
+
+    # Documentos que caben en una escritura de aplicar_incrementos (None: sin límite)
+    max_documentos_lote: int | None = None
+
+    def aplicar_incrementos(self, incrementos: Dict[str, Dict[str, Dict[str, int]]], marca: str | None = None) -> None:
+        """
+        Suma {servidor: {usuario: {id_carta: copias}}} en una sola escritura
+        atómica. Si hay `marca`, se guarda en esa misma escritura para poder
+        saber después si se aplicó (core/inventario_diferido).
+        """
+        raise NotImplementedError
+
+    def marca_aplicada(self, marca: str) -> bool:
+        raise NotImplementedError
+
+    def borrar_marcas(self, marcas: list[str]) -> None:
+        raise NotImplementedError
+
+    def migrar_inventario_servidor(self, server_id: str) -> int:
+        return 0
+
+    def migrar_inventarios(self) -> tuple[int, int]:
+        return 0, 0
+
+    def calentar(self) -> None:
+        """Abre la conexión con una llamada barata para que el primer comando no pague el arranque."""
+
+    def cerrar(self) -> None:
+        """Libera conexiones o archivos abiertos."""
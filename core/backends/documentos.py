@@ -0,0 +1,96 @@
+"""
+Semántica de escritura de Firestore sobre diccionarios.
+
+La usan los backends locales (memoria y SQLite) para que set con merge,
+update con rutas "usuario.carta", Increment y DELETE_FIELD se comporten como
+en Firestore: la lógica de alto nivel no depende del backend.
+"""
+import copy
+
+
+class Incremento:
+    """Equivalente a firestore.Increment(n): suma sobre el valor actual (0 si no hay)."""
+
+    def __init__(self, n: int):
+        self.n = n
+
+
+class _Borrar:
+    def __repr__(self):
+        return "BORRAR"
+
+
+# Equivalente a firestore.DELETE_FIELD
+BORRAR = _Borrar()
+
+
+def _resolver(actual, valor):
+    if isinstance(valor, Incremento):
+        if isinstance(actual, bool) or not isinstance(actual, (int, float)):
+            actual = 0
+        return actual + valor.n
+    return copy.deepcopy(valor)
+
+
+def escribir_ruta(doc: dict, partes: list[str], valor) -> None:
+    """Escribe `valor` en doc[p0][p1]... creando los mapas intermedios."""
+    destino = doc
+    for parte in partes[:-1]:
+        siguiente = destino.get(parte)
+        if not isinstance(siguiente, dict):
+            if valor is BORRAR:
+                return
+            siguiente = destino[parte] = {}
+        destino = siguiente
+    clave = partes[-1]
+    if valor is BORRAR:
+        destino.pop(clave, None)
+    else:
+        destino[clave] = _resolver(destino.get(clave), valor)
+
+
+def actualizar(doc: dict, cambios: dict) -> None:
+    """update(): cada clave es una ruta con puntos y su valor reemplaza ese campo entero."""
+    for ruta, valor in cambios.items():
+        escribir_ruta(doc, ruta.split("."), valor)
+
+
+def fusionar(doc: dict, datos: dict, _prefijo: tuple = ()) -> None:
+    """set(merge=True): los mapas anidados se fusionan campo a campo."""
+    for clave, valor in datos.items():
+        partes = [*_prefijo, clave]
+        if isinstance(valor, dict) and valor:
+            fusionar(doc, valor, tuple(partes))
+        elif isinstance(valor, dict):
+            # Un mapa vacío solo crea el campo si aún no es un mapa
+            if not isinstance(leer_ruta(doc, partes), dict):
+                escribir_ruta(doc, partes, {})
+        else:
+            escribir_ruta(doc, partes, valor)
+
+
+def crear(datos: dict) -> dict:
+    """set() sin merge: documento nuevo con los centinelas ya resueltos."""
+    doc = {}
+    fusionar(doc, datos)
+    return doc
+
+
+def leer_ruta(doc: dict, partes: list[str]):
+    valor = doc
+    for parte in partes:
+        if not isinstance(valor, dict) or parte not in valor:
+            return None
+        valor = valor[parte]
+    return valor
+
+
+def proyectar(doc: dict, rutas: list[str]) -> dict:
+    """get(field_paths=...): copia del documento con solo esas rutas."""
+    resultado = {}
+    for ruta in rutas:
+        partes = ruta.split(".")
+        valor = leer_ruta(doc, partes)
+        if valor is not None:
+            escribir_ruta(resultado, partes, valor)
+    return resultado
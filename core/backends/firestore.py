@@ -0,0 +1,432 @@
+"""
+Backend de Firestore (el de producción).
+
+Estructura:
+    settings/global                          settings globales
+    settings/global/guilds/{guild_id}        configuración de cada servidor
+    packs/{servidor_id}/usuarios/{usuario}   registro de packs de cada usuario
+    mazos/{servidor_id}                      {usuario: {A, B, C, reservas}}
+    inventario/{servidor_id}                 {usuario: {id_carta: copias}}
+
+packs/global, el mapa "guilds" de settings/global y los inventarios en forma
+de lista son formatos antiguos que se siguen leyendo hasta migrarlos.
+"""
+import datetime
+from typing import Dict, List
+
+from firebase_admin import firestore
+
+from core import inventario, transferencias
+from core.backends.base import LETRAS_MAZO, StorageBackend
+from core.resiliencia import plazo_restante
+
+# Colecciones y documentos
+SETTINGS_COLLECTION = "settings"
+SETTINGS_DOC = "global"
+SETTINGS_GUILDS = "guilds"
+
+PROPIEDADES_COLLECTION = "propiedades"
+PROPIEDADES_DOC = "global"
+
+PACKS_COLLECTION = "packs"
+PACKS_DOC = "global"
+PACKS_USUARIOS = "usuarios"
+
+MAZOS_COLLECTION = "mazos"
+INVENTARIO_COLLECTION = "inventario"
+# Marcas de los lotes ya aplicados por la escritura diferida del inventario
+MARCAS_COLLECTION = "inventario_marcas"
+
+LOTE_MAXIMO = 500  # escrituras por lote de Firestore
+
+
+def _campo(*partes: str) -> str:
+    """
+    Ruta de campo para las máscaras de lectura (field_paths). get() la manda
+    tal cual y un segmento que empieza por dígito (todo ID de Discord) tiene
+    que ir entre comillas invertidas; FieldPath se encarga.
+    """
+    return firestore.FieldPath(*partes).to_api_repr()
+
+
+def _plazo() -> dict:
+    """
+    timeout= y retry= para cada llamada: lo que le queda a la operación
+    (core/resiliencia) y sin los reintentos propios del cliente, que podrían
+    alargarla hasta un minuto y ya los hace @resiliente. Así un Firestore
+    colgado devuelve el hilo del pool a tiempo. Fuera de @resiliente
+    (migraciones, backups masivos) se dejan los valores del cliente.
+    """
+    restante = plazo_restante()
+    return {} if restante is None else {"timeout": restante, "retry": None}
+
+
+@firestore.transactional
+def _guardar_mazo_en_transaccion(transaction, doc_ref, usuario_id: str, letra_mazo: str, cartas: List[int]) -> None:
+    snap = doc_ref.get(field_paths=[_campo(usuario_id)], transaction=transaction, **_plazo())
+    datos = (snap.to_dict() or {}).get(usuario_id, {}) if snap.exists else {}
+
+    mazos = {letra: list(datos.get(letra, [])) for letra in LETRAS_MAZO}
+    mazos[letra_mazo] = cartas
+
+    # merge con rutas exactas: se reemplazan el mazo y las reservas del
+    # usuario sin tocar sus otros mazos ni al resto del servidor
+    transaction.set(
+        doc_ref,
+        {
+            usuario_id: {
+                letra_mazo: cartas,
+                "reservas": inventario.contar_reservas(mazos)
+            }
+        },
+        merge=[f"{usuario_id}.{letra_mazo}", f"{usuario_id}.reservas"]
+    )
+
+
+@firestore.transactional
+def _migrar_en_transaccion(transaction, server_ref) -> int:
+    data = server_ref.get(transaction=transaction, **_plazo()).to_dict() or {}
+    antiguos = {
+        user_id: inventario.a_mapa(valor)
+        for user_id, valor in data.items()
+        if inventario.es_formato_antiguo(valor)
+    }
+    if antiguos:
+        transaction.update(server_ref, antiguos)
+    return len(antiguos)
+
+
+@firestore.transactional
+def _quitar_en_transaccion(transaction, server_ref, user_id: str, cartas_a_quitar: list[str]) -> bool:
+    snap = server_ref.get(field_paths=[_campo(user_id)], transaction=transaction, **_plazo())
+    valor = (snap.to_dict() or {}).get(user_id)
+    antes = inventario.a_mapa(valor)
+    mapa = dict(antes)
+
+    if not inventario.restar(mapa, cartas_a_quitar):
+        return False
+
+    if inventario.es_formato_antiguo(valor):
+        # Usuario aún en formato lista: se reescribe ya como mapa
+        transaction.update(server_ref, {user_id: mapa})
+    else:
+        transaction.update(server_ref, {
+            f"{user_id}.{cid}": mapa.get(cid, firestore.DELETE_FIELD)
+            for cid in antes
+            if mapa.get(cid) != antes[cid]
+        })
+    return True
+
+
+@firestore.transactional
+def _transferir_en_transaccion(transaction, db, server_id: str, movimientos: list) -> None:
+    inv_ref = db.collection(INVENTARIO_COLLECTION).document(server_id)
+    mazos_ref = db.collection(MAZOS_COLLECTION).document(server_id)
+    usuarios = transferencias.usuarios_implicados(movimientos)
+
+    # Inventario y mazos de los implicados en una sola lectura
+    datos = {}
+    campos = [_campo(uid) for uid in usuarios]
+    for snap in db.get_all([inv_ref, mazos_ref], field_paths=campos, transaction=transaction, **_plazo()):
+        datos[snap.reference.path] = snap.to_dict() or {}
+    inventarios = datos.get(inv_ref.path, {})
+    mazos = datos.get(mazos_ref.path, {})
+
+    despues = transferencias.aplicar(inventarios, mazos, movimientos)
+
+    actualizacion = {}
+    for uid, mapa in despues.items():
+        valor = inventarios.get(uid)
+        if inventario.es_formato_antiguo(valor):
+            # Usuario aún en formato lista: se reescribe ya como mapa
+            actualizacion[uid] = mapa
+            continue
+        for cid, copias in transferencias.cambios(inventario.a_mapa(valor), mapa).items():
+            actualizacion[f"{uid}.{cid}"] = copias if copias is not None else firestore.DELETE_FIELD
+
+    # El documento existe: la validación exige que cada origen tenga la carta
+    if actualizacion:
+        transaction.update(inv_ref, actualizacion)
+
+
+class BackendFirestore(StorageBackend):
+    nombre = "firestore"
+
+    def __init__(self, db=None):
+        # Sin db, el cliente se crea en el primer acceso (core/firebase_client)
+        self._db = db
+        # Servidores cuyo documento ya no tiene usuarios en el formato antiguo
+        # (lista). Una vez migrado nadie vuelve a escribir listas, así que basta
+        # con comprobarlo una vez por proceso.
+        self._servidores_migrados: set[str] = set()
+
+    @property
+    def db(self):
+        if self._db is None:
+            # Import diferido: inicializa Firebase y exige FIREBASE_CREDENTIALS_JSON
+            from core.firebase_client import obtener_db
+            self._db = obtener_db()
+        return self._db
+
+    def calentar(self) -> None:
+        # Crea el cliente y abre el canal gRPC con una lectura proyectada a un
+        # campo que no existe (un documento leído, sin datos)
+        self._settings_ref().get(field_paths=["_calentar"])
+
+    def _commit_por_lotes(self, escrituras) -> None:
+        """Aplica (ref, datos) con set(merge=True) en lotes de LOTE_MAXIMO."""
+        lote, pendientes = self.db.batch(), 0
+        for ref, datos in escrituras:
+            lote.set(ref, datos, merge=True)
+            pendientes += 1
+            if pendientes == LOTE_MAXIMO:
+                lote.commit(**_plazo())
+                lote, pendientes = self.db.batch(), 0
+        if pendientes:
+            lote.commit(**_plazo())
+
+    # ------------------------------
+    # Settings
+    # ------------------------------
+    def _settings_ref(self):
+        return self.db.collection(SETTINGS_COLLECTION).document(SETTINGS_DOC)
+
+    def _settings_guilds_ref(self):
+        return self._settings_ref().collection(SETTINGS_GUILDS)
+
+    def cargar_settings(self) -> Dict:
+        doc = self._settings_ref().get(**_plazo())
+        return doc.to_dict() if doc.exists else {}
+
+    def guardar_settings(self, settings: Dict) -> None:
+        # merge=True para no borrar otras claves
+        self._settings_ref().set(settings, merge=True, **_plazo())
+
+    def cargar_settings_guilds(self) -> Dict[str, Dict]:
+        return {doc.id: doc.to_dict() or {} for doc in self._settings_guilds_ref().stream(**_plazo())}
+
+    def guardar_settings_guilds(self, cambios: Dict[str, Dict]) -> None:
+        self._commit_por_lotes(
+            (
+                self._settings_guilds_ref().document(str(guild_id)),
+                {
+                    campo: firestore.DELETE_FIELD if valor is None else valor
+                    for campo, valor in campos.items()
+                },
+            )
+            for guild_id, campos in cambios.items()
+        )
+
+    def escuchar_settings_guilds(self, callback):
+        # Devuelve el watch (tiene .unsubscribe())
+        return self._settings_guilds_ref().on_snapshot(callback)
+
+    def migrar_settings_guilds(self) -> int:
+        """
+        Copia settings/global["guilds"] a documentos por servidor. Los servidores
+        que ya tienen documento no se tocan. Devuelve cuántos se han copiado.
+        """
+        antiguos = self.cargar_settings().get("guilds", {})
+        existentes = self.cargar_settings_guilds()
+        nuevos = {
+            guild_id: config
+            for guild_id, config in antiguos.items()
+            if guild_id not in existentes and isinstance(config, dict)
+        }
+        self.guardar_settings_guilds(nuevos)
+        return len(nuevos)
+
+    def backup_settings(self, settings: Dict) -> None:
+        timestamp = datetime.datetime.now().isoformat()
+        self.db.collection("settings_backup").document(timestamp).set(settings, **_plazo())
+
+    # ------------------------------
+    # Propiedades (formato antiguo)
+    # ------------------------------
+    def cargar_propiedades(self) -> Dict:
+        doc = self.db.collection(PROPIEDADES_COLLECTION).document(PROPIEDADES_DOC).get(**_plazo())
+        return doc.to_dict() if doc.exists else {}
+
+    def guardar_propiedades(self, servidor_id: str, usuario_id: str, cartas: list) -> None:
+        self.db.collection(PROPIEDADES_COLLECTION).document(PROPIEDADES_DOC).update({
+            f"{servidor_id}.{usuario_id}": cartas
+        }, **_plazo())
+
+    # ------------------------------
+    # Packs
+    # ------------------------------
+    def _pack_ref(self, servidor_id: str, usuario_id: str):
+        return (
+            self.db.collection(PACKS_COLLECTION).document(servidor_id)
+            .collection(PACKS_USUARIOS).document(usuario_id)
+        )
+
+    def cargar_pack_usuario(self, servidor_id: str, usuario_id: str) -> Dict:
+        """
+        Si el usuario aún no tiene documento propio se busca en packs/global
+        (leyendo solo su campo) y se copia.
+        """
+        ref = self._pack_ref(servidor_id, usuario_id)
+        doc = ref.get(**_plazo())
+        if doc.exists:
+            return doc.to_dict() or {}
+
+        antiguo = self.db.collection(PACKS_COLLECTION).document(PACKS_DOC).get(
+            field_paths=[_campo(servidor_id, usuario_id)], **_plazo()
+        )
+        datos = ((antiguo.to_dict() or {}).get(servidor_id) or {}).get(usuario_id) if antiguo.exists else None
+        if datos:
+            ref.set(datos, **_plazo())
+            return dict(datos)
+        return {}
+
+    def guardar_pack_usuario(self, servidor_id: str, usuario_id: str, datos: Dict) -> None:
+        self._pack_ref(servidor_id, usuario_id).set(datos, merge=True, **_plazo())
+
+    def cargar_packs(self) -> Dict:
+        packs = {}
+        for doc in self.db.collection_group(PACKS_USUARIOS).stream(**_plazo()):
+            servidor_ref = doc.reference.parent.parent
+            if servidor_ref is None or servidor_ref.parent.id != PACKS_COLLECTION:
+                continue
+            packs.setdefault(servidor_ref.id, {})[doc.id] = doc.to_dict() or {}
+        return packs
+
+    def guardar_packs(self, packs: Dict) -> None:
+        self._commit_por_lotes(
+            (self._pack_ref(servidor_id, usuario_id), datos)
+            for servidor_id, usuarios in packs.items()
+            for usuario_id, datos in usuarios.items()
+        )
+
+    def migrar_packs_global(self) -> int:
+        """
+        Copia packs/global a documentos por usuario. Los usuarios que ya tienen
+        documento propio no se tocan. Devuelve cuántos usuarios se han copiado.
+        """
+        doc = self.db.collection(PACKS_COLLECTION).document(PACKS_DOC).get(**_plazo())
+        antiguos = doc.to_dict() if doc.exists else {}
+        existentes = self.cargar_packs()
+
+        nuevos = {}
+        for servidor_id, usuarios in (antiguos or {}).items():
+            if not isinstance(usuarios, dict):
+                continue
+            for usuario_id, datos in usuarios.items():
+                if usuario_id not in existentes.get(servidor_id, {}) and isinstance(datos, dict):
+                    nuevos.setdefault(servidor_id, {})[usuario_id] = datos
+
+        self.guardar_packs(nuevos)
+        return sum(len(u) for u in nuevos.values())
+
+    # ------------------------------
+    # Mazos
+    # ------------------------------
+    def cargar_datos_mazos(self, servidor_id: str, usuario_id: str) -> Dict:
+        # Una sola lectura y solo del campo del usuario
+        doc = self.db.collection(MAZOS_COLLECTION).document(servidor_id).get(field_paths=[_campo(usuario_id)], **_plazo())
+        if not doc.exists:
+            return {}
+        return (doc.to_dict() or {}).get(usuario_id, {})
+
+    def guardar_mazo(self, servidor_id: str, usuario_id: str, letra_mazo: str, cartas: List[int]) -> None:
+        # Crea el documento si no existe todavía
+        doc_ref = self.db.collection(MAZOS_COLLECTION).document(servidor_id)
+        _guardar_mazo_en_transaccion(self.db.transaction(), doc_ref, usuario_id, letra_mazo, list(cartas))
+
+    # ------------------------------
+    # Inventario
+    # ------------------------------
+    # Cada usuario se guarda en inventario/{server_id} como un mapa {id_carta: copias}.
+    # Las altas son incrementos atómicos sin lectura previa y las bajas, que
+    # necesitan comprobar las copias, van en una transacción.
+    def _inventario_ref(self, server_id: str):
+        return self.db.collection(INVENTARIO_COLLECTION).document(server_id)
+
+    def migrar_inventario_servidor(self, server_id: str) -> int:
+        """
+        Convierte a mapa todos los usuarios del servidor que sigan en formato lista.
+        Devuelve cuántos usuarios se han migrado.
+        """
+        migrados = _migrar_en_transaccion(self.db.transaction(), self._inventario_ref(server_id))
+        self._servidores_migrados.add(server_id)
+        return migrados
+
+    def migrar_inventarios(self) -> tuple[int, int]:
+        servidores = usuarios = 0
+        for doc in self.db.collection(INVENTARIO_COLLECTION).list_documents():
+            usuarios += self.migrar_inventario_servidor(doc.id)
+            servidores += 1
+        return servidores, usuarios
+
+    def agregar_cartas_inventario(self, server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
+        if server_id not in self._servidores_migrados:
+            self.migrar_inventario_servidor(server_id)
+
+        conteo = inventario.sumar({}, nuevas_cartas)
+        if not conteo:
+            return
+
+        # merge=True fusiona campo a campo: solo se tocan las cartas añadidas
+        self._inventario_ref(server_id).set(
+            {user_id: {cid: firestore.Increment(n) for cid, n in conteo.items()}},
+            merge=True,
+            **_plazo()
+        )
+
+    # Un documento por servidor más la marca
+    max_documentos_lote = LOTE_MAXIMO - 1
+
+    def aplicar_incrementos(self, incrementos: Dict[str, Dict[str, Dict[str, int]]], marca: str | None = None) -> None:
+        for server_id in incrementos:
+            if server_id not in self._servidores_migrados:
+                self.migrar_inventario_servidor(server_id)
+
+        # Una escritura por servidor con todos sus usuarios, en un único WriteBatch
+        lote = self.db.batch()
+        for server_id, usuarios in incrementos.items():
+            lote.set(
+                self._inventario_ref(server_id),
+                {
+                    user_id: {cid: firestore.Increment(n) for cid, n in conteo.items()}
+                    for user_id, conteo in usuarios.items()
+                },
+                merge=True
+            )
+        if marca is not None:
+            lote.set(self.db.collection(MARCAS_COLLECTION).document(marca), {"aplicada": firestore.SERVER_TIMESTAMP})
+        lote.commit(**_plazo())
+
+    def marca_aplicada(self, marca: str) -> bool:
+        return self.db.collection(MARCAS_COLLECTION).document(marca).get(**_plazo()).exists
+
+    def borrar_marcas(self, marcas: list[str]) -> None:
+        for inicio in range(0, len(marcas), LOTE_MAXIMO):
+            lote = self.db.batch()
+            for marca in marcas[inicio:inicio + LOTE_MAXIMO]:
+                lote.delete(self.db.collection(MARCAS_COLLECTION).document(marca))
+            lote.commit(**_plazo())
+
+    def quitar_cartas_inventario(self, server_id: str, user_id: str, cartas_a_quitar: list[str]) -> bool:
+        return _quitar_en_transaccion(
+            self.db.transaction(), self._inventario_ref(server_id), user_id, list(cartas_a_quitar)
+        )
+
+    def cargar_inventario_usuario(self, server_id: str, user_id: str) -> dict[str, int]:
+        server_ref = self._inventario_ref(server_id)
+        # Solo se descarga el campo de este usuario, no el documento del servidor
+        data = server_ref.get(field_paths=[_campo(user_id)], **_plazo()).to_dict() or {}
+        valor = data.get(user_id)
+
+        # Migración perezosa del formato lista al formato mapa (en transacción,
+        # para no pisar incrementos que lleguen mientras tanto)
+        if inventario.es_formato_antiguo(valor):
+            self.migrar_inventario_servidor(server_id)
+            data = server_ref.get(field_paths=[_campo(user_id)], **_plazo()).to_dict() or {}
+            valor = data.get(user_id)
+
+        return inventario.a_mapa(valor)
+
+    def transferir_cartas(self, server_id: str, movimientos: list) -> None:
+        # Lee inventario y mazos de los implicados y escribe solo las entradas que cambian
+        _transferir_en_transaccion(self.db.transaction(), self.db, server_id, list(movimientos))
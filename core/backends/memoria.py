@@ -0,0 +1,221 @@
+"""
+Backend en memoria: un diccionario {ruta_documento: datos} con la misma
+estructura de documentos que Firestore y su semántica de escritura
+(core/backends/documentos). No necesita red ni credenciales: sirve para CI,
+benchmarks y probar el bot en local. Los datos se pierden al cerrar.
+
+Un único cerrojo hace de transacción: las operaciones que leen y luego
+escriben (quitar, transferir, guardar un mazo) son atómicas.
+"""
+import copy
+import datetime
+import threading
+from typing import Dict, List
+
+from core import inventario, transferencias
+from core.backends import documentos
+from core.backends.base import LETRAS_MAZO, StorageBackend
+from core.backends.documentos import BORRAR, Incremento
+
+SETTINGS = "settings/global"
+SETTINGS_GUILDS = "settings/global/guilds"
+PROPIEDADES = "propiedades/global"
+MARCAS = "inventario_marcas"
+
+
+def _pack(servidor_id: str, usuario_id: str) -> str:
+    return f"packs/{servidor_id}/usuarios/{usuario_id}"
+
+
+def _mazos(servidor_id: str) -> str:
+    return f"mazos/{servidor_id}"
+
+
+def _inventario(servidor_id: str) -> str:
+    return f"inventario/{servidor_id}"
+
+
+class BackendMemoria(StorageBackend):
+    nombre = "memoria"
+
+    def __init__(self):
+        self._docs: dict[str, dict] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------
+    # Documentos
+    # ------------------------------
+    def leer(self, ruta: str, campos: list[str] | None = None) -> dict | None:
+        """Copia del documento (None si no existe); `campos` equivale a field_paths."""
+        with self._lock:
+            doc = self._docs.get(ruta)
+            if doc is None:
+                return None
+            return documentos.proyectar(doc, campos) if campos is not None else copy.deepcopy(doc)
+
+    def set(self, ruta: str, datos: dict, merge: bool = False) -> None:
+        with self._lock:
+            if merge and ruta in self._docs:
+                documentos.fusionar(self._docs[ruta], datos)
+            else:
+                self._docs[ruta] = documentos.crear(datos)
+
+    def update(self, ruta: str, cambios: dict) -> None:
+        """Como update() de Firestore: falla si el documento no existe."""
+        with self._lock:
+            if ruta not in self._docs:
+                raise KeyError(f"No existe el documento {ruta}")
+            documentos.actualizar(self._docs[ruta], cambios)
+
+    def escribir_rutas(self, ruta: str, cambios: dict) -> None:
+        """Como set(merge=[rutas]): reemplaza esas rutas y crea el documento si falta."""
+        with self._lock:
+            documentos.actualizar(self._docs.setdefault(ruta, {}), cambios)
+
+    def coleccion(self, ruta: str) -> dict[str, dict]:
+        """{id: datos} de los documentos directamente bajo `ruta`."""
+        prefijo = ruta + "/"
+        with self._lock:
+            return {
+                r[len(prefijo):]: copy.deepcopy(d)
+                for r, d in self._docs.items()
+                if r.startswith(prefijo) and "/" not in r[len(prefijo):]
+            }
+
+    # ------------------------------
+    # Settings
+    # ------------------------------
+    def cargar_settings(self) -> Dict:
+        return self.leer(SETTINGS) or {}
+
+    def guardar_settings(self, settings: Dict) -> None:
+        self.set(SETTINGS, settings, merge=True)
+
+    def cargar_settings_guilds(self) -> Dict[str, Dict]:
+        return self.coleccion(SETTINGS_GUILDS)
+
+    def guardar_settings_guilds(self, cambios: Dict[str, Dict]) -> None:
+        with self._lock:
+            for guild_id, campos in cambios.items():
+                self.set(
+                    f"{SETTINGS_GUILDS}/{guild_id}",
+                    {campo: BORRAR if valor is None else valor for campo, valor in campos.items()},
+                    merge=True
+                )
+
+    def backup_settings(self, settings: Dict) -> None:
+        self.set(f"settings_backup/{datetime.datetime.now().isoformat()}", settings)
+
+    # ------------------------------
+    # Propiedades (formato antiguo)
+    # ------------------------------
+    def cargar_propiedades(self) -> Dict:
+        return self.leer(PROPIEDADES) or {}
+
+    def guardar_propiedades(self, servidor_id: str, usuario_id: str, cartas: list) -> None:
+        self.escribir_rutas(PROPIEDADES, {f"{servidor_id}.{usuario_id}": cartas})
+
+    # ------------------------------
+    # Packs
+    # ------------------------------
+    def cargar_pack_usuario(self, servidor_id: str, usuario_id: str) -> Dict:
+        return self.leer(_pack(servidor_id, usuario_id)) or {}
+
+    def guardar_pack_usuario(self, servidor_id: str, usuario_id: str, datos: Dict) -> None:
+        self.set(_pack(servidor_id, usuario_id), datos, merge=True)
+
+    def cargar_packs(self) -> Dict:
+        packs = {}
+        with self._lock:
+            for ruta, datos in self._docs.items():
+                partes = ruta.split("/")
+                if len(partes) == 4 and partes[0] == "packs" and partes[2] == "usuarios":
+                    packs.setdefault(partes[1], {})[partes[3]] = copy.deepcopy(datos)
+        return packs
+
+    def guardar_packs(self, packs: Dict) -> None:
+        with self._lock:
+            for servidor_id, usuarios in packs.items():
+                for usuario_id, datos in usuarios.items():
+                    self.guardar_pack_usuario(servidor_id, usuario_id, datos)
+
+    # ------------------------------
+    # Mazos
+    # ------------------------------
+    def cargar_datos_mazos(self, servidor_id: str, usuario_id: str) -> Dict:
+        return (self.leer(_mazos(servidor_id), [usuario_id]) or {}).get(usuario_id, {})
+
+    def guardar_mazo(self, servidor_id: str, usuario_id: str, letra_mazo: str, cartas: List[int]) -> None:
+        cartas = list(cartas)
+        with self._lock:
+            datos = self.cargar_datos_mazos(servidor_id, usuario_id)
+            mazos = {letra: list(datos.get(letra, [])) for letra in LETRAS_MAZO}
+            mazos[letra_mazo] = cartas
+            self.escribir_rutas(_mazos(servidor_id), {
+                f"{usuario_id}.{letra_mazo}": cartas,
+                f"{usuario_id}.reservas": inventario.contar_reservas(mazos),
+            })
+
+    # ------------------------------
+    # Inventario
+    # ------------------------------
+    def _escribir_cambios(self, server_id: str, user_id: str, antes: dict, despues: dict) -> None:
+        cambios = transferencias.cambios(antes, despues)
+        if cambios:
+            self.escribir_rutas(_inventario(server_id), {
+                f"{user_id}.{cid}": BORRAR if copias is None else copias
+                for cid, copias in cambios.items()
+            })
+
+    def agregar_cartas_inventario(self, server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
+        conteo = inventario.sumar({}, nuevas_cartas)
+        if conteo:
+            self.escribir_rutas(_inventario(server_id), {
+                f"{user_id}.{cid}": Incremento(n) for cid, n in conteo.items()
+            })
+
+    def aplicar_incrementos(self, incrementos: Dict[str, Dict[str, Dict[str, int]]], marca: str | None = None) -> None:
+        with self._lock:
+            for server_id, usuarios in incrementos.items():
+                self.escribir_rutas(_inventario(server_id), {
+                    f"{user_id}.{cid}": Incremento(n)
+                    for user_id, conteo in usuarios.items()
+                    for cid, n in conteo.items()
+                })
+            if marca is not None:
+                self.set(f"{MARCAS}/{marca}", {})
+
+    def marca_aplicada(self, marca: str) -> bool:
+        return self.leer(f"{MARCAS}/{marca}") is not None
+
+    def borrar_marcas(self, marcas: list[str]) -> None:
+        with self._lock:
+            for marca in marcas:
+                self._docs.pop(f"{MARCAS}/{marca}", None)
+
+    def quitar_cartas_inventario(self, server_id: str, user_id: str, cartas_a_quitar: list[str]) -> bool:
+        with self._lock:
+            antes = self.cargar_inventario_usuario(server_id, user_id)
+            mapa = dict(antes)
+            if not inventario.restar(mapa, cartas_a_quitar):
+                return False
+            self._escribir_cambios(server_id, user_id, antes, mapa)
+            return True
+
+    def cargar_inventario_usuario(self, server_id: str, user_id: str) -> dict[str, int]:
+        data = self.leer(_inventario(server_id), [user_id]) or {}
+        return inventario.a_mapa(data.get(user_id))
+
+    def transferir_cartas(self, server_id: str, movimientos: list) -> None:
+        movimientos = list(movimientos)
+        usuarios = transferencias.usuarios_implicados(movimientos)
+        with self._lock:
+            inventarios = self.leer(_inventario(server_id), usuarios) or {}
+            mazos = self.leer(_mazos(server_id), usuarios) or {}
+            despues = transferencias.aplicar(inventarios, mazos, movimientos)
+            for uid, mapa in despues.items():
+                self._escribir_cambios(server_id, uid, inventario.a_mapa(inventarios.get(uid)), mapa)
+
+    def migrar_inventarios(self) -> tuple[int, int]:
+        # Aquí nunca se escriben listas: no hay nada que migrar
+        return len(self.coleccion("inventario")), 0
@@ -0,0 +1,309 @@
+"""
+Backend SQLite: todo en un archivo local, para despliegues pequeños sin
+Firestore. Ruta en STORAGE_SQLITE_PATH (por defecto data/almacen.sqlite3).
+
+Inventario, mazos y packs tienen una fila por usuario (y por carta o mazo) con
+clave primaria (servidor_id, usuario_id, ...): cada consulta del bot filtra
+por un prefijo de esa clave, así que la propia clave es el índice que usa.
+Las tablas van WITHOUT ROWID para que las filas estén ordenadas por ella.
+Los datos sin estructura fija (configuración, registro de packs) se guardan
+como JSON y se fusionan con la semántica de Firestore (core/backends/documentos).
+
+Una única conexión protegida por un cerrojo: las llamadas llegan desde el pool
+de hilos de core/hilos y cada operación es una transacción.
+"""
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+from core import inventario, transferencias
+from core.backends import documentos
+from core.backends.base import LETRAS_MAZO, StorageBackend
+from core.backends.documentos import BORRAR
+
+RUTA_POR_DEFECTO = os.path.join("data", "almacen.sqlite3")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    clave TEXT PRIMARY KEY,
+    datos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings_guilds (
+    guild_id TEXT PRIMARY KEY,
+    datos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings_backup (
+    creado TEXT PRIMARY KEY,
+    datos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS propiedades (
+    servidor_id TEXT NOT NULL,
+    usuario_id TEXT NOT NULL,
+    cartas TEXT NOT NULL,
+    PRIMARY KEY (servidor_id, usuario_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS packs (
+    servidor_id TEXT NOT NULL,
+    usuario_id TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    PRIMARY KEY (servidor_id, usuario_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS mazos (
+    servidor_id TEXT NOT NULL,
+    usuario_id TEXT NOT NULL,
+    letra TEXT NOT NULL,
+    cartas TEXT NOT NULL,
+    PRIMARY KEY (servidor_id, usuario_id, letra)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS inventario (
+    servidor_id TEXT NOT NULL,
+    usuario_id TEXT NOT NULL,
+    carta_id TEXT NOT NULL,
+    copias INTEGER NOT NULL CHECK (copias > 0),
+    PRIMARY KEY (servidor_id, usuario_id, carta_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS inventario_marcas (
+    marca TEXT PRIMARY KEY
+);
+"""
+
+
+class BackendSQLite(StorageBackend):
+    nombre = "sqlite"
+
+    def __init__(self, ruta: str | None = None):
+        self.ruta = ruta or os.getenv("STORAGE_SQLITE_PATH") or RUTA_POR_DEFECTO
+        if self.ruta != ":memory:" and os.path.dirname(self.ruta):
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+
+        # isolation_level=None: las transacciones se abren a mano en _transaccion
+        self._con = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(ESQUEMA)
+
+    @contextlib.contextmanager
+    def _transaccion(self):
+        with self._lock:
+            if self._con.in_transaction:
+                # Anidada (p. ej. guardar_packs -> guardar_pack_usuario): va en la de fuera
+                yield self._con
+                return
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._con
+            except BaseException:
+                self._con.execute("ROLLBACK")
+                raise
+            self._con.execute("COMMIT")
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._con.close()
+
+    # ------------------------------
+    # Filas JSON
+    # ------------------------------
+    @staticmethod
+    def _json(fila) -> dict:
+        return json.loads(fila[0]) if fila else {}
+
+    def _fusionar_json(self, con, tabla: str, claves: dict, datos: dict) -> None:
+        """Fusiona `datos` (merge de Firestore) con el JSON de la fila indicada."""
+        donde = " AND ".join(f"{k} = ?" for k in claves)
+        actual = self._json(con.execute(f"SELECT datos FROM {tabla} WHERE {donde}", tuple(claves.values())).fetchone())
+        documentos.fusionar(actual, datos)
+        columnas = ", ".join([*claves, "datos"])
+        marcas = ", ".join("?" * (len(claves) + 1))
+        con.execute(
+            f"INSERT OR REPLACE INTO {tabla} ({columnas}) VALUES ({marcas})",
+            (*claves.values(), json.dumps(actual))
+        )
+
+    # ------------------------------
+    # Settings
+    # ------------------------------
+    def cargar_settings(self) -> Dict:
+        with self._lock:
+            return self._json(self._con.execute("SELECT datos FROM settings WHERE clave = 'global'").fetchone())
+
+    def guardar_settings(self, settings: Dict) -> None:
+        with self._transaccion() as con:
+            self._fusionar_json(con, "settings", {"clave": "global"}, settings)
+
+    def cargar_settings_guilds(self) -> Dict[str, Dict]:
+        with self._lock:
+            filas = self._con.execute("SELECT guild_id, datos FROM settings_guilds").fetchall()
+        return {guild_id: json.loads(datos) for guild_id, datos in filas}
+
+    def guardar_settings_guilds(self, cambios: Dict[str, Dict]) -> None:
+        with self._transaccion() as con:
+            for guild_id, campos in cambios.items():
+                self._fusionar_json(
+                    con, "settings_guilds", {"guild_id": str(guild_id)},
+                    {campo: BORRAR if valor is None else valor for campo, valor in campos.items()}
+                )
+
+    def backup_settings(self, settings: Dict) -> None:
+        with self._transaccion() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO settings_backup (creado, datos) VALUES (?, ?)",
+                (datetime.datetime.now().isoformat(), json.dumps(settings))
+            )
+
+    # ------------------------------
+    # Propiedades (formato antiguo)
+    # ------------------------------
+    def cargar_propiedades(self) -> Dict:
+        with self._lock:
+            filas = self._con.execute("SELECT servidor_id, usuario_id, cartas FROM propiedades").fetchall()
+        propiedades = {}
+        for servidor_id, usuario_id, cartas in filas:
+            propiedades.setdefault(servidor_id, {})[usuario_id] = json.loads(cartas)
+        return propiedades
+
+    def guardar_propiedades(self, servidor_id: str, usuario_id: str, cartas: list) -> None:
+        with self._transaccion() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO propiedades (servidor_id, usuario_id, cartas) VALUES (?, ?, ?)",
+                (servidor_id, usuario_id, json.dumps(cartas))
+            )
+
+    # ------------------------------
+    # Packs
+    # ------------------------------
+    def cargar_pack_usuario(self, servidor_id: str, usuario_id: str) -> Dict:
+        with self._lock:
+            return self._json(self._con.execute(
+                "SELECT datos FROM packs WHERE servidor_id = ? AND usuario_id = ?",
+                (servidor_id, usuario_id)
+            ).fetchone())
+
+    def guardar_pack_usuario(self, servidor_id: str, usuario_id: str, datos: Dict) -> None:
+        with self._transaccion() as con:
+            self._fusionar_json(con, "packs", {"servidor_id": servidor_id, "usuario_id": usuario_id}, datos)
+
+    def cargar_packs(self) -> Dict:
+        with self._lock:
+            filas = self._con.execute("SELECT servidor_id, usuario_id, datos FROM packs").fetchall()
+        packs = {}
+        for servidor_id, usuario_id, datos in filas:
+            packs.setdefault(servidor_id, {})[usuario_id] = json.loads(datos)
+        return packs
+
+    def guardar_packs(self, packs: Dict) -> None:
+        with self._transaccion():
+            for servidor_id, usuarios in packs.items():
+                for usuario_id, datos in usuarios.items():
+                    self.guardar_pack_usuario(servidor_id, usuario_id, datos)
+
+    # ------------------------------
+    # Mazos
+    # ------------------------------
+    def cargar_datos_mazos(self, servidor_id: str, usuario_id: str) -> Dict:
+        # Sin columna de reservas: inventario.reservas() las cuenta desde A/B/C
+        with self._lock:
+            filas = self._con.execute(
+                "SELECT letra, cartas FROM mazos WHERE servidor_id = ? AND usuario_id = ?",
+                (servidor_id, usuario_id)
+            ).fetchall()
+        return {letra: json.loads(cartas) for letra, cartas in filas}
+
+    def guardar_mazo(self, servidor_id: str, usuario_id: str, letra_mazo: str, cartas: List[int]) -> None:
+        if letra_mazo not in LETRAS_MAZO:
+            raise ValueError(f"Mazo desconocido: {letra_mazo}")
+        with self._transaccion() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO mazos (servidor_id, usuario_id, letra, cartas) VALUES (?, ?, ?, ?)",
+                (servidor_id, usuario_id, letra_mazo, json.dumps(list(cartas)))
+            )
+
+    # ------------------------------
+    # Inventario
+    # ------------------------------
+    @staticmethod
+    def _leer_inventario(con, server_id: str, user_id: str) -> dict[str, int]:
+        return dict(con.execute(
+            "SELECT carta_id, copias FROM inventario WHERE servidor_id = ? AND usuario_id = ?",
+            (server_id, user_id)
+        ).fetchall())
+
+    @staticmethod
+    def _escribir_cambios(con, server_id: str, user_id: str, antes: dict, despues: dict) -> None:
+        cambios = transferencias.cambios(antes, despues)
+        con.executemany(
+            "DELETE FROM inventario WHERE servidor_id = ? AND usuario_id = ? AND carta_id = ?",
+            [(server_id, user_id, cid) for cid, copias in cambios.items() if copias is None]
+        )
+        con.executemany(
+            "INSERT OR REPLACE INTO inventario (servidor_id, usuario_id, carta_id, copias) VALUES (?, ?, ?, ?)",
+            [(server_id, user_id, cid, copias) for cid, copias in cambios.items() if copias is not None]
+        )
+
+    @staticmethod
+    def _sumar(con, filas: list[tuple]) -> None:
+        # Equivalente a Increment: suma en la propia escritura, sin leer antes
+        con.executemany(
+            "INSERT INTO inventario (servidor_id, usuario_id, carta_id, copias) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (servidor_id, usuario_id, carta_id) DO UPDATE SET copias = copias + excluded.copias",
+            filas
+        )
+
+    def agregar_cartas_inventario(self, server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
+        conteo = inventario.sumar({}, nuevas_cartas)
+        if not conteo:
+            return
+        with self._transaccion() as con:
+            self._sumar(con, [(server_id, user_id, cid, n) for cid, n in conteo.items()])
+
+    def aplicar_incrementos(self, incrementos: Dict[str, Dict[str, Dict[str, int]]], marca: str | None = None) -> None:
+        with self._transaccion() as con:
+            self._sumar(con, [
+                (server_id, user_id, cid, n)
+                for server_id, usuarios in incrementos.items()
+                for user_id, conteo in usuarios.items()
+                for cid, n in conteo.items()
+            ])
+            if marca is not None:
+                con.execute("INSERT OR IGNORE INTO inventario_marcas (marca) VALUES (?)", (marca,))
+
+    def marca_aplicada(self, marca: str) -> bool:
+        with self._lock:
+            return self._con.execute("SELECT 1 FROM inventario_marcas WHERE marca = ?", (marca,)).fetchone() is not None
+
+    def borrar_marcas(self, marcas: list[str]) -> None:
+        with self._transaccion() as con:
+            con.executemany("DELETE FROM inventario_marcas WHERE marca = ?", [(m,) for m in marcas])
+
+    def quitar_cartas_inventario(self, server_id: str, user_id: str, cartas_a_quitar: list[str]) -> bool:
+        with self._transaccion() as con:
+            antes = self._leer_inventario(con, server_id, user_id)
+            mapa = dict(antes)
+            if not inventario.restar(mapa, cartas_a_quitar):
+                return False
+            self._escribir_cambios(con, server_id, user_id, antes, mapa)
+            return True
+
+    def cargar_inventario_usuario(self, server_id: str, user_id: str) -> dict[str, int]:
+        with self._lock:
+            return self._leer_inventario(self._con, server_id, user_id)
+
+    def transferir_cartas(self, server_id: str, movimientos: list) -> None:
+        movimientos = list(movimientos)
+        usuarios = transferencias.usuarios_implicados(movimientos)
+        with self._transaccion() as con:
+            inventarios = {uid: self._leer_inventario(con, server_id, uid) for uid in usuarios}
+            mazos = {uid: self.cargar_datos_mazos(server_id, uid) for uid in usuarios}
+            despues = transferencias.aplicar(inventarios, mazos, movimientos)
+            for uid, mapa in despues.items():
+                self._escribir_cambios(con, server_id, uid, inventarios[uid], mapa)
+
+    def migrar_inventarios(self) -> tuple[int, int]:
+        with self._lock:
+            servidores = self._con.execute("SELECT COUNT(DISTINCT servidor_id) FROM inventario").fetchone()[0]
+        return servidores, 0
@@ -0,0 +1,160 @@
+"""
+Índice invertido de n-gramas sobre los nombres de las cartas para /search.
+
+Cada nombre normalizado se trocea en n-gramas de 1 a 3 caracteres y cada
+n-grama apunta al conjunto de cartas que lo contienen. Una búsqueda por
+subcadena se resuelve intersecando esos conjuntos en lugar de recorrer
+todo el catálogo. Se reconstruye automáticamente cuando el catálogo se recarga.
+"""
+import bisect
+import threading
+
+from core.cartas import CatalogoCartas, catalogo, normalizar_nombre, quitar_rareza
+
+N_MAX = 3
+
+# Alias de los filtros clave:valor admitidos en la búsqueda
+FILTROS = {
+    "rarity": "rareza", "rareza": "rareza", "r": "rareza",
+    "attr": "atributo", "attribute": "atributo", "atributo": "atributo",
+    "type": "tipo", "tipo": "tipo",
+}
+
+
+def _ngramas(texto: str, n: int) -> set[str]:
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceBusqueda:
+    def __init__(self, cat: CatalogoCartas):
+        self.catalogo = cat
+        self.nombres = [normalizar_nombre(c.get("nombre", "")) for c in cat.cartas]
+
+        # Orden alfabético precalculado para devolver resultados ordenados
+        orden = sorted(range(len(cat.cartas)), key=lambda i: cat.cartas[i].get("nombre", ""))
+        self.rango = {pos: r for r, pos in enumerate(orden)}
+
+        postings: dict[str, set[int]] = {}
+        for pos, nombre in enumerate(self.nombres):
+            for n in range(1, N_MAX + 1):
+                for g in _ngramas(nombre, n):
+                    postings.setdefault(g, set()).add(pos)
+        self.postings = {g: frozenset(p) for g, p in postings.items()}
+
+        # Índices de los filtros: campo -> valor -> posiciones
+        self.campos: dict[str, dict[str, frozenset]] = {}
+        for campo in ("rareza", "atributo", "tipo"):
+            valores: dict[str, set[int]] = {}
+            for pos, c in enumerate(cat.cartas):
+                valores.setdefault(str(c.get(campo, "")).lower(), set()).add(pos)
+            self.campos[campo] = {v: frozenset(p) for v, p in valores.items()}
+
+        self.todas = frozenset(range(len(cat.cartas)))
+
+        # Array ordenado (clave, posición) para autocompletar por prefijo con
+        # bisect. Cada carta entra con su nombre completo y sin la rareza.
+        prefijos = set()
+        for pos, c in enumerate(cat.cartas):
+            nombre = c.get("nombre", "")
+            prefijos.add((self.nombres[pos], pos))
+            prefijos.add((normalizar_nombre(quitar_rareza(nombre)), pos))
+        self.prefijos = sorted(prefijos)
+        self._claves_prefijo = [clave for clave, _ in self.prefijos]
+
+    def _candidatos_termino(self, termino: str) -> frozenset:
+        if len(termino) <= N_MAX:
+            # Para n-gramas indexados la pertenencia es exacta
+            return self.postings.get(termino, frozenset())
+
+        listas = sorted(
+            (self.postings.get(g, frozenset()) for g in _ngramas(termino, N_MAX)),
+            key=len
+        )
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            if not candidatos:
+                break
+            candidatos &= lista
+        # Los trigramas pueden aparecer desordenados: se confirma la subcadena
+        return frozenset(p for p in candidatos if termino in self.nombres[p])
+
+    def _posiciones(self, consulta: str) -> list[int]:
+        conjuntos = []
+        for palabra in consulta.split():
+            clave, sep, valor = palabra.partition(":")
+            campo = FILTROS.get(clave.lower()) if sep else None
+            if campo and valor:
+                conjuntos.append(self.campos[campo].get(valor.lower(), frozenset()))
+                continue
+
+            for termino in normalizar_nombre(palabra).split():
+                conjuntos.append(self._candidatos_termino(termino))
+
+        if not conjuntos:
+            return []
+
+        conjuntos.sort(key=len)
+        resultado = set(conjuntos[0])
+        for c in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado &= c
+
+        return sorted(resultado, key=self.rango.__getitem__)
+
+    def buscar(self, consulta: str) -> list:
+        """
+        Devuelve las cartas que cumplen todos los términos y filtros, ordenadas
+        por nombre. Ejemplo: "kiryu rarity:UR attr:shadow type:support".
+        """
+        return [self.catalogo.cartas[p] for p in self._posiciones(consulta)]
+
+    def sugerir(self, texto: str, limite: int = 25, permitidas=None) -> list:
+        """
+        Sugerencias para autocompletar: primero las cartas cuyo nombre (con o
+        sin rareza) empieza por el texto, y si faltan, las que lo contienen.
+        `permitidas` restringe el resultado a un conjunto de IDs (str).
+        """
+        clave = normalizar_nombre(texto)
+        vistas, resultado = set(), []
+
+        def aceptar(pos) -> bool:
+            if pos in vistas:
+                return False
+            vistas.add(pos)
+            carta = self.catalogo.cartas[pos]
+            if permitidas is not None and str(carta["id"]) not in permitidas:
+                return False
+            resultado.append(carta)
+            return len(resultado) >= limite
+
+        i = bisect.bisect_left(self._claves_prefijo, clave)
+        while i < len(self.prefijos) and self._claves_prefijo[i].startswith(clave):
+            if aceptar(self.prefijos[i][1]):
+                return resultado
+            i += 1
+
+        if clave:
+            for pos in self._posiciones(texto):
+                if aceptar(pos):
+                    break
+        return resultado
+
+
+_indice: IndiceBusqueda | None = None
+_lock = threading.Lock()
+
+
+def indice_busqueda() -> IndiceBusqueda:
+    """Índice del catálogo actual; se reconstruye si el catálogo ha cambiado."""
+    global _indice
+    cat = catalogo()
+    if _indice is None or _indice.catalogo is not cat:
+        with _lock:
+            if _indice is None or _indice.catalogo is not cat:
+                _indice = IndiceBusqueda(cat)
+    return _indice
+
+
+def buscar_cartas(consulta: str) -> list:
+    return indice_busqueda().buscar(consulta)
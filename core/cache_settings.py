@@ -0,0 +1,162 @@
+"""
+Caché en memoria de la configuración de los servidores.
+
+Cada servidor tiene su documento en settings/global/guilds/{guild_id}. La
+colección se carga una vez y se mantiene al día con un listener de Firestore
+(on_snapshot): las lecturas de los comandos son consultas a memoria y solo
+los cambios generan tráfico. Si el listener no se puede iniciar (o el backend
+no tiene), una tarea de sondeo relee la colección cada INTERVALO_SONDEO segundos.
+
+Los servidores que aún no se han migrado se leen del mapa "guilds" antiguo de
+settings/global (una sola lectura por proceso). La primera escritura de uno de
+ellos crea su documento con toda su configuración antigua.
+"""
+import asyncio
+import copy
+import time
+
+from core import firebase_async, firebase_storage
+
+# Segundos entre lecturas cuando no hay listener
+INTERVALO_SONDEO = 60.0
+
+
+def fusionar(destino: dict, cambios: dict) -> None:
+    """Aplica {campo: valor} sobre `destino` como set(merge=True). None borra el campo."""
+    for clave, valor in cambios.items():
+        if valor is None:
+            destino.pop(clave, None)
+        else:
+            destino[clave] = copy.deepcopy(valor)
+
+
+class CacheSettings:
+    def __init__(self, intervalo_sondeo: float = INTERVALO_SONDEO):
+        self.intervalo_sondeo = intervalo_sondeo
+        self._guilds: dict[str, dict] | None = None
+        self._legado: dict[str, dict] | None = None
+        self._listener = None
+        self._sondeo: asyncio.Task | None = None
+
+        # Contadores para /cache_stats
+        self.aciertos = 0
+        self.fallos = 0
+        self.actualizaciones = 0
+        self.ultima_actualizacion: float | None = None
+
+    # ------------------------------
+    # Arranque
+    # ------------------------------
+    def iniciar(self) -> None:
+        """Arranca el listener; si falla, el sondeo periódico."""
+        if self._listener is not None or (self._sondeo and not self._sondeo.done()):
+            return
+        try:
+            self._listener = firebase_storage.escuchar_settings_guilds(self._al_cambiar)
+            print("[INFO] Listener de settings iniciado.")
+        except NotImplementedError:
+            # Backends locales: este proceso es el único que escribe
+            print("[INFO] El backend no tiene listener de settings, se usará sondeo.")
+            self._sondeo = asyncio.create_task(self._bucle_sondeo())
+        except Exception as e:
+            print(f"[ERROR] No se pudo iniciar el listener de settings, se usará sondeo: {e}")
+            self._sondeo = asyncio.create_task(self._bucle_sondeo())
+
+    def detener(self) -> None:
+        if self._listener is not None:
+            self._listener.unsubscribe()
+            self._listener = None
+        if self._sondeo:
+            self._sondeo.cancel()
+            self._sondeo = None
+
+    def _al_cambiar(self, snapshots, cambios, read_time) -> None:
+        # Se ejecuta en el hilo del listener con todos los documentos de la
+        # colección: solo se sustituye la referencia
+        self._reemplazar({snap.id: snap.to_dict() or {} for snap in snapshots})
+
+    async def _bucle_sondeo(self):
+        while True:
+            try:
+                self._reemplazar(await firebase_async.cargar_settings_guilds())
+            except Exception as e:
+                print(f"[ERROR] Sondeo de settings: {e}")
+            await asyncio.sleep(self.intervalo_sondeo)
+
+    def _reemplazar(self, guilds: dict[str, dict]) -> None:
+        self._guilds = guilds
+        self.actualizaciones += 1
+        self.ultima_actualizacion = time.time()
+
+    # ------------------------------
+    # Lecturas
+    # ------------------------------
+    async def _actuales(self) -> tuple[dict, dict]:
+        if self._guilds is not None and self._legado is not None:
+            self.aciertos += 1
+            return self._guilds, self._legado
+        self.fallos += 1
+        if self._legado is None:
+            self._legado = (await firebase_async.cargar_settings()).get("guilds", {})
+        if self._guilds is None:
+            self._reemplazar(await firebase_async.cargar_settings_guilds())
+        return self._guilds, self._legado
+
+    async def guilds(self) -> dict[str, dict]:
+        """Copia de {guild_id: configuración} de todos los servidores."""
+        guilds, legado = await self._actuales()
+        return copy.deepcopy({**legado, **guilds})
+
+    async def guild(self, servidor_id: str) -> dict:
+        """Copia de la configuración de un servidor ({} si no tiene)."""
+        guilds, legado = await self._actuales()
+        servidor_id = str(servidor_id)
+        return copy.deepcopy(guilds.get(servidor_id, legado.get(servidor_id, {})))
+
+    # ------------------------------
+    # Escrituras
+    # ------------------------------
+    async def guardar(self, cambios: dict[str, dict]) -> None:
+        """
+        Escribe {guild_id: {campo: valor | None}} en un solo lote y lo refleja
+        en la caché. Los servidores sin documento propio se crean con su
+        configuración antigua completa.
+        """
+        if not cambios:
+            return
+        guilds, legado = await self._actuales()
+        completos = {}
+        for servidor_id, campos in cambios.items():
+            servidor_id = str(servidor_id)
+            if servidor_id not in guilds and servidor_id in legado:
+                base = copy.deepcopy(legado[servidor_id])
+                fusionar(base, campos)
+                completos[servidor_id] = base
+            else:
+                completos[servidor_id] = dict(campos)
+
+        await firebase_async.guardar_settings_guilds(completos)
+
+        nuevos = copy.deepcopy(self._guilds or {})
+        for servidor_id, campos in completos.items():
+            fusionar(nuevos.setdefault(servidor_id, {}), campos)
+        self._guilds = nuevos
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "ratio": self.aciertos / total if total else 0.0,
+            "actualizaciones": self.actualizaciones,
+            "modo": "listener" if self._listener is not None else ("sondeo" if self._sondeo else "bajo demanda"),
+            "ultima_actualizacion": self.ultima_actualizacion,
+        }
+
+
+cache_settings = CacheSettings()
+
+
+async def guardar_settings_guild(servidor_id: str, cambios: dict) -> None:
+    """Escribe solo los campos indicados de un servidor y actualiza la caché."""
+    await cache_settings.guardar({str(servidor_id): cambios})
@@ -1,17 +1,169 @@
+import difflib
 import json
 import os
+import re
+import threading
+import time
+import unicodedata
+from types import MappingProxyType
 
-# Cargar cartas desde cartas.json
+RUTA_CARTAS = os.path.join("cartas", "cartas.json")
+
+# Segundos entre comprobaciones del mtime de cartas.json (recarga en caliente)
+INTERVALO_COMPROBACION = 2.0
+
+RAREZAS = ("UR", "KSR", "SSR", "SR", "R", "N")
+
+# Número de sugerencias cuando no hay coincidencia exacta
+MAX_SUGERENCIAS = 3
+
+_RE_PUNTUACION = re.compile(r"[^\w\s]")
+
+
+def normalizar_nombre(texto: str) -> str:
+    """
+    Clave de búsqueda de un nombre: sin acentos, sin mayúsculas, sin signos
+    de puntuación y con los espacios colapsados.
+    "UR Kazuma Kiryu ('88)" -> "ur kazuma kiryu 88"
+    """
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch)).casefold()
+    texto = _RE_PUNTUACION.sub(" ", texto)
+    return " ".join(texto.split())
+
+
+def quitar_rareza(nombre: str) -> str:
+    """Nombre sin el prefijo de rareza: "UR Kazuma Kiryu" -> "Kazuma Kiryu"."""
+    partes = nombre.split(" ", 1)
+    if len(partes) == 2 and partes[0] in RAREZAS:
+        return partes[1]
+    return nombre
+
+
+class CatalogoCartas:
+    """
+    Catálogo inmutable de cartas cargado una sola vez por proceso.
+    Expone índices precalculados para búsquedas O(1).
+    """
+
+    def __init__(self, cartas: list[dict], mtime: float | None):
+        self.mtime = mtime
+
+        # Cartas de solo lectura, en el orden de cartas.json
+        self.cartas: tuple = tuple(MappingProxyType(dict(c)) for c in cartas)
+
+        por_id, por_nombre, por_rareza = {}, {}, {}
+        for c in self.cartas:
+            por_id[str(c["id"])] = c
+            por_nombre.setdefault(c.get("nombre", "").strip().lower(), c)
+            por_rareza.setdefault(c.get("rareza", "N"), []).append(c)
+
+        # str(id) -> carta
+        self.por_id = MappingProxyType(por_id)
+        # nombre en minúsculas -> carta
+        self.por_nombre = MappingProxyType(por_nombre)
+        # rareza -> tupla de cartas
+        self.por_rareza = MappingProxyType({r: tuple(cs) for r, cs in por_rareza.items()})
+
+        # Índice del resolvedor de nombres: clave normalizada -> carta.
+        # Los alias (nombre sin rareza) solo se añaden si no son ambiguos
+        # y no pisan el nombre completo de otra carta.
+        por_clave, alias = {}, {}
+        for c in self.cartas:
+            nombre = c.get("nombre", "")
+            por_clave.setdefault(normalizar_nombre(nombre), c)
+            alias.setdefault(normalizar_nombre(quitar_rareza(nombre)), []).append(c)
+        for clave, cs in alias.items():
+            if len(cs) == 1 and clave not in por_clave:
+                por_clave[clave] = cs[0]
+
+        self.por_clave = MappingProxyType(por_clave)
+        self._claves = list(por_clave)
+
+    def __len__(self):
+        return len(self.cartas)
+
+    def resolver(self, nombre: str):
+        """
+        Busca una carta por nombre.
+        Devuelve (carta, []) si hay coincidencia exacta tras normalizar,
+        o (None, sugerencias) con los nombres más parecidos, de mejor a peor.
+        """
+        clave = normalizar_nombre(nombre)
+        carta = self.por_clave.get(clave)
+        if carta is not None:
+            return carta, []
+
+        sugerencias = []
+        for parecida in difflib.get_close_matches(clave, self._claves, n=MAX_SUGERENCIAS * 2, cutoff=0.6):
+            nombre_real = self.por_clave[parecida]["nombre"]
+            if nombre_real not in sugerencias:
+                sugerencias.append(nombre_real)
+        return None, sugerencias[:MAX_SUGERENCIAS]
+
+
+_catalogo: CatalogoCartas | None = None
+_ultima_comprobacion = 0.0
+_lock = threading.Lock()
+
+
+def _mtime_archivo() -> float | None:
+    try:
+        return os.stat(RUTA_CARTAS).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _leer_catalogo(mtime: float | None) -> CatalogoCartas:
+    # Si el archivo no existe, catálogo vacío
+    if mtime is None:
+        return CatalogoCartas([], None)
+    with open(RUTA_CARTAS, "r", encoding="utf-8") as f:
+        return CatalogoCartas(json.load(f), mtime)
+
+
+def catalogo() -> CatalogoCartas:
+    """
+    Devuelve el catálogo global. Se lee del disco la primera vez y se vuelve
+    a leer solo si actualizar_lista.py ha escrito un cartas.json nuevo.
+    """
+    global _catalogo, _ultima_comprobacion
+
+    ahora = time.monotonic()
+    if _catalogo is not None and ahora - _ultima_comprobacion < INTERVALO_COMPROBACION:
+        return _catalogo
+
+    with _lock:
+        _ultima_comprobacion = ahora
+        mtime = _mtime_archivo()
+        if _catalogo is None or mtime != _catalogo.mtime:
+            try:
+                _catalogo = _leer_catalogo(mtime)
+                print(f"[INFO] Catálogo de cartas cargado: {len(_catalogo)} cartas.")
+            except (json.JSONDecodeError, OSError) as e:
+                # Archivo a medio escribir: se conserva el catálogo anterior
+                print(f"[ERROR] No se pudo recargar cartas.json: {e}")
+                if _catalogo is None:
+                    _catalogo = CatalogoCartas([], None)
+    return _catalogo
+
+
+def resolver_carta(nombre: str):
+    """Atajo de catalogo().resolver(nombre)."""
+    return catalogo().resolver(nombre)
+
+
+def texto_sugerencias(sugerencias: list[str]) -> str:
+    """Línea "Did you mean" para añadir a los mensajes de carta no encontrada."""
+    if not sugerencias:
+        return ""
+    return "\nDid you mean: " + ", ".join(f"**{s}**" for s in sugerencias) + "?"
+
+
+# Compatibilidad con el código antiguo
 def cargar_cartas():
-    ruta = os.path.join("cartas", "cartas.json")
-    # Verifica si el archivo existe; si no, devuelve una lista vacía
-    if not os.path.exists(ruta):
-        return []
-    # Abre el archivo y carga su contenido como una lista de diccionarios
-    with open(ruta, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-# Devuelve un diccionario de cartas indexadas por su ID
+    return catalogo().cartas
+
+
 def cartas_por_id():
-    cartas = cargar_cartas()
-    return {str(c["id"]): c for c in cartas}
+    return catalogo().por_id
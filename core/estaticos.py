@@ -0,0 +1,122 @@
+"""
+Metadatos de las imágenes de cartas que sirve el servidor HTTP (keep_alive.py).
+
+El ETag es un hash del contenido del archivo: no cambia al copiar la carpeta
+a otra máquina ni al redesplegar, así que las cachés de Discord y de los
+navegadores siguen valiendo. Se calcula una sola vez por archivo y solo se
+repite si cambian su tamaño o su fecha de modificación.
+
+indexar() los calcula todos al arrancar, fuera del bucle de eventos; después
+las peticiones y las URLs (core/variantes) solo consultan el índice con
+buscar(), sin tocar el disco. Las imágenes cambian al redesplegar, así que un
+archivo que no está en el índice completo se da por inexistente.
+
+Solo se sirven como inmutables (Cache-Control: immutable, un año) las URLs
+que llevan la huella del contenido, ?v=<etag> (core/variantes.url), y solo si
+coincide con el archivo que se envía: al cambiar la imagen cambia la URL. Sin
+huella, o con una antigua, la caché dura poco y se revalida con el ETag.
+"""
+import hashlib
+import os
+import threading
+
+# Un año: el máximo que respetan navegadores y proxies
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+# URL sin huella o con una que ya no corresponde al archivo
+CACHE_SIN_HUELLA = "public, max-age=300"
+
+# Bytes leídos de cada vez al calcular el hash
+TROZO = 1 << 20
+
+
+class Metadatos:
+    def __init__(self, ruta: str, etag: str, modificado: float, tamano: int):
+        self.ruta = ruta
+        self.etag = etag
+        self.modificado = modificado
+        self.tamano = tamano
+
+
+_cache: dict[str, tuple[tuple[int, int], Metadatos]] = {}
+_lock = threading.Lock()
+
+# {ruta absoluta: Metadatos} de los archivos que se sirven; lo rellena indexar()
+_indice: dict[str, Metadatos] = {}
+indexado = False
+
+
+def ruta_dentro(carpeta: str, nombre: str) -> str | None:
+    """Ruta de `nombre` dentro de `carpeta`, o None si el nombre se sale de ella (sin mirar el disco)."""
+    if not nombre or nombre.startswith(".") or "/" in nombre or "\\" in nombre or "\0" in nombre:
+        return None
+    return os.path.join(carpeta, nombre)
+
+
+def resolver(carpeta: str, nombre: str) -> str | None:
+    """Ruta del archivo `nombre` dentro de `carpeta`, o None si no existe o se sale de ella."""
+    ruta = ruta_dentro(carpeta, nombre)
+    return ruta if ruta is not None and os.path.isfile(ruta) else None
+
+
+def metadatos(ruta: str) -> Metadatos:
+    """ETag, fecha de modificación y tamaño del archivo."""
+    info = os.stat(ruta)
+    firma = (info.st_mtime_ns, info.st_size)
+    guardado = _cache.get(ruta)
+    if guardado is not None and guardado[0] == firma:
+        return guardado[1]
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as f:
+        while trozo := f.read(TROZO):
+            h.update(trozo)
+    meta = Metadatos(ruta, h.hexdigest(), info.st_mtime, info.st_size)
+    with _lock:
+        _cache[ruta] = (firma, meta)
+    return meta
+
+
+def cache_control(meta: Metadatos, huella: str | None) -> str:
+    """Cache-Control para el archivo según la huella (?v=) que trae la URL."""
+    return CACHE_CONTROL if huella == meta.etag else CACHE_SIN_HUELLA
+
+
+def indexar(carpetas: list[str]) -> int:
+    """Metadatos de todos los archivos de `carpetas` (bloqueante: en un hilo). Devuelve cuántos."""
+    global indexado
+    for carpeta in carpetas:
+        if not os.path.isdir(carpeta):
+            continue
+        for nombre in os.listdir(carpeta):
+            ruta = os.path.join(carpeta, nombre)
+            if os.path.isfile(ruta) and not nombre.endswith(".tmp"):
+                _indice[os.path.abspath(ruta)] = metadatos(ruta)
+    indexado = True
+    return len(_indice)
+
+
+def buscar(ruta: str) -> Metadatos | None:
+    """Metadatos del índice, sin tocar el disco. None si el archivo no está indexado."""
+    return _indice.get(os.path.abspath(ruta))
+
+
+def metadatos_si_existe(ruta: str) -> Metadatos | None:
+    """Como metadatos(), o None si el archivo no existe; lo añade al índice (bloqueante)."""
+    if not os.path.isfile(ruta):
+        return None
+    meta = metadatos(ruta)
+    _indice[os.path.abspath(ruta)] = meta
+    return meta
+
+
+def no_modificado(meta: Metadatos, if_none_match: str | None, if_modified_since) -> bool:
+    """
+    True si la petición condicional puede responderse con 304. If-None-Match
+    manda sobre If-Modified-Since (datetime con zona horaria o None).
+    """
+    if if_none_match is not None:
+        etiquetas = [e.strip().removeprefix("W/").strip('"') for e in if_none_match.split(",")]
+        return "*" in etiquetas or meta.etag in etiquetas
+    if if_modified_since is not None:
+        return int(meta.modificado) <= if_modified_since.timestamp()
+    return False
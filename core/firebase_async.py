@@ -0,0 +1,157 @@
+"""
+Versión asíncrona de core/firebase_storage.
+
+Cada función tiene el mismo nombre y argumentos que su equivalente síncrona,
+pero se ejecuta en el pool de hilos de core/hilos.py. Así una lectura lenta de
+Firestore en /pack o /album no congela el gateway para el resto de servidores.
+Los cogs y las vistas deben usar este módulo y hacer `await`.
+
+Las llamadas usan core/resiliencia.llamar: el comando deja de esperar al
+agotarse el plazo de la operación y recibe AlmacenNoDisponible.
+"""
+from contextvars import ContextVar
+from typing import Dict, List
+
+from core import firebase_storage as _fs
+from core import inventario, propiedad, transferencias
+from core.backends.base import LETRAS_MAZO
+from core.inventario_diferido import inventario_diferido
+from core.lectura_unica import lecturas
+from core.resiliencia import PLAZO_LECTURA, con_plazo, llamar
+
+
+# Settings
+async def cargar_settings() -> Dict:
+    return await llamar(_fs.cargar_settings)
+
+async def guardar_settings(settings: Dict) -> None:
+    await llamar(_fs.guardar_settings, settings)
+
+async def backup_settings(settings: Dict) -> None:
+    await llamar(_fs.backup_settings, settings)
+
+async def cargar_settings_guilds() -> Dict[str, Dict]:
+    return await llamar(_fs.cargar_settings_guilds)
+
+async def guardar_settings_guilds(cambios: Dict[str, Dict]) -> None:
+    await llamar(_fs.guardar_settings_guilds, cambios)
+
+async def migrar_settings_guilds() -> int:
+    return await llamar(_fs.migrar_settings_guilds)
+
+
+# Propiedades (formato antiguo)
+async def cargar_propiedades() -> Dict:
+    return await llamar(_fs.cargar_propiedades)
+
+async def guardar_propiedades(servidor_id: str, usuario_id: str, cartas: list) -> None:
+    await llamar(_fs.guardar_propiedades, servidor_id, usuario_id, cartas)
+
+
+# Packs
+async def cargar_packs() -> Dict:
+    return await llamar(_fs.cargar_packs)
+
+async def guardar_packs(packs: Dict) -> None:
+    await llamar(_fs.guardar_packs, packs)
+
+async def cargar_pack_usuario(servidor_id: str, usuario_id: str) -> Dict:
+    return await llamar(_fs.cargar_pack_usuario, servidor_id, usuario_id)
+
+async def guardar_pack_usuario(servidor_id: str, usuario_id: str, datos: Dict) -> None:
+    await llamar(_fs.guardar_pack_usuario, servidor_id, usuario_id, datos)
+
+async def migrar_packs_global() -> int:
+    return await llamar(_fs.migrar_packs_global)
+
+
+# Memo por interacción: dentro de un mismo comando (o pulsación de botón)
+# cada inventario y cada juego de mazos se lee de Firestore una sola vez.
+# main.py lo inicia antes de cada comando; fuera de un comando no se memoriza.
+# Cada evento de discord.py corre en su propia tarea, así que el memo no se
+# comparte entre interacciones.
+_memo: ContextVar[dict | None] = ContextVar("memo_interaccion", default=None)
+
+
+def iniciar_memo() -> None:
+    _memo.set({})
+
+
+async def _memorizado(clave: tuple, func, *args):
+    memo = _memo.get()
+    if memo is not None and clave in memo:
+        return memo[clave]
+    # Entre comandos, las lecturas simultáneas de la misma clave se comparten
+    # (core/lectura_unica). El plazo solo corta la espera de este comando
+    valor = await con_plazo(lecturas.obtener(clave, func, *args), PLAZO_LECTURA, clave[0])
+    if memo is not None:
+        memo[clave] = valor
+    return valor
+
+
+def _invalidar(server_id: str, user_id: str) -> None:
+    # Las escrituras invalidan el memo y la vista en memoria de core/propiedad
+    # al terminar, así una precarga que se haya solapado se descarta.
+    memo = _memo.get()
+    for clave in (("mazos", server_id, user_id), ("inventario", server_id, user_id)):
+        if memo is not None:
+            memo.pop(clave, None)
+        lecturas.invalidar(clave)
+    propiedad.invalidar(server_id, user_id)
+
+
+# Mazos
+async def _datos_mazos(servidor_id: str, usuario_id: str) -> Dict:
+    # Mazos y reservas salen de la misma lectura y comparten entrada en el memo
+    return await _memorizado(("mazos", servidor_id, usuario_id), _fs.cargar_datos_mazos, servidor_id, usuario_id)
+
+async def cargar_mazos(servidor_id: str, usuario_id: str) -> Dict[str, List[int]]:
+    datos = await _datos_mazos(servidor_id, usuario_id)
+    # Copias: los comandos modifican la lista antes de guardarla
+    return {letra: list(datos.get(letra, [])) for letra in LETRAS_MAZO}
+
+async def cargar_reservas(servidor_id: str, usuario_id: str) -> Dict[str, int]:
+    return inventario.reservas(await _datos_mazos(servidor_id, usuario_id))
+
+async def cargar_mazo(servidor_id: str, usuario_id: str, letra_mazo: str) -> List[int]:
+    return (await cargar_mazos(servidor_id, usuario_id)).get(letra_mazo, [])
+
+async def guardar_mazo(servidor_id: str, usuario_id: str, letra_mazo: str, cartas: List[int]) -> None:
+    await llamar(_fs.guardar_mazo, servidor_id, usuario_id, letra_mazo, cartas)
+    _invalidar(servidor_id, usuario_id)
+
+
+# Inventario
+# Las altas pasan por la escritura diferida (core/inventario_diferido) y las
+# lecturas suman lo pendiente. Las bajas vacían antes lo pendiente de los
+# implicados para validar contra el total real.
+async def agregar_cartas_inventario(server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
+    await inventario_diferido.agregar(server_id, user_id, nuevas_cartas)
+    _invalidar(server_id, user_id)
+
+async def _vaciar_pendientes(server_id: str, usuarios) -> None:
+    if inventario_diferido.tiene_pendientes(server_id, usuarios):
+        await inventario_diferido.vaciar()
+
+async def quitar_cartas_inventario(server_id: str, user_id: str, cartas_a_quitar: list[str]) -> bool:
+    await _vaciar_pendientes(server_id, [user_id])
+    cambiado = await llamar(_fs.quitar_cartas_inventario, server_id, user_id, cartas_a_quitar)
+    _invalidar(server_id, user_id)
+    return cambiado
+
+async def cargar_inventario_usuario(server_id: str, user_id: str) -> dict[str, int]:
+    inv = await _memorizado(("inventario", server_id, user_id), inventario_diferido.leer, server_id, user_id)
+    return dict(inv)
+
+async def migrar_inventarios() -> tuple[int, int]:
+    await inventario_diferido.vaciar()
+    return await llamar(_fs.migrar_inventarios)
+
+async def transferir_cartas(server_id: str, movimientos: list) -> None:
+    await _vaciar_pendientes(server_id, transferencias.usuarios_implicados(movimientos))
+    try:
+        await llamar(_fs.transferir_cartas, server_id, movimientos)
+    finally:
+        # También si falla: la transacción pudo confirmarse antes del error
+        for uid in transferencias.usuarios_implicados(movimientos):
+            _invalidar(server_id, uid)
@@ -1,10 +1,17 @@
 # core/firebase_client.py
+# El cliente se crea en el primer uso (obtener_db() o `from core.firebase_client import db`):
+# importar firebase_admin y leer las credenciales no retrasa el arranque del bot.
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, firestore
+import threading
+
+_db = None
+_lock = threading.Lock()
 
 def _init_app():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
     # Leer el contenido del JSON desde la variable de entorno
     creds_json = os.getenv("FIREBASE_CREDENTIALS_JSON")
     if not creds_json:
@@ -24,5 +31,17 @@ def _init_app():
 
     return firestore.client()
 
-# Cliente global de Firestore
-db = _init_app()
+# Cliente global de Firestore, creado una sola vez aunque lo pidan varios hilos
+def obtener_db():
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                _db = _init_app()
+    return _db
+
+def __getattr__(nombre):
+    # Compatibilidad con `from core.firebase_client import db`
+    if nombre == "db":
+        return obtener_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -1,176 +1,243 @@
+"""
+Acceso síncrono al almacenamiento del bot.
+
+Cada función delega en el backend configurado con STORAGE_BACKEND
+("firestore" por defecto, "memoria" o "sqlite"; ver core/backends/base.py).
+El backend se crea en la primera llamada, así importar este módulo no
+inicializa Firebase ni exige credenciales.
+
+Todas pasan por @medir (core/metricas_almacen): latencia y documentos leídos
+y escritos por operación, colección y comando. Las de uso normal pasan además
+por @resiliente (core/resiliencia): reintentos de errores transitorios, plazo
+por operación y cortocircuito. Las migraciones y el listener quedan fuera.
+"""
+import os
+import threading
 from typing import Dict, List
-from core.firebase_client import db
 
-# Colecciones y documentos
-SETTINGS_COLLECTION = "settings"
-SETTINGS_DOC = "global"
+from core.backends.base import StorageBackend
+from core.metricas_almacen import medir
+from core.resiliencia import resiliente
 
-PROPIEDADES_COLLECTION = "propiedades"
-PROPIEDADES_DOC = "global"
+BACKEND_POR_DEFECTO = "firestore"
 
-PACKS_COLLECTION = "packs"
-PACKS_DOC = "global"
+# Plazo de las operaciones sobre todos los registros (backups del owner)
+PLAZO_MASIVO = 60.0
 
-MAZOS_COLLECTION = "mazos"
-MAZOS_DOC = "global"
+_backend: StorageBackend | None = None
+_lock_backend = threading.Lock()
 
-# Datos sobre los servidores
-def cargar_settings() -> Dict:
-    doc = db.collection(SETTINGS_COLLECTION).document(SETTINGS_DOC).get()
-    return doc.to_dict() if doc.exists else {}
 
-def guardar_settings(settings: Dict) -> None:
-    # merge=True para no borrar otras claves
-    db.collection(SETTINGS_COLLECTION).document(SETTINGS_DOC).set(settings, merge=True)
+def _nombre_configurado() -> str:
+    return (os.getenv("STORAGE_BACKEND") or BACKEND_POR_DEFECTO).strip().lower()
 
-# Cartas en propiedad del usuario
-def cargar_propiedades() -> Dict:
-    doc = db.collection(PROPIEDADES_COLLECTION).document(PROPIEDADES_DOC).get()
-    return doc.to_dict() if doc.exists else {}
 
-def guardar_propiedades(servidor_id: str, usuario_id: str, cartas: list) -> None:
-    db.collection(PROPIEDADES_COLLECTION).document(PROPIEDADES_DOC).update({
-        f"{servidor_id}.{usuario_id}": cartas
-    })
+def crear_backend(nombre: str | None = None) -> StorageBackend:
+    """Crea el backend indicado (o el de STORAGE_BACKEND)."""
+    nombre = (nombre or _nombre_configurado()).strip().lower()
+    # Imports diferidos: solo se cargan las dependencias del backend elegido
+    if nombre == "firestore":
+        from core.backends.firestore import BackendFirestore
+        return BackendFirestore()
+    if nombre == "memoria":
+        from core.backends.memoria import BackendMemoria
+        return BackendMemoria()
+    if nombre == "sqlite":
+        from core.backends.sqlite import BackendSQLite
+        return BackendSQLite()
+    raise ValueError(f"STORAGE_BACKEND desconocido: {nombre!r} (firestore, memoria o sqlite)")
 
-# Packs
-def cargar_packs() -> Dict:
-    doc = db.collection(PACKS_COLLECTION).document(PACKS_DOC).get()
-    return doc.to_dict() if doc.exists else {}
 
-def guardar_packs(packs: Dict) -> None:
-    db.collection(PACKS_COLLECTION).document(PACKS_DOC).set(packs, merge=True)
+def backend() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        with _lock_backend:
+            if _backend is None:
+                _backend = crear_backend()
+                print(f"[INFO] Almacenamiento: {_backend.nombre}")
+    return _backend
 
-# Backup de settings
-def backup_settings(settings: Dict) -> None:
-    import datetime
-    timestamp = datetime.datetime.now().isoformat()
-    db.collection("settings_backup").document(timestamp).set(settings)
-   
-    
-# Mazos
-def cargar_mazo(
-    servidor_id: str,
-    usuario_id: str,
-    letra_mazo: str   # "A", "B" o "C"
-) -> List[int]:
-    """
-    Carga un mazo concreto (A, B o C) de un usuario.
-    No lee el documento entero innecesariamente.
-    """
 
-    doc = db.collection("mazos").document(servidor_id).get()
+def nombre_backend() -> str:
+    """Nombre del backend en uso o del configurado, sin crearlo."""
+    return _backend.nombre if _backend is not None else _nombre_configurado()
 
-    if not doc.exists:
-        return []
 
-    datos = doc.to_dict()
+def calentar() -> None:
+    """Crea el backend y abre su conexión (main.py lo llama tras on_ready)."""
+    backend().calentar()
 
-    return (
-        datos
-        .get(usuario_id, {})
-        .get(letra_mazo, [])
-    )
 
+def usar_backend(nuevo: StorageBackend) -> None:
+    """Sustituye el backend del proceso (benchmarks y scripts)."""
+    global _backend
+    with _lock_backend:
+        _backend = nuevo
 
-def guardar_mazo(
-    servidor_id: str,
-    usuario_id: str,
-    letra_mazo: str,   # "A", "B" o "C"
-    cartas: List[int]
-) -> None:
-    """
-    Guarda un mazo concreto (A, B o C) de un usuario sin tocar
-    el resto del documento ni los otros mazos.
-    """
 
-    doc_ref = db.collection("mazos").document(servidor_id)
+def _registros(packs: Dict) -> int:
+    # {servidor: {usuario: datos}} -> número de documentos de usuario
+    return sum(len(usuarios) for usuarios in packs.values())
 
-    # Ruta exacta del campo que se va a actualizar
-    campo = f"{usuario_id}.{letra_mazo}"
 
-    try:
-        # update() SOLO modifica ese campo
-        doc_ref.update({
-            campo: cartas
-        })
-    except Exception:
-        # Si el documento no existe todavía, lo crea con set + merge
-        doc_ref.set(
-            {
-                usuario_id: {
-                    letra_mazo: cartas
-                }
-            },
-            merge=True
-        )
+# Datos sobre los servidores
+@resiliente(lectura=True)
+@medir("settings", lecturas=1)
+def cargar_settings() -> Dict:
+    return backend().cargar_settings()
 
+@resiliente()
+@medir("settings", escrituras=1)
+def guardar_settings(settings: Dict) -> None:
+    backend().guardar_settings(settings)
 
-INVENTARIO_COLLECTION = "inventario"
+# Configuración por servidor: un documento por servidor
+@resiliente(lectura=True)
+@medir("settings_guilds", lecturas=lambda r: max(1, len(r)))
+def cargar_settings_guilds() -> Dict[str, Dict]:
+    return backend().cargar_settings_guilds()
 
-def agregar_cartas_inventario(server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
-    """
-    Añade cartas al inventario del usuario en inventario/{server_id}.
-    Crea el documento si no existe. No reescribe todo el documento.
-    """
-    server_ref = db.collection(INVENTARIO_COLLECTION).document(server_id)
+@resiliente()
+@medir("settings_guilds", escrituras=lambda r, cambios: len(cambios))
+def guardar_settings_guilds(cambios: Dict[str, Dict]) -> None:
+    """{guild_id: {campo: valor}} en una sola escritura, con merge. None borra el campo."""
+    backend().guardar_settings_guilds(cambios)
 
-    doc = server_ref.get()
-    data = doc.to_dict() or {}
+def escuchar_settings_guilds(callback):
+    """Listener de la configuración por servidor. NotImplementedError si el backend no tiene."""
+    return backend().escuchar_settings_guilds(callback)
 
-    cartas_usuario = data.get(user_id, [])
+@medir("settings_guilds")
+def migrar_settings_guilds() -> int:
+    return backend().migrar_settings_guilds()
 
-    # Simplemente añadimos (permitiendo duplicados si quieres múltiples copias)
-    cartas_actualizadas = cartas_usuario + nuevas_cartas
+# Backup de settings
+@resiliente()
+@medir("settings_backup", escrituras=1)
+def backup_settings(settings: Dict) -> None:
+    backend().backup_settings(settings)
 
-    server_ref.set(
-        {user_id: cartas_actualizadas},
-        merge=True
-    )
-    
-def quitar_cartas_inventario(server_id: str, user_id: str, cartas_a_quitar: list[str]) -> bool:
-    """
-    Quita UNA copia por cada ID en cartas_a_quitar del inventario del usuario.
-    Devuelve True si se modificó algo, False si no había cartas que quitar.
-    """
-    server_ref = db.collection(INVENTARIO_COLLECTION).document(server_id)
+# Cartas en propiedad del usuario (formato antiguo)
+@resiliente(lectura=True)
+@medir("propiedades", lecturas=1)
+def cargar_propiedades() -> Dict:
+    return backend().cargar_propiedades()
 
-    doc = server_ref.get()
-    data = doc.to_dict() or {}
+@resiliente()
+@medir("propiedades", escrituras=1)
+def guardar_propiedades(servidor_id: str, usuario_id: str, cartas: list) -> None:
+    backend().guardar_propiedades(servidor_id, usuario_id, cartas)
 
-    cartas_usuario = data.get(user_id, [])
+# Packs: un registro por usuario, así abrir un pack solo lee y escribe el de quien lo abre
+@resiliente(lectura=True)
+@medir("packs", lecturas=1)
+def cargar_pack_usuario(servidor_id: str, usuario_id: str) -> Dict:
+    return backend().cargar_pack_usuario(servidor_id, usuario_id)
 
-    if not cartas_usuario:
-        return False
+@resiliente()
+@medir("packs", escrituras=1)
+def guardar_pack_usuario(servidor_id: str, usuario_id: str, datos: Dict) -> None:
+    backend().guardar_pack_usuario(servidor_id, usuario_id, datos)
 
-    # Trabajamos con strings normalizadas
-    cartas_usuario = [str(c) for c in cartas_usuario]
-    objetivos = [str(c) for c in cartas_a_quitar]
+@resiliente(lectura=True, guardar_ultimo=False, plazo=PLAZO_MASIVO)
+@medir("packs", lecturas=lambda r: max(1, _registros(r)))
+def cargar_packs() -> Dict:
+    """Todos los registros como {servidor: {usuario: datos}}: solo backups y owner."""
+    return backend().cargar_packs()
 
-    changed = False
+@resiliente(plazo=PLAZO_MASIVO)
+@medir("packs", escrituras=lambda r, packs: _registros(packs))
+def guardar_packs(packs: Dict) -> None:
+    backend().guardar_packs(packs)
 
-    for objetivo in objetivos:
-        if objetivo in cartas_usuario:
-            cartas_usuario.remove(objetivo)  # quita solo UNA copia
-            changed = True
+@medir("packs")
+def migrar_packs_global() -> int:
+    return backend().migrar_packs_global()
 
-    if not changed:
-        return False
 
-    # Actualizar solo el campo del usuario
-    server_ref.set(
-        {user_id: cartas_usuario},
-        merge=True
-    )
-    return True
+# Mazos
+@resiliente(lectura=True)
+@medir("mazos", lecturas=1)
+def cargar_datos_mazos(servidor_id: str, usuario_id: str) -> Dict:
+    """Entrada completa del usuario: mazos A, B, C y reservas, en una sola lectura."""
+    return backend().cargar_datos_mazos(servidor_id, usuario_id)
+
+@resiliente(lectura=True)
+@medir("mazos", lecturas=1)
+def cargar_mazos(servidor_id: str, usuario_id: str) -> Dict[str, List[int]]:
+    return backend().cargar_mazos(servidor_id, usuario_id)
+
+@resiliente(lectura=True)
+@medir("mazos", lecturas=1)
+def cargar_reservas(servidor_id: str, usuario_id: str) -> Dict[str, int]:
+    """Copias de cada carta reservadas en los mazos del usuario {id_carta: copias}."""
+    return backend().cargar_reservas(servidor_id, usuario_id)
+
+@resiliente(lectura=True)
+@medir("mazos", lecturas=1)
+def cargar_mazo(servidor_id: str, usuario_id: str, letra_mazo: str) -> List[int]:
+    return backend().cargar_mazo(servidor_id, usuario_id, letra_mazo)
+
+@resiliente()
+@medir("mazos", lecturas=1, escrituras=1)
+def guardar_mazo(servidor_id: str, usuario_id: str, letra_mazo: str, cartas: List[int]) -> None:
+    """Guarda un mazo (A, B o C) y las reservas del usuario de forma atómica."""
+    backend().guardar_mazo(servidor_id, usuario_id, letra_mazo, cartas)
+
+
+# Inventario: {id_carta: copias} por usuario
+@medir("inventario", lecturas=1, escrituras=lambda r, *_: 1 if r else 0)
+def migrar_inventario_servidor(server_id: str) -> int:
+    return backend().migrar_inventario_servidor(server_id)
+
+@medir("inventario")
+def migrar_inventarios() -> tuple[int, int]:
+    """Migra todos los servidores. Devuelve (servidores, usuarios migrados)."""
+    return backend().migrar_inventarios()
+
+@resiliente(idempotente=False)
+@medir("inventario", escrituras=1)
+def agregar_cartas_inventario(server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
+    """Añade una copia por cada ID. No lee antes y no pierde altas concurrentes."""
+    backend().agregar_cartas_inventario(server_id, user_id, nuevas_cartas)
 
-def cargar_inventario_usuario(server_id: str, user_id: str) -> list[str]:
+@resiliente(idempotente=False)
+@medir("inventario", lecturas=1, escrituras=lambda r, *_: 1 if r else 0)
+def quitar_cartas_inventario(server_id: str, user_id: str, cartas_a_quitar: list[str]) -> bool:
     """
-    Devuelve la lista de cartas del usuario.
-    Si no existe el servidor o el usuario, devuelve [].
+    Quita UNA copia por cada ID en cartas_a_quitar del inventario del usuario.
+    Devuelve True si se modificó algo, False si no había cartas que quitar.
     """
-    doc = db.collection(INVENTARIO_COLLECTION).document(server_id).get()
-    data = doc.to_dict() or {}
-    return data.get(user_id, [])
-
-    
\ No newline at end of file
+    return backend().quitar_cartas_inventario(server_id, user_id, cartas_a_quitar)
+
+@resiliente(lectura=True)
+@medir("inventario", lecturas=1)
+def cargar_inventario_usuario(server_id: str, user_id: str) -> dict[str, int]:
+    """Inventario del usuario como {id_carta: copias} ({} si no tiene)."""
+    return backend().cargar_inventario_usuario(server_id, user_id)
+
+@resiliente(idempotente=False)
+@medir("inventario", escrituras=lambda r, incrementos, marca=None: len(incrementos) + (marca is not None))
+def aplicar_incrementos(incrementos: Dict[str, Dict[str, Dict[str, int]]], marca: str | None = None) -> None:
+    """Suma {servidor: {usuario: {id_carta: copias}}} en una sola escritura atómica."""
+    backend().aplicar_incrementos(incrementos, marca)
+
+@resiliente(lectura=True, guardar_ultimo=False)
+@medir("inventario_marcas", lecturas=1)
+def marca_aplicada(marca: str) -> bool:
+    return backend().marca_aplicada(marca)
+
+@resiliente()
+@medir("inventario_marcas", escrituras=lambda r, marcas: len(marcas))
+def borrar_marcas(marcas: list[str]) -> None:
+    backend().borrar_marcas(marcas)
+
+@resiliente(idempotente=False)
+@medir("inventario", lecturas=2, escrituras=1)
+def transferir_cartas(server_id: str, movimientos: list) -> None:
+    """
+    Valida y aplica una lista de transferencias.Movimiento de forma atómica.
+    Lanza transferencias.TransferenciaRechazada si algún origen no tiene
+    copias libres; en ese caso no se escribe nada.
+    """
+    backend().transferir_cartas(server_id, movimientos)
@@ -0,0 +1,32 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Número máximo de llamadas bloqueantes (Firestore, disco...) en paralelo.
+# Acotado para que un pico de comandos no abra cientos de hilos.
+MAX_HILOS = 8
+# Hilos para dibujar imágenes (Pillow). Van aparte: varios /pack y páginas del
+# álbum a la vez no deben dejar sin hilos ni hacer esperar a las lecturas y
+# escrituras del almacenamiento, que cuentan contra su plazo.
+MAX_HILOS_IMAGENES = 2
+
+_executor = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="bloqueante")
+_executor_imagenes = ThreadPoolExecutor(max_workers=MAX_HILOS_IMAGENES, thread_name_prefix="imagenes")
+
+
+async def _en(executor: ThreadPoolExecutor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Como asyncio.to_thread: la función ve las ContextVar de quien la llama (p. ej. el comando)
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(contexto.run, func, *args, **kwargs))
+
+
+async def en_hilo(func, *args, **kwargs):
+    """Ejecuta una función síncrona en el pool acotado sin bloquear el bucle de eventos."""
+    return await _en(_executor, func, *args, **kwargs)
+
+
+async def en_hilo_imagen(func, *args, **kwargs):
+    """Como en_hilo, en el pool propio de las imágenes."""
+    return await _en(_executor_imagenes, func, *args, **kwargs)
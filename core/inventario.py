@@ -0,0 +1,117 @@
+"""
+Inventario como mapa {id_carta: copias}.
+
+El formato antiguo guardaba una lista con una entrada por copia y tipos
+mezclados (int/str). Estas funciones convierten entre ambos y operan sobre
+el mapa, de modo que contar o comprobar la propiedad de una carta es O(1).
+"""
+import hashlib
+
+
+def a_mapa(valor) -> dict[str, int]:
+    """Normaliza un inventario (lista antigua o mapa) a {str(id): copias > 0}."""
+    if isinstance(valor, dict):
+        return {str(cid): int(n) for cid, n in valor.items() if int(n) > 0}
+
+    mapa: dict[str, int] = {}
+    for cid in valor or []:
+        cid = str(cid)
+        mapa[cid] = mapa.get(cid, 0) + 1
+    return mapa
+
+
+def es_formato_antiguo(valor) -> bool:
+    return isinstance(valor, list)
+
+
+def sumar(mapa: dict[str, int], ids) -> dict[str, int]:
+    """Añade una copia por cada ID (se admiten repetidos). Modifica y devuelve el mapa."""
+    for cid in ids:
+        cid = str(cid)
+        mapa[cid] = mapa.get(cid, 0) + 1
+    return mapa
+
+
+def restar(mapa: dict[str, int], ids) -> bool:
+    """
+    Quita una copia por cada ID que exista en el mapa y elimina las entradas
+    que llegan a 0. Devuelve True si se quitó alguna copia.
+    """
+    cambiado = False
+    for cid in ids:
+        cid = str(cid)
+        n = mapa.get(cid, 0)
+        if n <= 0:
+            continue
+        if n == 1:
+            del mapa[cid]
+        else:
+            mapa[cid] = n - 1
+        cambiado = True
+    return cambiado
+
+
+def copias(mapa: dict[str, int], cid) -> int:
+    return mapa.get(str(cid), 0)
+
+
+def total(mapa: dict[str, int]) -> int:
+    return sum(mapa.values())
+
+
+def expandir(mapa: dict[str, int]) -> list[str]:
+    """Lista con una entrada por copia, ordenada por ID (orden de salida de las cartas)."""
+    resultado = []
+    for cid in sorted(mapa, key=lambda c: int(c) if c.isdigit() else 0):
+        resultado.extend([cid] * mapa[cid])
+    return resultado
+
+
+def version(mapa: dict[str, int]) -> str:
+    """Huella del contenido del inventario: cambia en cuanto cambia alguna copia."""
+    h = hashlib.blake2b(digest_size=8)
+    for cid in sorted(mapa):
+        if mapa[cid] > 0:
+            h.update(f"{cid}:{mapa[cid]};".encode())
+    return h.hexdigest()
+
+
+# Reservas: copias de cada carta puestas en los mazos del usuario.
+# Se guardan junto a los mazos en mazos/{server_id}.{usuario}.reservas y las
+# mantiene firebase_storage.guardar_mazo, así "¿puede salir esta copia?" es
+# una consulta a un diccionario.
+
+def contar_reservas(mazos: dict) -> dict[str, int]:
+    """{id_carta: copias en mazos} a partir de {letra: [ids]}."""
+    reservas: dict[str, int] = {}
+    for letra in ("A", "B", "C"):
+        sumar(reservas, mazos.get(letra, []))
+    return reservas
+
+
+def reservas(datos_mazos) -> dict[str, int]:
+    """
+    Reservas de un usuario a partir de su entrada en mazos/{server_id}.
+    Los usuarios guardados antes de existir el campo se calculan al vuelo.
+    """
+    if not isinstance(datos_mazos, dict):
+        return {}
+    guardadas = datos_mazos.get("reservas")
+    if isinstance(guardadas, dict):
+        return a_mapa(guardadas)
+    return contar_reservas(datos_mazos)
+
+
+def libres(mapa: dict[str, int], reservas: dict[str, int], cid) -> int:
+    """Copias de la carta que pueden salir de la colección (no están en mazos)."""
+    cid = str(cid)
+    return max(mapa.get(cid, 0) - reservas.get(cid, 0), 0)
+
+
+def todas_libres(mapa: dict[str, int], reservas: dict[str, int]) -> dict[str, int]:
+    """Versión en bloque de libres(): solo las cartas con alguna copia libre."""
+    return {
+        cid: n - reservas.get(cid, 0)
+        for cid, n in mapa.items()
+        if n > reservas.get(cid, 0)
+    }
@@ -0,0 +1,389 @@
+"""
+Escritura diferida (write-behind) de las altas de inventario.
+
+Reclamar un spawn o abrir un pack solo suma copias, así que no hace falta
+escribir en el momento: la suma se guarda en memoria y se anota en un diario
+local (solo se añade, con fsync). Cada INTERVALO_VACIADO segundos, o antes si
+se acumulan UMBRAL_COPIAS copias, todo lo pendiente se escribe de golpe: un
+documento por servidor con los incrementos de todos sus usuarios, en lotes de
+como mucho backend.max_documentos_lote documentos.
+
+Las lecturas de inventario suman lo pendiente a lo guardado. Las bajas
+(quitar, transferir) vacían antes lo pendiente de los implicados, así validan
+contra el total real.
+
+Recuperación tras un corte: el diario se divide en segmentos. Al vaciar se
+cierra el segmento actual y se escribe un plan con los trozos a aplicar, cada
+uno con una marca que el backend guarda en la misma escritura atómica. Al
+arrancar, un plan sin terminar se reanuda aplicando solo los trozos cuya marca
+no está guardada, y los segmentos posteriores se vuelven a cargar como
+pendientes: ninguna alta se pierde ni se aplica dos veces.
+
+Sin iniciar() (scripts, benchmarks) las altas se escriben directamente.
+"""
+import asyncio
+import json
+import os
+import threading
+import uuid
+
+from core import firebase_storage as _fs
+from core import inventario
+from core.hilos import en_hilo
+
+# Segundos entre vaciados
+INTERVALO_VACIADO = 2.0
+# Copias pendientes que adelantan el vaciado
+UMBRAL_COPIAS = 200
+# Vaciados terminados entre dos borrados de sus marcas (se borran de una vez)
+VACIADOS_POR_BORRADO = 100
+
+DIRECTORIO_DIARIO = os.path.join("data", "diario_inventario")
+PLAN = "plan.json"
+
+
+def _sumar_lote(destino: dict, lote: dict) -> None:
+    """Suma {servidor: {usuario: {id_carta: copias}}} sobre `destino`."""
+    for servidor_id, usuarios in lote.items():
+        for usuario_id, conteo in usuarios.items():
+            mapa = destino.setdefault(servidor_id, {}).setdefault(usuario_id, {})
+            for cid, n in conteo.items():
+                mapa[cid] = mapa.get(cid, 0) + n
+
+
+def _trocear(lote: dict, maximo: int | None) -> list[dict]:
+    servidores = list(lote.items())
+    paso = maximo or len(servidores) or 1
+    return [dict(servidores[i:i + paso]) for i in range(0, len(servidores), paso)]
+
+
+def _escribir_json(ruta: str, datos) -> None:
+    # Escritura atómica: o queda el archivo anterior o el nuevo completo
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+def _borrar(ruta: str) -> None:
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+class InventarioDiferido:
+    def __init__(self, directorio: str | None = DIRECTORIO_DIARIO,
+                 intervalo: float = INTERVALO_VACIADO, umbral: int = UMBRAL_COPIAS):
+        self.directorio = directorio  # None: sin diario
+        self.intervalo = intervalo
+        self.umbral = umbral
+
+        self._lock = threading.Lock()
+        self._cambio = threading.Condition(self._lock)
+        # Escritura en el diario (con fsync) y cambio de segmento; se toma antes
+        # que _lock, que así nunca espera a un fsync
+        self._lock_diario = threading.Lock()
+        self._pendientes: dict[str, dict[str, dict[str, int]]] = {}
+        self._copias_pendientes = 0
+        # Vaciado en curso o que falló a medias: se termina antes que nada
+        self._plan: dict | None = None
+        # Trozo del plan escribiéndose ahora mismo (ver leer())
+        self._en_curso: dict | None = None
+        # Sube al empezar y al acabar la escritura de cada trozo (ver leer())
+        self._version = 0
+
+        self._archivo = None
+        self._segmento = 0
+        self._nombre_segmento: str | None = None
+        self._cerrados: list[str] = []
+        self._marcas_viejas: list[str] = []
+        # Valor de self.vaciados en el último borrado de marcas
+        self._vaciados_al_borrar = 0
+
+        self._activo = False
+        self._tarea: asyncio.Task | None = None
+        self._despertar: asyncio.Event | None = None
+        # Un solo vaciado a la vez, también si se cancela la tarea que lo esperaba
+        self._un_vaciado = threading.Lock()
+
+        # Contadores para las estadísticas
+        self.altas = 0
+        self.vaciados = 0
+        self.lotes = 0
+        self.documentos = 0
+
+    # ------------------------------
+    # Arranque y parada
+    # ------------------------------
+    async def iniciar(self) -> None:
+        """Recupera el diario, vacía lo que hubiera pendiente y arranca el bucle."""
+        if self._activo:
+            return
+        # Sin crear el backend: Firebase se inicializa después de conectar
+        if _fs.nombre_backend() == "memoria":
+            # Los datos no sobreviven a un reinicio: no hay nada que recuperar
+            self.directorio = None
+        if self.directorio is not None:
+            await en_hilo(self._recuperar)
+
+        self._despertar = asyncio.Event()
+        self._activo = True
+        self._tarea = asyncio.create_task(self._bucle())
+        if self._plan is not None or self._pendientes:
+            self._despertar.set()
+
+    async def detener(self) -> None:
+        """Para el bucle y escribe lo pendiente."""
+        if not self._activo:
+            return
+        self._tarea.cancel()
+        self._activo = False
+        try:
+            # Con _activo a False también se borran las marcas acumuladas
+            await en_hilo(self._vaciar)
+        except Exception as e:
+            # Sigue en el diario: se aplicará en el próximo arranque
+            print(f"[ERROR] Vaciado final del inventario: {e}")
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    async def _bucle(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+            try:
+                await self.vaciar()
+            except Exception as e:
+                print(f"[ERROR] Vaciado del inventario: {e}")
+
+    def _recuperar(self) -> None:
+        os.makedirs(self.directorio, exist_ok=True)
+        en_plan = set()
+        ruta_plan = os.path.join(self.directorio, PLAN)
+        if os.path.exists(ruta_plan):
+            with open(ruta_plan, encoding="utf-8") as f:
+                self._plan = json.load(f)
+            en_plan = set(self._plan["segmentos"])
+            # No se sabe qué trozos llegaron a aplicarse: se comprueban sus marcas
+            for trozo in self._plan["trozos"]:
+                trozo["comprobar"] = True
+
+        segmentos = sorted(n for n in os.listdir(self.directorio) if n.startswith("segmento-"))
+        for nombre in segmentos:
+            if nombre in en_plan:
+                continue
+            with open(os.path.join(self.directorio, nombre), encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        alta = json.loads(linea)
+                    except ValueError:
+                        # Última línea a medias: el corte fue antes del fsync
+                        continue
+                    _sumar_lote(self._pendientes, {alta["s"]: {alta["u"]: alta["c"]}})
+                    self._copias_pendientes += sum(alta["c"].values())
+            self._cerrados.append(nombre)
+
+        if segmentos:
+            self._segmento = int(segmentos[-1].split("-")[1].split(".")[0]) + 1
+        self._abrir_segmento()
+
+        if self._plan is not None or self._pendientes:
+            print(f"[INFO] Diario de inventario: {self._copias_pendientes} copias pendientes"
+                  f"{' y un vaciado sin terminar' if self._plan else ''}.")
+
+    def _abrir_segmento(self) -> None:
+        self._nombre_segmento = f"segmento-{self._segmento:08d}.jsonl"
+        self._archivo = open(os.path.join(self.directorio, self._nombre_segmento), "a", encoding="utf-8")
+        self._segmento += 1
+
+    # ------------------------------
+    # Altas
+    # ------------------------------
+    async def agregar(self, server_id: str, user_id: str, nuevas_cartas: list[str]) -> None:
+        """Suma una copia por cada ID; se escribirá en el próximo vaciado."""
+        if not self._activo:
+            await en_hilo(_fs.agregar_cartas_inventario, server_id, user_id, nuevas_cartas)
+            return
+        if await en_hilo(self._registrar, server_id, user_id, nuevas_cartas) >= self.umbral:
+            self._despertar.set()
+
+    def _registrar(self, server_id: str, user_id: str, nuevas_cartas: list[str]) -> int:
+        conteo = inventario.sumar({}, nuevas_cartas)
+        if not conteo:
+            with self._lock:
+                return self._copias_pendientes
+        # _lock_diario y no _lock durante el fsync: las lecturas no esperan al disco.
+        # El alta entra en _pendientes antes de soltarlo, así un plan nunca se
+        # lleva el segmento con el alta sin llevarse también el alta
+        with self._lock_diario:
+            # Primero al diario: si se corta aquí, el alta aún no se ha confirmado
+            if self._archivo is not None:
+                self._archivo.write(json.dumps({"s": server_id, "u": user_id, "c": conteo}) + "\n")
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+            with self._lock:
+                _sumar_lote(self._pendientes, {server_id: {user_id: conteo}})
+                self._copias_pendientes += sum(conteo.values())
+                self.altas += 1
+                return self._copias_pendientes
+
+    # ------------------------------
+    # Lecturas
+    # ------------------------------
+    def leer(self, server_id: str, user_id: str) -> dict[str, int]:
+        """
+        Inventario guardado más las altas pendientes. Bloqueante: se llama
+        desde el pool de hilos. Si un trozo del vaciado empieza o termina de
+        escribirse mientras se lee, la lectura se repite para no contar dos
+        veces (ni ninguna) sus copias. Solo se espera si el trozo que se está
+        escribiendo incluye a este usuario: no se sabe si la lectura lo verá.
+        """
+        while True:
+            with self._cambio:
+                while self._en_curso is not None and user_id in self._en_curso["incrementos"].get(server_id, {}):
+                    self._cambio.wait()
+                version = self._version
+            guardado = _fs.cargar_inventario_usuario(server_id, user_id)
+            with self._lock:
+                if self._version != version:
+                    continue
+                extra = {}
+                _sumar_lote(extra, {server_id: {user_id: self._pendientes.get(server_id, {}).get(user_id, {})}})
+                for trozo in (self._plan or {}).get("trozos", []):
+                    if not trozo["hecho"]:
+                        _sumar_lote(extra, {server_id: {user_id: trozo["incrementos"].get(server_id, {}).get(user_id, {})}})
+            for cid, n in extra[server_id][user_id].items():
+                guardado[cid] = guardado.get(cid, 0) + n
+            return guardado
+
+    def tiene_pendientes(self, server_id: str, usuarios) -> bool:
+        with self._lock:
+            if self._plan is not None:
+                return True
+            pendientes = self._pendientes.get(server_id, {})
+            return any(uid in pendientes for uid in usuarios)
+
+    # ------------------------------
+    # Vaciado
+    # ------------------------------
+    async def vaciar(self) -> int:
+        """Escribe todo lo pendiente. Devuelve cuántas escrituras (lotes) ha hecho."""
+        if not self._activo:
+            return 0
+        return await en_hilo(self._vaciar)
+
+    def _vaciar(self) -> int:
+        with self._un_vaciado:
+            lotes = self._vaciar_planes()
+            cada = self.vaciados - self._vaciados_al_borrar >= VACIADOS_POR_BORRADO
+            if self._marcas_viejas and (cada or not self._activo):
+                try:
+                    _fs.borrar_marcas(self._marcas_viejas)
+                    self._marcas_viejas = []
+                    self._vaciados_al_borrar = self.vaciados
+                except Exception as e:
+                    print(f"[ERROR] No se pudieron borrar las marcas del diario: {e}")
+            return lotes
+
+    def _vaciar_planes(self) -> int:
+        lotes = 0
+        # Primero un plan que hubiera fallado a medias y después lo acumulado
+        for _ in range(2):
+            # _lock_diario: ninguna alta a medias entre el diario y _pendientes
+            with self._lock_diario:
+                with self._lock:
+                    nuevo = self._plan is None
+                    if nuevo:
+                        if not self._pendientes:
+                            break
+                        self._plan = self._crear_plan()
+                # El plan ya cuenta en leer(): el fsync del archivo va fuera de _lock
+                if nuevo and self.directorio is not None:
+                    _escribir_json(os.path.join(self.directorio, PLAN), self._plan)
+            lotes += self._ejecutar_plan()
+        return lotes
+
+    def _crear_plan(self) -> dict:
+        # Con los dos cerrojos tomados: las altas nuevas van ya al segmento siguiente
+        lote, self._pendientes, self._copias_pendientes = self._pendientes, {}, 0
+        plan_id = uuid.uuid4().hex
+        plan = {
+            "id": plan_id,
+            "segmentos": [],
+            "trozos": [
+                {"marca": f"{plan_id}-{i}", "incrementos": trozo, "hecho": False}
+                for i, trozo in enumerate(_trocear(lote, _fs.backend().max_documentos_lote))
+            ],
+        }
+        if self.directorio is not None:
+            self._archivo.close()
+            plan["segmentos"] = self._cerrados + [self._nombre_segmento]
+            self._cerrados = []
+            self._abrir_segmento()
+        return plan
+
+    def _marcar_hecho(self, trozo: dict) -> None:
+        with self._cambio:
+            trozo["hecho"] = True
+            self._version += 1
+
+    def _ejecutar_plan(self) -> int:
+        plan = self._plan
+        lotes = 0
+        for trozo in plan["trozos"]:
+            if trozo["hecho"]:
+                continue
+            if trozo.get("comprobar") and _fs.marca_aplicada(trozo["marca"]):
+                self._marcar_hecho(trozo)
+                continue
+            with self._cambio:
+                self._en_curso = trozo
+                self._version += 1
+            try:
+                _fs.aplicar_incrementos(trozo["incrementos"], trozo["marca"] if self.directorio else None)
+                trozo["hecho"] = True
+            except Exception:
+                # Pudo confirmarse antes del error: al reintentar se mira la marca
+                trozo["comprobar"] = True
+                raise
+            finally:
+                with self._cambio:
+                    self._en_curso = None
+                    self._version += 1
+                    self._cambio.notify_all()
+            lotes += 1
+            self.documentos += len(trozo["incrementos"])
+
+        # Todo aplicado: el diario de este plan ya no hace falta
+        if self.directorio is not None:
+            for nombre in plan["segmentos"]:
+                _borrar(os.path.join(self.directorio, nombre))
+            _borrar(os.path.join(self.directorio, PLAN))
+            self._marcas_viejas.extend(trozo["marca"] for trozo in plan["trozos"])
+        with self._lock:
+            self._plan = None
+        self.vaciados += 1
+        self.lotes += lotes
+        return lotes
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "activo": self._activo,
+                "diario": self.directorio is not None,
+                "copias_pendientes": self._copias_pendientes,
+                "altas": self.altas,
+                "vaciados": self.vaciados,
+                "lotes": self.lotes,
+                "documentos": self.documentos,
+            }
+
+
+inventario_diferido = InventarioDiferido()
@@ -0,0 +1,105 @@
+"""
+Lecturas compartidas (single-flight) con una caché corta encima.
+
+Si varios comandos piden a la vez el mismo inventario o los mismos mazos,
+solo el primero lee del backend; el resto espera esa misma lectura y recibe
+su resultado. Después el valor se sirve de memoria durante TTL_LECTURA
+segundos. Las escrituras de core/firebase_async invalidan la clave: una
+lectura que estaba en vuelo al escribir ya no se guarda en la caché.
+
+Cuenta lecturas reales, compartidas y aciertos de caché por documento
+(colección y servidor) para ver en /cache_stats cuántos viajes se ahorran.
+"""
+import asyncio
+import time
+from collections import Counter
+
+from core.hilos import en_hilo
+
+# Segundos que se reutiliza una lectura
+TTL_LECTURA = 2.0
+# Entradas a partir de las cuales se limpian las caducadas
+MAX_ENTRADAS = 5000
+
+
+def _documento(clave: tuple) -> str:
+    # ("inventario", servidor, usuario) -> "inventario/servidor"
+    return "/".join(str(parte) for parte in clave[:2])
+
+
+class LecturaUnica:
+    def __init__(self, ttl: float = TTL_LECTURA):
+        self.ttl = ttl
+        self._en_vuelo: dict[tuple, asyncio.Future] = {}
+        self._cache: dict[tuple, tuple[float, object]] = {}
+        # Se incrementa en cada invalidación para no guardar lecturas anteriores a una escritura
+        self._generacion: dict[tuple, int] = {}
+
+        # Contadores por documento
+        self.lecturas: Counter = Counter()
+        self.compartidas: Counter = Counter()
+        self.aciertos: Counter = Counter()
+
+    async def obtener(self, clave: tuple, func, *args):
+        """Valor de func(*args) en el pool de hilos, compartido entre llamadas con la misma clave."""
+        documento = _documento(clave)
+
+        guardado = self._cache.get(clave)
+        if guardado is not None:
+            if time.monotonic() - guardado[0] < self.ttl:
+                self.aciertos[documento] += 1
+                return guardado[1]
+            del self._cache[clave]
+
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(self._leer(clave, func, args))
+            # Si todos los que esperaban se cancelan, el error no queda sin recoger
+            tarea.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._en_vuelo[clave] = tarea
+        else:
+            self.compartidas[documento] += 1
+        # shield: cancelar a uno de los que esperan no cancela la lectura de los demás
+        return await asyncio.shield(tarea)
+
+    async def _leer(self, clave: tuple, func, args):
+        generacion = self._generacion.get(clave, 0)
+        self.lecturas[_documento(clave)] += 1
+        try:
+            valor = await en_hilo(func, *args)
+        finally:
+            if self._en_vuelo.get(clave) is asyncio.current_task():
+                del self._en_vuelo[clave]
+        if self._generacion.get(clave, 0) == generacion:
+            if len(self._cache) >= MAX_ENTRADAS:
+                self._purgar()
+            self._cache[clave] = (time.monotonic(), valor)
+        return valor
+
+    def _purgar(self) -> None:
+        limite = time.monotonic() - self.ttl
+        for clave in [c for c, (momento, _) in self._cache.items() if momento < limite]:
+            del self._cache[clave]
+
+    def invalidar(self, clave: tuple) -> None:
+        self._cache.pop(clave, None)
+        # Quien lea después de la escritura no se une a una lectura anterior a ella
+        self._en_vuelo.pop(clave, None)
+        self._generacion[clave] = self._generacion.get(clave, 0) + 1
+
+    def estadisticas(self, maximo: int = 10) -> dict:
+        lecturas = sum(self.lecturas.values())
+        ahorradas = sum(self.compartidas.values()) + sum(self.aciertos.values())
+        return {
+            "lecturas": lecturas,
+            "compartidas": sum(self.compartidas.values()),
+            "aciertos": sum(self.aciertos.values()),
+            "ahorro": ahorradas / (lecturas + ahorradas) if lecturas + ahorradas else 0.0,
+            "por_documento": [
+                (documento, n, self.compartidas[documento], self.aciertos[documento])
+                for documento, n in self.lecturas.most_common(maximo)
+            ],
+        }
+
+
+lecturas = LecturaUnica()
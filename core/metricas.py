@@ -0,0 +1,58 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil p (0-100) por el método del rango más cercano. 0 si no hay datos."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, max(0, math.ceil(p * len(ordenados) / 100) - 1))
+    return ordenados[idx]
+
+
+class MonitorLag:
+    """
+    Mide el retraso del bucle de eventos: duerme `intervalo` segundos y anota
+    cuánto tarda de más en despertar. Si algo bloquea el bucle (una llamada
+    síncrona a Firestore, por ejemplo), el retraso lo refleja.
+    """
+
+    def __init__(self, intervalo: float = 0.25, ventana: int = 2400):
+        self.intervalo = intervalo
+        self.muestras: deque[float] = deque(maxlen=ventana)
+        self._tarea: asyncio.Task | None = None
+
+    def iniciar(self):
+        # on_ready puede dispararse varias veces (reconexiones)
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+    def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+            self._tarea = None
+
+    async def _bucle(self):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(self.intervalo)
+            retraso = time.perf_counter() - inicio - self.intervalo
+            self.muestras.append(max(0.0, retraso))
+
+    def resumen(self) -> dict:
+        """Devuelve p50/p95/p99/max del retraso en milisegundos."""
+        muestras = list(self.muestras)
+        return {
+            "muestras": len(muestras),
+            "p50_ms": percentil(muestras, 50) * 1000,
+            "p95_ms": percentil(muestras, 95) * 1000,
+            "p99_ms": percentil(muestras, 99) * 1000,
+            "max_ms": max(muestras, default=0.0) * 1000,
+        }
+
+
+# Monitor global del bot
+monitor_lag = MonitorLag()
@@ -0,0 +1,204 @@
+"""
+Métricas del almacenamiento: latencia y coste de cada llamada.
+
+Cada función de core/firebase_storage se envuelve con @medir: se cronometra y
+se anota por operación, colección y comando que la originó. El comando sale
+de la ContextVar `comando_actual`, que main.py fija antes de cada comando;
+core/hilos copia el contexto al pool, así que llega a la llamada síncrona.
+
+Las lecturas y escrituras siguen el modelo de facturación de Firestore
+(documentos leídos y escritos); con los backends locales son equivalentes.
+Los bytes son el tamaño aproximado en JSON de lo leído y lo enviado.
+
+Las latencias van en histogramas de cubetas fijas (memoria constante) de los
+que se estiman p50/p95/p99. Los totales de lecturas, escrituras y bytes se
+guardan por día (UTC) y comando durante DIAS_GUARDADOS días.
+Se consultan con /storage_stats y en formato Prometheus o JSON en /metrics.
+"""
+import bisect
+import datetime
+import functools
+import json
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+# Comando en curso; fuera de un comando (bucles, tareas de fondo) queda el valor por defecto
+SIN_COMANDO = "(background)"
+comando_actual: ContextVar[str] = ContextVar("comando_actual", default=SIN_COMANDO)
+
+# Límites superiores de las cubetas de latencia, en milisegundos
+LIMITES_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+DIAS_GUARDADOS = 7
+
+
+class Histograma:
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_MS) + 1)
+        self.cuenta = 0
+        self.suma_ms = 0.0
+        self.maximo_ms = 0.0
+
+    def anotar(self, ms: float) -> None:
+        self.cubetas[bisect.bisect_left(LIMITES_MS, ms)] += 1
+        self.cuenta += 1
+        self.suma_ms += ms
+        self.maximo_ms = max(self.maximo_ms, ms)
+
+    def percentil(self, p: float) -> float:
+        """Estimación del percentil p (0-100) interpolando dentro de la cubeta."""
+        if not self.cuenta:
+            return 0.0
+        objetivo = p / 100 * self.cuenta
+        acumulado = 0
+        for i, n in enumerate(self.cubetas):
+            if n and acumulado + n >= objetivo:
+                inferior = LIMITES_MS[i - 1] if i else 0.0
+                superior = LIMITES_MS[i] if i < len(LIMITES_MS) else self.maximo_ms
+                return min(inferior + (superior - inferior) * (objetivo - acumulado) / n, self.maximo_ms)
+            acumulado += n
+        return self.maximo_ms
+
+
+def _tamano(valor) -> int:
+    if valor is None:
+        return 0
+    try:
+        return len(json.dumps(valor, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _etiqueta(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+
+class MetricasAlmacen:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias: dict[tuple[str, str], Histograma] = {}
+        self.llamadas: Counter = Counter()  # (operación, colección, comando)
+        self.errores: Counter = Counter()   # (operación, colección)
+        # Totales desde el arranque y por día: {comando: Counter(lecturas, escrituras, bytes)}
+        self.totales: dict[str, Counter] = {}
+        self.por_dia: dict[str, dict[str, Counter]] = {}
+        self.inicio = time.time()
+
+    def anotar(self, operacion: str, coleccion: str, segundos: float,
+               lecturas: int = 0, escrituras: int = 0, bytes_: int = 0, error: bool = False) -> None:
+        comando = comando_actual.get()
+        dia = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        coste = Counter(lecturas=lecturas, escrituras=escrituras, bytes=bytes_)
+        with self._lock:
+            self.latencias.setdefault((operacion, coleccion), Histograma()).anotar(segundos * 1000)
+            self.llamadas[(operacion, coleccion, comando)] += 1
+            if error:
+                self.errores[(operacion, coleccion)] += 1
+            self.totales.setdefault(comando, Counter()).update(coste)
+            if dia not in self.por_dia:
+                self.por_dia[dia] = {}
+                for viejo in sorted(self.por_dia)[:-DIAS_GUARDADOS]:
+                    del self.por_dia[viejo]
+            self.por_dia[dia].setdefault(comando, Counter()).update(coste)
+
+    # ------------------------------
+    # Exportación
+    # ------------------------------
+    def resumen(self) -> dict:
+        """Todo en un dict serializable a JSON (para /metrics?format=json y /storage_stats)."""
+        with self._lock:
+            operaciones = []
+            for (operacion, coleccion), h in sorted(self.latencias.items(), key=lambda x: -x[1].cuenta):
+                operaciones.append({
+                    "operacion": operacion,
+                    "coleccion": coleccion,
+                    "llamadas": h.cuenta,
+                    "errores": self.errores[(operacion, coleccion)],
+                    "p50_ms": h.percentil(50),
+                    "p95_ms": h.percentil(95),
+                    "p99_ms": h.percentil(99),
+                    "max_ms": h.maximo_ms,
+                })
+            return {
+                "desde": self.inicio,
+                "operaciones": operaciones,
+                "por_dia": {
+                    dia: {comando: dict(coste) for comando, coste in comandos.items()}
+                    for dia, comandos in self.por_dia.items()
+                },
+            }
+
+    def prometheus(self) -> str:
+        """Formato de texto de Prometheus."""
+        lineas = [
+            "# HELP yamai_storage_latency_seconds Latencia de las llamadas al almacenamiento.",
+            "# TYPE yamai_storage_latency_seconds histogram",
+        ]
+        with self._lock:
+            for (operacion, coleccion), h in sorted(self.latencias.items()):
+                etiquetas = f'op="{_etiqueta(operacion)}",coleccion="{_etiqueta(coleccion)}"'
+                acumulado = 0
+                for limite, n in zip(LIMITES_MS, h.cubetas):
+                    acumulado += n
+                    lineas.append(f'yamai_storage_latency_seconds_bucket{{{etiquetas},le="{limite / 1000:g}"}} {acumulado}')
+                lineas.append(f'yamai_storage_latency_seconds_bucket{{{etiquetas},le="+Inf"}} {h.cuenta}')
+                lineas.append(f"yamai_storage_latency_seconds_sum{{{etiquetas}}} {h.suma_ms / 1000:.6f}")
+                lineas.append(f"yamai_storage_latency_seconds_count{{{etiquetas}}} {h.cuenta}")
+
+            lineas += ["# HELP yamai_storage_calls_total Llamadas por operación y comando.",
+                       "# TYPE yamai_storage_calls_total counter"]
+            for (operacion, coleccion, comando), n in sorted(self.llamadas.items()):
+                lineas.append(
+                    f'yamai_storage_calls_total{{op="{_etiqueta(operacion)}",coleccion="{_etiqueta(coleccion)}",'
+                    f'comando="{_etiqueta(comando)}"}} {n}'
+                )
+
+            lineas += ["# HELP yamai_storage_errors_total Llamadas que lanzaron una excepción.",
+                       "# TYPE yamai_storage_errors_total counter"]
+            for (operacion, coleccion), n in sorted(self.errores.items()):
+                lineas.append(f'yamai_storage_errors_total{{op="{_etiqueta(operacion)}",coleccion="{_etiqueta(coleccion)}"}} {n}')
+
+            for clave, nombre, ayuda in (
+                ("lecturas", "yamai_storage_document_reads_total", "Documentos leídos (modelo de Firestore)."),
+                ("escrituras", "yamai_storage_document_writes_total", "Documentos escritos (modelo de Firestore)."),
+                ("bytes", "yamai_storage_bytes_total", "Bytes aproximados leídos y enviados."),
+            ):
+                lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"]
+                for comando, coste in sorted(self.totales.items()):
+                    lineas.append(f'{nombre}{{comando="{_etiqueta(comando)}"}} {coste[clave]}')
+        return "\n".join(lineas) + "\n"
+
+
+metricas_almacen = MetricasAlmacen()
+
+
+def medir(coleccion: str, lecturas=0, escrituras=0):
+    """
+    Decorador para las funciones de core/firebase_storage. `lecturas` y
+    `escrituras` son un número fijo o una función (resultado, *args) -> int.
+    Si la llamada falla solo cuentan las lecturas fijas.
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = func(*args, **kwargs)
+            except Exception:
+                metricas_almacen.anotar(
+                    func.__name__, coleccion, time.perf_counter() - inicio,
+                    lecturas=lecturas if isinstance(lecturas, int) else 0, error=True
+                )
+                raise
+            segundos = time.perf_counter() - inicio
+            metricas_almacen.anotar(
+                func.__name__, coleccion, segundos,
+                lecturas=lecturas(resultado, *args) if callable(lecturas) else lecturas,
+                escrituras=escrituras(resultado, *args) if callable(escrituras) else escrituras,
+                bytes_=_tamano(resultado) + _tamano(args),
+            )
+            return resultado
+        return envoltura
+    return decorador
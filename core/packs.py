@@ -0,0 +1,122 @@
+"""
+Lógica de los packs diarios compartida por /pack y /status.
+
+Cada registro de usuario lleva el día (en la zona horaria del servidor) al
+que pertenece su contador: "packs abiertos hoy" se deduce al leer comparando
+ese día con el actual, así que no hace falta ningún reinicio a medianoche.
+"""
+import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+ZONA_POR_DEFECTO = "UTC"
+
+
+def zona_servidor(servidor_settings: dict) -> ZoneInfo:
+    """Zona horaria configurada para el servidor (UTC si no hay o no es válida)."""
+    try:
+        return ZoneInfo(servidor_settings.get("timezone") or ZONA_POR_DEFECTO)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(ZONA_POR_DEFECTO)
+
+
+def zona_valida(nombre: str) -> bool:
+    try:
+        ZoneInfo(nombre)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def leer_fecha(texto: str | None, zona: ZoneInfo) -> datetime.datetime | None:
+    """
+    Convierte ultimo_paquete a la zona del servidor. Los valores antiguos no
+    llevan zona (hora del servidor del bot, UTC) y algunos solo traen la fecha.
+    """
+    if not texto:
+        return None
+    try:
+        fecha = datetime.datetime.fromisoformat(texto)
+    except ValueError:
+        try:
+            fecha = datetime.datetime.fromisoformat(texto + "T00:00:00")
+        except ValueError:
+            return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=datetime.timezone.utc)
+    return fecha.astimezone(zona)
+
+
+def formato_restante(restante: datetime.timedelta) -> str:
+    horas, resto = divmod(max(int(restante.total_seconds()), 0), 3600)
+    return f"{horas}h {resto // 60}m"
+
+
+class EstadoPacks:
+    """Situación de un usuario respecto a los packs en un instante dado."""
+
+    def __init__(self, usuario_packs: dict, pack_limit: int, zona: ZoneInfo,
+                 ahora: datetime.datetime | None = None):
+        self.pack_limit = pack_limit
+        self.zona = zona
+        self.ahora = (ahora or datetime.datetime.now(datetime.timezone.utc)).astimezone(zona)
+        self.dia = self.ahora.date().isoformat()
+
+        hoy = self.ahora.date()
+        self.inicio_dia = datetime.datetime.combine(hoy, datetime.time.min, tzinfo=zona)
+        self.medianoche = datetime.datetime.combine(hoy + datetime.timedelta(days=1), datetime.time.min, tzinfo=zona)
+
+        self.ultimo = leer_fecha(usuario_packs.get("ultimo_paquete"), zona)
+
+        # El contador solo vale para el día con el que se guardó. Los registros
+        # antiguos sin "dia" usan la fecha del último pack.
+        dia_guardado = usuario_packs.get("dia")
+        if dia_guardado is None and self.ultimo is not None:
+            dia_guardado = self.ultimo.date().isoformat()
+        self.abiertos_hoy = usuario_packs.get("packs_opened", 0) if dia_guardado == self.dia else 0
+
+        # Franjas del día: con pack_limit = N hay N franjas de 24/N horas
+        self.intervalo_minutos = int(24 * 60 / pack_limit)
+        self.franja_actual = self._franja(self.ahora)
+
+    def _franja(self, fecha: datetime.datetime) -> int:
+        return (fecha.hour * 60 + fecha.minute) // self.intervalo_minutos
+
+    def limite_alcanzado(self) -> bool:
+        return self.abiertos_hoy >= self.pack_limit
+
+    def abierto_en_franja(self) -> bool:
+        return (
+            self.ultimo is not None
+            and self.ultimo.date() == self.ahora.date()
+            and self._franja(self.ultimo) == self.franja_actual
+        )
+
+    def _hasta(self, fecha: datetime.datetime) -> datetime.timedelta:
+        # Restar dos fechas de la misma ZoneInfo da la diferencia de reloj, no el
+        # tiempo transcurrido: en los cambios de hora sobraría o faltaría una hora
+        utc = datetime.timezone.utc
+        return fecha.astimezone(utc) - self.ahora.astimezone(utc)
+
+    def hasta_medianoche(self) -> datetime.timedelta:
+        return self._hasta(self.medianoche)
+
+    def hasta_siguiente_franja(self) -> datetime.timedelta:
+        siguiente = self.inicio_dia + datetime.timedelta(minutes=(self.franja_actual + 1) * self.intervalo_minutos)
+        return self._hasta(siguiente)
+
+    def ventanas(self) -> list[datetime.datetime]:
+        """Próximos inicios de franja, ordenados (para mostrarlos como timestamps)."""
+        ventanas = []
+        for i in range(self.pack_limit):
+            ventana = self.inicio_dia + datetime.timedelta(minutes=i * self.intervalo_minutos)
+            # si la ventana ya pasó hoy, se empuja a mañana
+            if ventana < self.ahora:
+                ventana += datetime.timedelta(days=1)
+            ventanas.append(ventana)
+        return sorted(ventanas)
+
+    def registrar_apertura(self, usuario_packs: dict) -> None:
+        """Anota en el registro un pack abierto ahora."""
+        usuario_packs["ultimo_paquete"] = self.ahora.isoformat()
+        usuario_packs["dia"] = self.dia
+        usuario_packs["packs_opened"] = self.abiertos_hoy + 1
@@ -0,0 +1,115 @@
+"""
+Vista en memoria de lo que posee cada usuario (inventario y mazos).
+
+Sirve para responder al autocompletado de Discord sin tocar Firestore: si la
+vista de un usuario no está en caché se devuelve None y se programa su carga
+en segundo plano, de modo que las siguientes pulsaciones ya la encuentran.
+Las escrituras de core/firebase_async invalidan la entrada del usuario.
+"""
+import asyncio
+import time
+from collections import Counter, OrderedDict
+
+from core import inventario
+
+# Segundos que una vista se considera válida
+TTL_VISTA = 300.0
+# Vistas guardadas como mucho; se descartan las menos usadas
+MAX_VISTAS = 2000
+
+
+class VistaPropiedad:
+    """Copias poseídas y copias reservadas en mazos de un usuario."""
+
+    def __init__(self, inventario: dict[str, int], reservas: dict[str, int]):
+        self.inventario: Counter = Counter(inventario)
+        self.en_mazos: Counter = Counter(reservas)
+        self.creada = time.monotonic()
+
+    def libres(self, cid) -> int:
+        """Copias de una carta que pueden salir de la colección."""
+        return inventario.libres(self.inventario, self.en_mazos, cid)
+
+    def disponibles(self) -> dict[str, int]:
+        """Copias que pueden salir de la colección (no reservadas en mazos)."""
+        return inventario.todas_libres(self.inventario, self.en_mazos)
+
+
+_vistas: OrderedDict[tuple[str, str], VistaPropiedad] = OrderedDict()
+_cargando: set[tuple[str, str]] = set()
+# Cargas en curso por usuario y su generación, que sube en cada invalidación
+# para descartar las que se solapan con una escritura. Solo hay entrada
+# mientras alguna carga del usuario está en marcha.
+_en_vuelo: Counter = Counter()
+_generacion: dict[tuple[str, str], int] = {}
+# Referencias a las precargas: asyncio solo guarda referencias débiles
+_tareas: set[asyncio.Task] = set()
+
+
+def vista_en_cache(servidor_id: str, usuario_id: str) -> VistaPropiedad | None:
+    """Devuelve la vista si está en memoria y no ha caducado. Nunca hace red."""
+    clave = (servidor_id, usuario_id)
+    vista = _vistas.get(clave)
+    if vista is None:
+        return None
+    if time.monotonic() - vista.creada > TTL_VISTA:
+        del _vistas[clave]
+        return None
+    _vistas.move_to_end(clave)
+    return vista
+
+
+def _guardar(clave: tuple[str, str], vista: VistaPropiedad) -> None:
+    _vistas[clave] = vista
+    _vistas.move_to_end(clave)
+    while len(_vistas) > MAX_VISTAS:
+        _vistas.popitem(last=False)
+
+
+def invalidar(servidor_id: str, usuario_id: str) -> None:
+    clave = (servidor_id, usuario_id)
+    _vistas.pop(clave, None)
+    if clave in _generacion:
+        _generacion[clave] += 1
+
+
+async def cargar_vista(servidor_id: str, usuario_id: str) -> VistaPropiedad:
+    """Lee inventario y mazos del usuario y guarda la vista en caché."""
+    # Import diferido: firebase_async importa este módulo para invalidar
+    from core import firebase_async
+
+    clave = (servidor_id, usuario_id)
+    generacion = _generacion.setdefault(clave, 0)
+    _en_vuelo[clave] += 1
+    try:
+        inv = await firebase_async.cargar_inventario_usuario(servidor_id, usuario_id)
+        reservas = await firebase_async.cargar_reservas(servidor_id, usuario_id)
+        vista = VistaPropiedad(inv, reservas)
+        if _generacion[clave] == generacion:
+            _guardar(clave, vista)
+        return vista
+    finally:
+        _en_vuelo[clave] -= 1
+        if not _en_vuelo[clave]:
+            del _en_vuelo[clave]
+            del _generacion[clave]
+
+
+def precargar(servidor_id: str, usuario_id: str) -> None:
+    """Programa la carga de la vista en segundo plano (una sola vez a la vez)."""
+    clave = (servidor_id, usuario_id)
+    if clave in _cargando:
+        return
+    _cargando.add(clave)
+
+    async def _tarea():
+        try:
+            await cargar_vista(servidor_id, usuario_id)
+        except Exception as e:
+            print(f"[ERROR] precarga de propiedad {clave}: {e}")
+        finally:
+            _cargando.discard(clave)
+
+    tarea = asyncio.create_task(_tarea())
+    _tareas.add(tarea)
+    tarea.add_done_callback(_tareas.discard)
@@ -0,0 +1,291 @@
+"""
+Reintentos, plazos y cortocircuito para las llamadas al almacenamiento.
+
+Las funciones de core/firebase_storage se decoran con @resiliente:
+
+- Solo se reintentan los errores transitorios (es_reintentable): red caída,
+  Firestore no disponible, cuota, contención de transacciones o SQLite
+  bloqueado. El resto (una transferencia rechazada, permisos...) sube tal cual.
+- Entre intentos se espera un backoff exponencial con jitter completo. No se
+  reintenta si la espera más lo que tardó el intento fallido no cabe en el
+  plazo de la operación, más corto que los 3 s que tiene una interacción para
+  responder.
+- Las escrituras que no son idempotentes (incrementos, bajas, transferencias)
+  no se reintentan: el error pudo llegar después de confirmarse.
+- Tras FALLOS_PARA_ABRIR fallos seguidos el cortocircuito se abre y durante
+  SEGUNDOS_ABIERTO las llamadas fallan al instante con AlmacenNoDisponible.
+  Las lecturas devuelven mientras tanto el último valor leído, si lo hay.
+  Pasado ese tiempo una única llamada de prueba decide si se cierra.
+
+El plazo cuenta desde que `llamar` encola la llamada en el pool y llega
+también al backend: plazo_restante() dice cuánto le queda a la operación y
+core/backends/firestore lo pasa como timeout= a cada llamada, así que un
+Firestore colgado devuelve el hilo del pool con un error que cuenta como
+fallo. Una llamada que sale de la cola con el plazo ya agotado no se intenta.
+
+core/firebase_async además corta con `llamar` la espera del comando al llegar
+al plazo. Ese corte cuenta en contadores["plazos"] y como fallo del
+cortocircuito: las llamadas que no aceptan timeout (begin y commit de las
+transacciones) no avisarían si no. Un éxito pone a cero los fallos seguidos,
+así que un plazo suelto en una llamada lenta pero sana no lo abre.
+"""
+import asyncio
+import copy
+import functools
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+
+from core.hilos import en_hilo
+
+# Plazos por operación, en segundos (una interacción tiene 3 s para responder)
+PLAZO_LECTURA = 2.0
+PLAZO_ESCRITURA = 2.5
+
+# Intentos totales y backoff entre ellos
+INTENTOS = 3
+ESPERA_BASE = 0.1
+ESPERA_MAXIMA = 1.0
+
+# Cortocircuito
+FALLOS_PARA_ABRIR = 5
+SEGUNDOS_ABIERTO = 30.0
+
+# Últimas lecturas guardadas para servirlas con el cortocircuito abierto
+MAX_ULTIMOS = 5000
+
+
+# time.monotonic() en que vence la operación @resiliente en curso (la lee el backend)
+_limite: ContextVar[float | None] = ContextVar("limite_almacen", default=None)
+
+
+def plazo_restante() -> float | None:
+    """Segundos que le quedan a la operación en curso; None fuera de @resiliente."""
+    limite = _limite.get()
+    if limite is None:
+        return None
+    # Siempre algo de margen: un timeout nulo o negativo no sirve como plazo
+    return max(0.05, limite - time.monotonic())
+
+
+class AlmacenNoDisponible(Exception):
+    """El almacenamiento no responde: cortocircuito abierto, plazo o reintentos agotados."""
+
+
+class ErrorTransitorio(Exception):
+    """Fallo pasajero genérico (inyección de fallos y backends locales)."""
+
+
+_errores_google = None
+
+
+def _transitorios_google() -> tuple:
+    # Import diferido: google.api_core solo está con el backend de Firestore
+    global _errores_google
+    if _errores_google is None:
+        try:
+            from google.api_core import exceptions as g
+            _errores_google = (
+                g.ServiceUnavailable, g.DeadlineExceeded, g.InternalServerError, g.GatewayTimeout,
+                g.TooManyRequests, g.ResourceExhausted, g.Aborted, g.RetryError,
+            )
+        except ImportError:
+            _errores_google = ()
+    return _errores_google
+
+
+def es_reintentable(error: BaseException) -> bool:
+    """True si el error es pasajero y la misma llamada puede salir bien al repetirla."""
+    if isinstance(error, (ErrorTransitorio, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, sqlite3.OperationalError):
+        mensaje = str(error).lower()
+        return "locked" in mensaje or "busy" in mensaje
+    return isinstance(error, _transitorios_google())
+
+
+class Cortocircuito:
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, fallos_para_abrir: int = FALLOS_PARA_ABRIR, segundos_abierto: float = SEGUNDOS_ABIERTO):
+        self.fallos_para_abrir = fallos_para_abrir
+        self.segundos_abierto = segundos_abierto
+        self.estado = self.CERRADO
+        self.fallos_seguidos = 0
+        self.aperturas = 0
+        self._abierto_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """False si la llamada debe fallar sin intentarlo."""
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO and time.monotonic() >= self._abierto_hasta:
+                # Deja pasar una sola llamada de prueba
+                self.estado = self.SEMIABIERTO
+                return True
+            return False
+
+    def exito(self) -> None:
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos_seguidos = 0
+
+    def fallo(self) -> None:
+        with self._lock:
+            self.fallos_seguidos += 1
+            if self.estado == self.SEMIABIERTO or (
+                self.estado == self.CERRADO and self.fallos_seguidos >= self.fallos_para_abrir
+            ):
+                self.estado = self.ABIERTO
+                self._abierto_hasta = time.monotonic() + self.segundos_abierto
+                self.aperturas += 1
+                print(f"[WARN] Almacenamiento degradado: cortocircuito abierto {self.segundos_abierto:.0f} s")
+
+
+class Resiliencia:
+    def __init__(self, intentos: int = INTENTOS, cortocircuito: Cortocircuito | None = None):
+        self.intentos = intentos
+        self.cortocircuito = cortocircuito or Cortocircuito()
+        self._ultimos: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # reintentos, rechazadas (sin intentar), obsoletas (último valor servido), plazos, agotadas
+        self.contadores: Counter = Counter()
+
+    def ejecutar(self, func, args: tuple, kwargs: dict, plazo: float,
+                 lectura: bool, idempotente: bool, guardar_ultimo: bool):
+        limite = time.monotonic() + plazo
+        # Con `llamar` el plazo empezó a contar antes, al encolar la llamada en el pool
+        anterior = _limite.get()
+        if anterior is not None:
+            limite = min(limite, anterior)
+            if time.monotonic() >= limite:
+                # Quien llamó ya ha dejado de esperar: ni se intenta
+                raise AlmacenNoDisponible(f"{func.__name__}: plazo agotado esperando un hilo libre")
+        token = _limite.set(limite)
+        try:
+            return self._intentar(func, args, kwargs, limite, lectura, idempotente, guardar_ultimo)
+        finally:
+            _limite.reset(token)
+
+    def _intentar(self, func, args: tuple, kwargs: dict, limite: float,
+                  lectura: bool, idempotente: bool, guardar_ultimo: bool):
+        clave = (func.__name__, args) if lectura and guardar_ultimo else None
+        intento = 0
+        while True:
+            if not self.cortocircuito.permitir():
+                self.contadores["rechazadas"] += 1
+                return self._ultimo_o_error(clave, AlmacenNoDisponible(f"{func.__name__}: cortocircuito abierto"))
+            inicio = time.monotonic()
+            try:
+                valor = func(*args, **kwargs)
+            except Exception as e:
+                if not es_reintentable(e):
+                    # El backend ha respondido: no es un problema de disponibilidad
+                    self.cortocircuito.exito()
+                    raise
+                self.cortocircuito.fallo()
+                intento += 1
+                espera = random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** (intento - 1)))
+                # El siguiente intento se estima tan largo como el que acaba de fallar
+                ahora = time.monotonic()
+                cabe = ahora + espera + (ahora - inicio) < limite
+                if not (lectura or idempotente) or intento >= self.intentos or not cabe:
+                    self.contadores["agotadas"] += 1
+                    return self._ultimo_o_error(clave, AlmacenNoDisponible(f"{func.__name__}: {e!r}"), e)
+                self.contadores["reintentos"] += 1
+                time.sleep(espera)
+                continue
+            self.cortocircuito.exito()
+            if clave is not None:
+                # Copias: quien llama puede modificar el valor que recibe
+                with self._lock:
+                    self._ultimos[clave] = copy.deepcopy(valor)
+                    self._ultimos.move_to_end(clave)
+                    if len(self._ultimos) > MAX_ULTIMOS:
+                        self._ultimos.popitem(last=False)
+            return valor
+
+    def _ultimo_o_error(self, clave, error: AlmacenNoDisponible, causa: BaseException | None = None):
+        if clave is not None:
+            with self._lock:
+                if clave in self._ultimos:
+                    self.contadores["obsoletas"] += 1
+                    return copy.deepcopy(self._ultimos[clave])
+        raise error from causa
+
+    def plazo_agotado(self) -> None:
+        self.contadores["plazos"] += 1
+        self.cortocircuito.fallo()
+
+    def estadisticas(self) -> dict:
+        return {
+            "estado": self.cortocircuito.estado,
+            "aperturas": self.cortocircuito.aperturas,
+            "reintentos": self.contadores["reintentos"],
+            "rechazadas": self.contadores["rechazadas"],
+            "obsoletas": self.contadores["obsoletas"],
+            "plazos": self.contadores["plazos"],
+            "agotadas": self.contadores["agotadas"],
+        }
+
+    def prometheus(self) -> str:
+        e = self.estadisticas()
+        lineas = [
+            "# HELP yamai_storage_circuit_open 1 si el cortocircuito del almacenamiento está abierto.",
+            "# TYPE yamai_storage_circuit_open gauge",
+            f"yamai_storage_circuit_open {int(e['estado'] != Cortocircuito.CERRADO)}",
+        ]
+        for clave, nombre in (("reintentos", "retries"), ("rechazadas", "fast_failures"), ("obsoletas", "stale_reads"),
+                              ("plazos", "deadline_exceeded"), ("agotadas", "exhausted")):
+            lineas += [f"# TYPE yamai_storage_{nombre}_total counter", f"yamai_storage_{nombre}_total {e[clave]}"]
+        return "\n".join(lineas) + "\n"
+
+
+resiliencia = Resiliencia()
+
+
+def resiliente(lectura: bool = False, idempotente: bool = True, guardar_ultimo: bool = True,
+               plazo: float | None = None):
+    """
+    Decorador para las funciones síncronas de core/firebase_storage.
+    `guardar_ultimo=False` en lecturas que nunca deben servirse obsoletas.
+    """
+    if plazo is None:
+        plazo = PLAZO_LECTURA if lectura else PLAZO_ESCRITURA
+
+    def decorador(func):
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            return resiliencia.ejecutar(func, args, kwargs, plazo, lectura, idempotente, guardar_ultimo)
+        envoltura.plazo = plazo
+        return envoltura
+    return decorador
+
+
+async def con_plazo(corrutina, plazo: float, nombre: str):
+    """Espera la corrutina como mucho `plazo` segundos; si no, AlmacenNoDisponible."""
+    try:
+        return await asyncio.wait_for(corrutina, plazo)
+    except asyncio.TimeoutError:
+        resiliencia.plazo_agotado()
+        raise AlmacenNoDisponible(f"{nombre}: sin respuesta en {plazo:.1f} s") from None
+
+
+async def llamar(func, *args, **kwargs):
+    """en_hilo con el plazo de la operación: el comando deja de esperar al agotarse."""
+    plazo = getattr(func, "plazo", None)
+    if plazo is None:
+        return await en_hilo(func, *args, **kwargs)
+    # El hilo hereda el límite (ContextVar): la espera en la cola del pool cuenta
+    token = _limite.set(time.monotonic() + plazo)
+    try:
+        return await con_plazo(en_hilo(func, *args, **kwargs), plazo, func.__name__)
+    finally:
+        _limite.reset(token)
@@ -0,0 +1,129 @@
+"""
+Motor de transferencias de cartas entre usuarios de un mismo servidor.
+
+Un intercambio, un regalo o un descarte es una lista de movimientos
+(origen -> destino). La validación de propiedad y de copias reservadas en
+mazos y la escritura se hacen dentro de una única transacción del backend
+(core/firebase_storage.transferir_cartas), así que o se aplican todos los
+movimientos o ninguno.
+"""
+from collections import Counter
+
+from core import inventario
+
+NO_TIENE = "You don't own that card."
+EN_MAZOS = "All your copies of that card are currently in your decks."
+
+
+class TransferenciaRechazada(Exception):
+    """La transferencia no se puede hacer; no se ha escrito nada."""
+
+    def __init__(self, usuario_id: str, carta_id: str, motivo: str):
+        super().__init__(motivo)
+        self.usuario_id = usuario_id
+        self.carta_id = carta_id
+        self.motivo = motivo
+
+
+class Movimiento:
+    """
+    Mueve `copias` de una carta de `origen` a `destino`.
+    destino=None significa descartarla.
+    """
+
+    def __init__(self, origen: str, destino: str | None, carta_id, copias: int = 1):
+        self.origen = str(origen)
+        self.destino = str(destino) if destino is not None else None
+        self.carta_id = str(carta_id)
+        self.copias = copias
+
+    def __repr__(self):
+        return f"Movimiento({self.origen} -> {self.destino}, {self.carta_id} x{self.copias})"
+
+
+def usuarios_implicados(movimientos: list[Movimiento]) -> list[str]:
+    usuarios = []
+    for m in movimientos:
+        for uid in (m.origen, m.destino):
+            if uid is not None and uid not in usuarios:
+                usuarios.append(uid)
+    return usuarios
+
+
+def aplicar(inventarios: dict, mazos: dict, movimientos: list[Movimiento]) -> dict[str, dict[str, int]]:
+    """
+    Valida los movimientos contra los inventarios y mazos leídos y devuelve
+    los inventarios resultantes {usuario: {id_carta: copias}}.
+    Lanza TransferenciaRechazada si algún origen no tiene copias libres.
+    """
+    antes = {uid: inventario.a_mapa(inventarios.get(uid)) for uid in usuarios_implicados(movimientos)}
+
+    # Se agrupan las salidas para validar varias copias de la misma carta a la vez
+    salidas = Counter()
+    for m in movimientos:
+        salidas[(m.origen, m.carta_id)] += m.copias
+
+    for (uid, cid), n in salidas.items():
+        poseidas = inventario.copias(antes[uid], cid)
+        if poseidas == 0:
+            raise TransferenciaRechazada(uid, cid, NO_TIENE)
+        if inventario.libres(antes[uid], inventario.reservas(mazos.get(uid)), cid) < n:
+            raise TransferenciaRechazada(uid, cid, EN_MAZOS)
+
+    despues = {uid: dict(mapa) for uid, mapa in antes.items()}
+    for m in movimientos:
+        inventario.restar(despues[m.origen], [m.carta_id] * m.copias)
+        if m.destino is not None:
+            inventario.sumar(despues[m.destino], [m.carta_id] * m.copias)
+    return despues
+
+
+def cambios(antes: dict[str, int], despues: dict[str, int]) -> dict:
+    """Entradas {id_carta: copias | None} que difieren; None indica borrar la entrada."""
+    return {
+        cid: despues.get(cid)
+        for cid in set(antes) | set(despues)
+        if antes.get(cid) != despues.get(cid)
+    }
+
+
+async def transferir(servidor_id: str, movimientos: list[Movimiento]) -> None:
+    """
+    Ejecuta los movimientos en una transacción.
+    Lanza TransferenciaRechazada si no se pueden hacer.
+    """
+    # Import diferido: firebase_storage importa este módulo para validar
+    from core.firebase_async import transferir_cartas
+    await transferir_cartas(servidor_id, movimientos)
+
+
+async def intercambiar(servidor_id: str, uid1: str, carta1, uid2: str, carta2) -> None:
+    await transferir(servidor_id, [
+        Movimiento(uid1, uid2, carta1),
+        Movimiento(uid2, uid1, carta2),
+    ])
+
+
+async def regalar(servidor_id: str, origen: str, destino: str, carta) -> None:
+    await transferir(servidor_id, [Movimiento(origen, destino, carta)])
+
+
+async def descartar(servidor_id: str, usuario_id: str, carta) -> None:
+    await transferir(servidor_id, [Movimiento(usuario_id, None, carta)])
+
+
+async def puede_transferir(servidor_id: str, usuario_id: str, carta) -> tuple[bool, str | None]:
+    """
+    Comprobación previa (sin transacción) para avisar antes de pedir nada al
+    otro usuario: (True, None) si tiene una copia libre de la carta, o
+    (False, motivo) con el mismo mensaje que daría la transferencia.
+    """
+    from core.firebase_async import cargar_inventario_usuario, cargar_reservas
+    cid = str(carta)
+    inv = await cargar_inventario_usuario(servidor_id, usuario_id)
+    if inventario.copias(inv, cid) == 0:
+        return False, NO_TIENE
+    reservas = await cargar_reservas(servidor_id, usuario_id)
+    if inventario.libres(inv, reservas, cid) == 0:
+        return False, EN_MAZOS
+    return True, None
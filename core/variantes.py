@@ -0,0 +1,78 @@
+"""
+Variantes precalculadas de las imágenes de cartas.
+
+generar_variantes.py crea, para cada PNG de cartas/, tres tamaños en WebP y
+en PNG optimizado:
+
+    cartas/variantes/{tamaño}/{nombre}.{formato}
+
+salvo "full" en PNG, que es el propio original (ya está mejor comprimido que
+lo que saca Pillow y copiarlo duplicaría la carpeta).
+
+keep_alive.py las sirve con /cartas/<nombre>.png?size=thumb|medium|full
+(&format=webp|png; WebP por defecto). Si falta la variante se sirve el
+original, así que las URLs funcionan aunque no se haya ejecutado el script.
+url() añade &v=<etag> del archivo que se va a servir (core/estaticos): si la
+carta cambia, cambia la URL y las cachés no siguen con la imagen vieja.
+
+Uso según el contexto:
+    thumb   miniaturas (rejillas, composiciones)
+    medium  vistas previas al navegar (álbum, packs, mazos, elegir carta)
+    full    la carta en grande (/show, spawns)
+"""
+import os
+from urllib.parse import unquote, urlsplit
+
+from core import estaticos
+
+CARPETA_CARTAS = "cartas"
+CARPETA_VARIANTES = os.path.join(CARPETA_CARTAS, "variantes")
+
+# Ancho en píxeles de cada tamaño (None: el del original, 418 px)
+TAMANOS = {"thumb": 160, "medium": 300, "full": None}
+FORMATOS = ("webp", "png")
+FORMATO_POR_DEFECTO = "webp"
+# Combinación que no se genera: se sirve el original
+ORIGINAL = ("full", "png")
+
+
+def ruta(nombre_png: str, tamano: str, formato: str = FORMATO_POR_DEFECTO) -> str:
+    """Ruta de la variante de cartas/{nombre_png}."""
+    if (tamano, formato) == ORIGINAL:
+        return os.path.join(CARPETA_CARTAS, nombre_png)
+    base = os.path.splitext(nombre_png)[0]
+    return os.path.join(CARPETA_VARIANTES, tamano, f"{base}.{formato}")
+
+
+def archivo(carta) -> str | None:
+    """Nombre del PNG de la carta dentro de cartas/, o None si no es una imagen nuestra."""
+    imagen = str(carta.get("imagen") or "")
+    ruta = urlsplit(imagen).path
+    if "/cartas/" not in ruta:
+        return None
+    nombre = unquote(ruta.rsplit("/", 1)[-1])
+    return nombre if nombre.lower().endswith(".png") and os.sep not in nombre else None
+
+
+def _huella(nombre_png: str, tamano: str, formato: str) -> str | None:
+    """
+    ETag del archivo que servirá keep_alive.py: la variante o, si falta, el
+    original. Solo consulta el índice de core/estaticos (se llama desde el
+    bucle de eventos); mientras se crea al arrancar, la URL va sin huella.
+    """
+    for candidata in (ruta(nombre_png, tamano, formato), os.path.join(CARPETA_CARTAS, nombre_png)):
+        meta = estaticos.buscar(candidata)
+        if meta is not None:
+            return meta.etag
+    return None
+
+
+def url(carta, tamano: str, formato: str = FORMATO_POR_DEFECTO) -> str | None:
+    """URL de la imagen de la carta en el tamaño indicado (la original si no es de nuestro servidor)."""
+    imagen = carta.get("imagen")
+    if not imagen or "/cartas/" not in str(imagen) or "?" in str(imagen):
+        return imagen
+    enlace = f"{imagen}?size={tamano}&format={formato}"
+    nombre = archivo(carta)
+    huella = _huella(nombre, tamano, formato) if nombre else None
+    return f"{enlace}&v={huella}" if huella else enlace
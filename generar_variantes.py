@@ -0,0 +1,137 @@
+"""
+Genera las variantes de las imágenes de cartas (ver core/variantes.py):
+miniatura, mediana y completa, en WebP y en PNG optimizado.
+
+Se reparte entre todos los núcleos con un pool de procesos y solo rehace las
+cartas cuyo contenido ha cambiado desde la última ejecución (hash guardado en
+cartas/variantes/manifest.json). Las variantes de cartas que ya no existen se
+borran. actualizar_lista.py lo ejecuta al terminar; también puede lanzarse a
+mano o como paso de build:
+
+    python generar_variantes.py [--forzar] [--procesos N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from core import estaticos, variantes
+
+CARPETA_CARTAS = variantes.CARPETA_CARTAS
+MANIFIESTO = os.path.join(variantes.CARPETA_VARIANTES, "manifest.json")
+
+# Calidad WebP: a 85 no se distinguen del original a tamaño de embed
+CALIDAD_WEBP = 85
+# 0-6: con 6 tarda unas 60 veces más por un 2-3 % menos de tamaño
+METODO_WEBP = 4
+# Los PNG reducidos se pasan a paleta: sin ella ocupan más que el original
+COLORES_PNG = 256
+
+
+# Variantes que se escriben (la PNG a tamaño completo es el original)
+PARES = [(t, f) for t in variantes.TAMANOS for f in variantes.FORMATOS if (t, f) != variantes.ORIGINAL]
+
+
+def _escribir(imagen: Image.Image, destino: str, formato: str) -> int:
+    # Se escribe en un temporal y se renombra: el servidor nunca ve un archivo a medias
+    temporal = destino + ".tmp"
+    if formato == "webp":
+        imagen.save(temporal, "WEBP", quality=CALIDAD_WEBP, method=METODO_WEBP)
+    else:
+        imagen.quantize(COLORES_PNG, method=Image.Quantize.FASTOCTREE).save(temporal, "PNG", optimize=True)
+    os.replace(temporal, destino)
+    return os.path.getsize(destino)
+
+
+def generar(nombre: str) -> tuple[str, int]:
+    """Crea todas las variantes de cartas/{nombre}. Devuelve (nombre, bytes escritos)."""
+    total = 0
+    with Image.open(os.path.join(CARPETA_CARTAS, nombre)) as original:
+        original = original.convert("RGBA")
+        for tamano, ancho in variantes.TAMANOS.items():
+            if ancho is None or ancho >= original.width:
+                imagen = original
+            else:
+                alto = round(original.height * ancho / original.width)
+                imagen = original.resize((ancho, alto), Image.Resampling.LANCZOS)
+            for formato in variantes.FORMATOS:
+                if (tamano, formato) in PARES:
+                    total += _escribir(imagen, variantes.ruta(nombre, tamano, formato), formato)
+    return nombre, total
+
+
+def _cargar_manifiesto() -> dict[str, str]:
+    try:
+        with open(MANIFIESTO, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _borrar_huerfanas(nombres: set[str]) -> int:
+    bases = {os.path.splitext(n)[0] for n in nombres}
+    borradas = 0
+    for tamano in variantes.TAMANOS:
+        carpeta = os.path.join(variantes.CARPETA_VARIANTES, tamano)
+        for archivo in os.listdir(carpeta):
+            if os.path.splitext(archivo)[0] not in bases or archivo.endswith(".tmp"):
+                os.remove(os.path.join(carpeta, archivo))
+                borradas += 1
+    return borradas
+
+
+def generar_variantes(forzar: bool = False, procesos: int | None = None) -> None:
+    inicio = time.perf_counter()
+    for tamano in variantes.TAMANOS:
+        os.makedirs(os.path.join(variantes.CARPETA_VARIANTES, tamano), exist_ok=True)
+
+    nombres = sorted(n for n in os.listdir(CARPETA_CARTAS) if n.lower().endswith(".png"))
+    hashes = {n: estaticos.metadatos(os.path.join(CARPETA_CARTAS, n)).etag for n in nombres}
+    anterior = {} if forzar else _cargar_manifiesto()
+
+    def completa(nombre):
+        return all(os.path.exists(variantes.ruta(nombre, t, f)) for t, f in PARES)
+
+    pendientes = [n for n in nombres if anterior.get(n) != hashes[n] or not completa(n)]
+    manifiesto = {n: h for n, h in hashes.items() if n not in pendientes}
+    bytes_escritos = 0
+    errores = 0
+
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            futuros = {n: pool.submit(generar, n) for n in pendientes}
+            for hechas, (nombre, futuro) in enumerate(futuros.items(), 1):
+                try:
+                    bytes_escritos += futuro.result()[1]
+                    manifiesto[nombre] = hashes[nombre]
+                except Exception as e:
+                    errores += 1
+                    print(f"[!] {nombre}: {e}")
+                if hechas % 100 == 0:
+                    print(f"[*] {hechas}/{len(pendientes)} cartas procesadas...")
+
+    borradas = _borrar_huerfanas(set(nombres))
+    temporal = MANIFIESTO + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=0, sort_keys=True)
+    os.replace(temporal, MANIFIESTO)
+
+    print(
+        f"✅ Variantes: {len(pendientes) - errores} cartas generadas ({bytes_escritos / 2**20:.1f} MiB), "
+        f"{len(nombres) - len(pendientes)} sin cambios, {borradas} archivos huérfanos borrados, "
+        f"{errores} errores, {time.perf_counter() - inicio:.1f} s."
+    )
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera las variantes de las imágenes de cartas.")
+    parser.add_argument("--forzar", action="store_true", help="regenera todas aunque no hayan cambiado")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos del pool (por defecto, uno por núcleo)")
+    argumentos = parser.parse_args()
+    generar_variantes(argumentos.forzar, argumentos.procesos)
@@ -1,34 +1,152 @@
-# Importamos Flask y la función send_from_directory para servir archivos estáticos
-from flask import Flask, send_from_directory
+# Servidor HTTP del bot (aiohttp): keep-alive para Render, imágenes de cartas y métricas.
+# Corre en el mismo bucle de eventos que el bot, sin hilos aparte: las descargas
+# no compiten por el GIL con el gateway y el archivo se envía con sendfile.
+from aiohttp import web
+import asyncio
+import json
 import os
-import threading
 
-# Creamos la aplicación Flask
-app = Flask(__name__)
+from core import estaticos, variantes
+from core.hilos import en_hilo_imagen
+from core.metricas_almacen import metricas_almacen
+from core.resiliencia import resiliencia
 
 # Definimos la carpeta donde se encuentran las imágenes
 CARPETA_IMAGENES = os.path.join(os.getcwd(), "cartas")
 
+# Imágenes enviándose a la vez; el resto espera turno sin abrir más archivos
+MAX_DESCARGAS = 64
+# Segundos que una conexión inactiva se mantiene abierta para reutilizarla
+KEEPALIVE_SEGUNDOS = 75.0
+# Segundos que se espera a las descargas en curso al apagar
+ESPERA_CIERRE = 5.0
+
+_limite = web.AppKey("limite", asyncio.Semaphore)
+_indexado = web.AppKey("indexado", asyncio.Task)
+_runner: web.AppRunner | None = None
+
 # Ruta principal del servidor
-@app.route("/")
-def home():
+async def home(request: web.Request) -> web.Response:
     # Devuelve un mensaje simple para comprobar que el servidor funciona
-    return "Servidor Flask funcionando."
+    return web.Response(text="Servidor funcionando.")
+
+class _ImagenLimitada(web.FileResponse):
+    # Como mucho MAX_DESCARGAS envíos a la vez; aiohttp llama a prepare() una sola vez
+    def __init__(self, ruta: str, limite: asyncio.Semaphore, **kwargs):
+        super().__init__(ruta, **kwargs)
+        self._limite = limite
+
+    async def prepare(self, request):
+        async with self._limite:
+            return await super().prepare(request)
+
+# Metadatos del archivo sin tocar el disco desde el bucle: del índice
+# (core/estaticos) o, mientras se crea al arrancar, calculados en un hilo
+async def _metadatos(ruta: str) -> estaticos.Metadatos | None:
+    meta = estaticos.buscar(ruta)
+    if meta is None and not estaticos.indexado:
+        meta = await en_hilo_imagen(estaticos.metadatos_si_existe, ruta)
+    return meta
+
+# Variante pedida con ?size=thumb|medium|full&format=webp|png (core/variantes.py)
+async def _variante(request: web.Request, nombre: str) -> estaticos.Metadatos | None:
+    tamano = request.query.get("size")
+    formato = request.query.get("format", variantes.FORMATO_POR_DEFECTO)
+    if tamano is None:
+        return None
+    if tamano not in variantes.TAMANOS or formato not in variantes.FORMATOS:
+        raise web.HTTPBadRequest(text="size: thumb|medium|full, format: webp|png\n")
+    return await _metadatos(os.path.join(os.getcwd(), variantes.ruta(nombre, tamano, formato)))
 
 # Ruta para servir imágenes desde la carpeta "cartas"
-@app.route("/cartas/<nombre>")
-def servir_imagen(nombre):
-    # Busca y devuelve el archivo solicitado dentro de la carpeta de imágenes
-    return send_from_directory(CARPETA_IMAGENES, nombre)
+async def servir_imagen(request: web.Request) -> web.StreamResponse:
+    # Busca el archivo solicitado dentro de la carpeta de imágenes
+    nombre = request.match_info["nombre"]
+    original = estaticos.ruta_dentro(CARPETA_IMAGENES, nombre)
+    meta = await _metadatos(original) if original is not None else None
+    if meta is None:
+        raise web.HTTPNotFound()
+    # Si la variante pedida no existe todavía se sirve el original
+    meta = await _variante(request, nombre) or meta
+    ruta = meta.ruta
+    cabeceras = {
+        "ETag": f'"{meta.etag}"',
+        # Inmutable solo si ?v= es la huella de este archivo: si falta la variante
+        # pedida o la carta ha cambiado, la URL con la huella nueva es otra
+        "Cache-Control": estaticos.cache_control(meta, request.query.get("v")),
+    }
+    if ruta.endswith(".webp"):
+        # mimetypes no conoce .webp en todas las versiones de Python
+        cabeceras["Content-Type"] = "image/webp"
+    if estaticos.no_modificado(meta, request.headers.get("If-None-Match"), request.if_modified_since):
+        return web.Response(status=304, headers=cabeceras)
 
-# Función para iniciar el servidor Flask en un hilo separado
-def iniciar_servidor():
+    # FileResponse envía el archivo con sendfile (sin copiarlo a Python) y pone
+    # Last-Modified; su propio ETag se sustituye en _poner_etag
+    request["etag"] = cabeceras["ETag"]
+    return _ImagenLimitada(ruta, request.app[_limite], headers=cabeceras)
+
+async def _poner_etag(request: web.Request, respuesta: web.StreamResponse) -> None:
+    if "etag" in request:
+        respuesta.headers["ETag"] = request["etag"]
+
+# Métricas del almacenamiento: formato Prometheus, o JSON con ?format=json.
+# Si METRICS_TOKEN está definido hay que enviarlo como "Authorization: Bearer <token>"
+async def metricas(request: web.Request) -> web.Response:
+    token = os.environ.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return web.Response(status=401, text="No autorizado\n")
+    if request.query.get("format") == "json":
+        return web.json_response(
+            dict(metricas_almacen.resumen(), resiliencia=resiliencia.estadisticas()),
+            dumps=lambda datos: json.dumps(datos, ensure_ascii=False),
+        )
+    return web.Response(
+        text=metricas_almacen.prometheus() + resiliencia.prometheus(),
+        content_type="text/plain", headers={"X-Content-Type-Options": "nosniff"}
+    )
+
+# Al arrancar, el ETag de todas las imágenes y variantes se calcula en un hilo
+async def _indexar(app: web.Application) -> None:
+    carpetas = [CARPETA_IMAGENES] + [
+        os.path.join(os.getcwd(), variantes.CARPETA_VARIANTES, tamano) for tamano in variantes.TAMANOS
+    ]
+    app[_indexado] = asyncio.create_task(en_hilo_imagen(estaticos.indexar, carpetas))
+
+# Creamos la aplicación
+def crear_app() -> web.Application:
+    app = web.Application()
+    app[_limite] = asyncio.Semaphore(MAX_DESCARGAS)
+    app.on_startup.append(_indexar)
+    app.router.add_get("/", home)
+    app.router.add_get("/cartas/{nombre}", servir_imagen)
+    app.router.add_get("/metrics", metricas)
+    app.on_response_prepare.append(_poner_etag)
+    return app
+
+# Arranca el servidor en el bucle de eventos actual (main.py, antes de conectar el bot)
+async def iniciar_servidor(port: int | None = None) -> web.AppRunner:
+    global _runner
     # Obtiene el puerto desde la variable de entorno PORT, o usa 8080 por defecto
-    port = int(os.environ.get("PORT", 8080))
-    print(f"Servidor Flask iniciado en http://localhost:{port}")
-    # Ejecuta Flask en un hilo paralelo para no bloquear la ejecución principal
-    threading.Thread(target=lambda: app.run(host="0.0.0.0", port=port)).start()
+    port = port if port is not None else int(os.environ.get("PORT", 8080))
+    _runner = web.AppRunner(
+        crear_app(),
+        keepalive_timeout=KEEPALIVE_SEGUNDOS,
+        shutdown_timeout=ESPERA_CIERRE,
+        access_log=None,
+    )
+    await _runner.setup()
+    await web.TCPSite(_runner, "0.0.0.0", port).start()
+    print(f"Servidor HTTP iniciado en http://localhost:{port}")
+    return _runner
+
+# Deja de aceptar conexiones y espera (como mucho ESPERA_CIERRE s) a las descargas en curso
+async def detener_servidor() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
 
 # Punto de entrada del script
 if __name__ == "__main__":
-    iniciar_servidor()
+    web.run_app(crear_app(), port=int(os.environ.get("PORT", 8080)), keepalive_timeout=KEEPALIVE_SEGUNDOS)
@@ -1,17 +1,83 @@
+import time
+# Referencia para el tiempo hasta estar listo (benchmarks/bench_arranque.py)
+_inicio = time.perf_counter()
+
 import discord
 from discord.ext import commands
 from config import TOKEN, INTENTS
-from keep_alive import iniciar_servidor
+from keep_alive import iniciar_servidor, detener_servidor
+from core.metricas import monitor_lag
+from core.cartas import catalogo
+from core.busqueda import indice_busqueda
+from core.firebase_async import iniciar_memo
+from core.cache_settings import cache_settings
+from core.inventario_diferido import inventario_diferido
+from core.metricas_almacen import comando_actual
+from core.resiliencia import AlmacenNoDisponible
+from core.hilos import en_hilo
+from core import firebase_storage
+from views.errores import avisar_no_disponible
 import asyncio
 
 bot = commands.Bot(command_prefix='y!', intents=INTENTS, help_command=None)
 
-iniciar_servidor()
+
+# Memo de lecturas por interacción (core/firebase_async): cada comando empieza
+# con uno vacío, así no lee dos veces el mismo inventario o los mismos mazos.
+# También fijan el comando al que se atribuyen las llamadas al almacenamiento
+# (core/metricas_almacen)
+@bot.before_invoke
+async def memo_prefijo(ctx: commands.Context):
+    iniciar_memo()
+    comando_actual.set(f"y!{ctx.command.qualified_name}")
+
+
+async def memo_slash(interaction: discord.Interaction) -> bool:
+    iniciar_memo()
+    if interaction.command is not None:
+        comando_actual.set(f"/{interaction.command.qualified_name}")
+    return True
+
+bot.tree.interaction_check = memo_slash
+
+
+# Con el almacenamiento caído (core/resiliencia) se avisa al usuario en vez de
+# dejar la interacción sin respuesta
+async def error_slash(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+    if isinstance(getattr(error, "original", None), AlmacenNoDisponible):
+        await avisar_no_disponible(interaction)
+        return
+    await discord.app_commands.CommandTree.on_error(bot.tree, interaction, error)
+
+bot.tree.on_error = error_slash
+
+_calentamiento: asyncio.Task | None = None
+
+
+async def calentar_almacen():
+    # Crea el cliente de Firestore y abre la conexión en el pool de hilos, ya
+    # con el gateway conectado; hasta entonces nada ha inicializado Firebase
+    try:
+        await en_hilo(firebase_storage.calentar)
+    except Exception as e:
+        print(f"[ERROR] Calentamiento del almacenamiento: {e}")
+    # Caché de settings/global mantenida por un listener de Firestore
+    cache_settings.iniciar()
+
 
 @bot.event
 async def on_ready():
+    global _calentamiento
     print(f'Bot conectado como {bot.user}')
 
+    # on_ready se repite al reconectar: solo la primera vez
+    if _calentamiento is None:
+        print(f"[INFO] Listo en {time.perf_counter() - _inicio:.2f} s desde el arranque.")
+        _calentamiento = asyncio.create_task(calentar_almacen())
+
+    # Medición continua del retraso del bucle de eventos (/loop_lag)
+    monitor_lag.iniciar()
+
     # Sincroniza los comandos en tu servidor de pruebas (aparecen casi al instante)
     test_guild = discord.Object(id=286617766516228096)  # tu GUILD_ID de pruebas
     synced_test = await bot.tree.sync(guild=test_guild)
@@ -23,6 +89,17 @@ async def on_ready():
 
 
 async def main():
+    # Servidor HTTP (keep-alive e imágenes) en este mismo bucle de eventos
+    await iniciar_servidor()
+
+    # Carga única del catálogo de cartas y su índice de búsqueda antes de conectar
+    catalogo()
+    indice_busqueda()
+
+    # Altas de inventario en diferido; recupera el diario si hubo un corte.
+    # El almacenamiento y la caché de settings se inician tras on_ready
+    await inventario_diferido.iniciar()
+
     # Carga cogs normalmente
     await bot.load_extension("commands.generales")
     await bot.load_extension("commands.cartas")
@@ -31,9 +108,12 @@ async def main():
     #await bot.load_extension("commands.auto_cards")
     await bot.load_extension("commands.battle")
     await bot.load_extension("commands.debug")
-    await bot.load_extension("commands.packs_reset")
 
     # Inicia el bot SIN usar 'async with bot'
-    await bot.start(TOKEN)
+    try:
+        await bot.start(TOKEN)
+    finally:
+        await inventario_diferido.detener()
+        await detener_servidor()
 
 asyncio.run(main())
@@ -1,5 +1,6 @@
 import discord
 from typing import Callable, Dict, List, Optional
+from core import variantes
 
 
 class AcceptDuelView(discord.ui.View):
@@ -131,7 +132,7 @@ class ChooseCardView(discord.ui.View):
 
         nombre = carta.get("nombre", f"ID {cid}")
         rareza = carta.get("rareza", "N")
-        imagen = carta.get("imagen")
+        imagen = variantes.url(carta, "medium")
 
         colores = {
             "UR": 0x8841f2, "KSR": 0xabfbff, "SSR": 0x57ffae,
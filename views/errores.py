@@ -0,0 +1,31 @@
+import discord
+from discord.ui import View
+
+from core.resiliencia import AlmacenNoDisponible
+
+MENSAJE_NO_DISPONIBLE = "⚠️ The card storage is not responding right now. Please try again in a moment."
+
+
+async def avisar_no_disponible(interaction: discord.Interaction):
+    """Responde (o sigue la respuesta) con el aviso de almacenamiento caído, solo para quien pulsó."""
+    try:
+        if interaction.response.is_done():
+            await interaction.followup.send(MENSAJE_NO_DISPONIBLE, ephemeral=True)
+        else:
+            await interaction.response.send_message(MENSAJE_NO_DISPONIBLE, ephemeral=True)
+    except discord.HTTPException:
+        pass
+
+
+class VistaAlmacen(View):
+    """
+    View cuyos botones usan el almacenamiento. Los errores de los callbacks no
+    pasan por bot.tree.on_error: sin esto la interacción se queda sin respuesta
+    ("This interaction failed") cuando Firebase no contesta.
+    """
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item: discord.ui.Item):
+        if isinstance(error, AlmacenNoDisponible):
+            await avisar_no_disponible(interaction)
+            return
+        await super().on_error(interaction, error, item)
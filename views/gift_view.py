@@ -1,39 +1,11 @@
 import discord
-from discord.ui import View, button
+from discord.ui import button
 
-from core.firebase_storage import (
-    cargar_inventario_usuario,
-    quitar_cartas_inventario,
-    agregar_cartas_inventario
-)
+from core import transferencias
+from views.errores import VistaAlmacen
 
-from core.cartas import cargar_cartas
-from core.firebase_storage import cargar_mazo
 
-
-def puede_trade(sid: str, uid: str, cid: str):
-    cid = str(cid)
-
-    inv = [str(c) for c in cargar_inventario_usuario(sid, uid)]
-    total_inv = inv.count(cid)
-
-    if total_inv == 0:
-        return False, "You don't own that card."
-
-    ma = [str(c) for c in cargar_mazo(sid, uid, "A")]
-    mb = [str(c) for c in cargar_mazo(sid, uid, "B")]
-    mc = [str(c) for c in cargar_mazo(sid, uid, "C")]
-
-    total_mazos = ma.count(cid) + mb.count(cid) + mc.count(cid)
-
-    if total_inv <= total_mazos:
-        return False, "All your copies of that card are currently in your decks."
-
-    return True, None
-
-
-
-class GiftView(View):
+class GiftView(VistaAlmacen):
     def __init__(self, sender: discord.Member, recipient: discord.Member, carta_obj: dict,
                  servidor_id: str, client: discord.Client):
         super().__init__(timeout=120)
@@ -54,25 +26,17 @@ class GiftView(View):
         recipient_id = str(self.recipient.id)
         carta_id = str(self.carta_obj["id"])
 
-        # Validación completa usando puede_trade
-        ok, reason = puede_trade(servidor_id, sender_id, carta_id)
-        if not ok:
-            await interaction.response.send_message(reason, ephemeral=True)
-            self.stop()
-            return
-
-        # Transferencia de la carta
-        ok1 = quitar_cartas_inventario(servidor_id, sender_id, [carta_id])
-        if not ok1:
+        # Validación y transferencia de la carta en una única transacción
+        try:
+            await transferencias.regalar(servidor_id, sender_id, recipient_id, carta_id)
+        except transferencias.TransferenciaRechazada as e:
             await interaction.response.send_message(
-                "Could not remove the card from the sender.",
+                f"{self.sender.display_name}: {e.motivo}",
                 ephemeral=True
             )
             self.stop()
             return
 
-        agregar_cartas_inventario(servidor_id, recipient_id, [carta_id])
-
         # Log opcional
         try:
             log_guild_id = 286617766516228096
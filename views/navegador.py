@@ -1,4 +1,11 @@
+import asyncio
+import io
+from collections import Counter
 import discord
+from core import composicion, inventario, variantes
+
+# Vistas del álbum: carta a carta (None) o cuadrícula de N x N miniaturas
+VISTAS = [None, 3, 4]
 
 # Vista para navegar visualmente por las cartas de un usuario
 class Navegador(discord.ui.View):
@@ -8,10 +15,18 @@ class Navegador(discord.ui.View):
         self.cartas_ids = cartas_ids  # Lista de IDs de cartas del usuario
         self.cartas_info = cartas_info  # Diccionario con info de todas las cartas
         self.dueño = dueño  # Usuario dueño de la colección
-        self.orden = "original"  # Orden inicial (por fecha)
+        self.orden = "original"  # Orden inicial (por ID de carta)
         self.i = 0  # Índice actual de la carta mostrada
         self.message: discord.Message | None = None  # Mensaje que se enviará y luego se editará
 
+        # Modo cuadrícula: columnas (None = carta a carta), página e imagen de la página actual
+        self.columnas: int | None = None
+        self.pagina = 0
+        self.imagen_pagina: bytes | None = None
+        self.precarga: asyncio.Future | None = None
+        # Las páginas dibujadas se guardan por versión del inventario: si cambia, se redibujan
+        self.version = inventario.version(Counter(str(c) for c in cartas_ids))
+
         # Colores por rareza
         self.colores = {
             "UR": 0x8841f2, "KSR": 0xabfbff, "SSR": 0x57ffae,
@@ -73,15 +88,71 @@ class Navegador(discord.ui.View):
         return self.cartas_ids
 
 
+    def unicas(self):
+        """[(id, copias)] sin repetir, en el orden actual (para la cuadrícula)."""
+        copias = Counter(str(c) for c in self.cartas_ids)
+        return [(cid, copias[cid]) for cid in dict.fromkeys(str(c) for c in self.lista())]
+
+    def total_paginas(self):
+        por_pagina = self.columnas * self.columnas
+        return max(1, -(-len(self.unicas()) // por_pagina))
+
+    def cartas_pagina(self, pagina):
+        por_pagina = self.columnas * self.columnas
+        trozo = self.unicas()[pagina * por_pagina:(pagina + 1) * por_pagina]
+        return [(self.cartas_info.get(cid, {"id": cid}), n) for cid, n in trozo]
+
+    def dibujar(self, pagina):
+        """Imagen de la página (de la caché, ya en marcha por la precarga o dibujándose ahora)."""
+        clave = (self.version, self.orden, self.columnas, pagina)
+        return composicion.imagen_pagina(clave, self.cartas_pagina(pagina), self.columnas)
+
+    def precargar(self):
+        """
+        Empieza a dibujar la página siguiente mientras se mira la actual. Si la
+        anterior precarga sigue dibujándose no se encola otra: pasando páginas
+        deprisa solo se acumularían dibujos que nadie va a mirar.
+        """
+        if self.precarga is not None and not self.precarga.done():
+            return
+        siguiente = self.pagina + 1
+        if siguiente < self.total_paginas():
+            self.precarga = asyncio.ensure_future(self.dibujar(siguiente))
+
+    def mostrar_pagina(self):
+        """Embed de la página actual de la cuadrícula, con la imagen adjunta."""
+        por_pagina = self.columnas * self.columnas
+        unicas = self.unicas()
+        inicio = self.pagina * por_pagina
+        lineas = []
+        for n, (carta, copias) in enumerate(self.cartas_pagina(self.pagina), inicio + 1):
+            nombre = carta.get("nombre", f"ID {carta.get('id')}")
+            lineas.append(f"{n}. {nombre}" + (f" x{copias}" if copias > 1 else ""))
+
+        embed = discord.Embed(
+            title=f"{self.dueño.display_name}'s album",
+            color=0x8c8c8c,
+            description="\n".join(lineas)
+        )
+        embed.set_footer(
+            text=f"Page {self.pagina + 1} out of {self.total_paginas()} • "
+                 f"{len(unicas)} different cards, {len(self.cartas_ids)} in total"
+        )
+        embed.set_image(url="attachment://album.webp")
+        return embed, discord.File(io.BytesIO(self.imagen_pagina), filename="album.webp")
+
     def mostrar(self):
         """Construye el embed de la carta actual."""
+        if self.columnas and self.imagen_pagina is not None:
+            return self.mostrar_pagina()
+
         lista_actual = self.lista()
         carta_id = str(lista_actual[self.i])
         carta = self.cartas_info.get(carta_id, {})
         nombre = carta.get("nombre", f"ID {carta_id}")
         rareza = carta.get("rareza", "N")
         color = self.colores.get(rareza, 0x8c8c8c)
-        imagen = carta.get("imagen")
+        imagen = variantes.url(carta, "medium")
 
         # Formato de atributo y tipo
         atributo_raw = str(carta.get("atributo", "—")).lower()
@@ -128,33 +199,55 @@ class Navegador(discord.ui.View):
                 self.message = await self.context.send(embed=embed, view=self)
 
     async def actualizar(self):
-        """Actualiza el embed mostrado al cambiar de carta u orden."""
+        """
+        Actualiza el embed mostrado al cambiar de carta u orden. Los botones
+        hacen antes el defer: dibujar una página de la cuadrícula puede tardar
+        si el pool de las imágenes está ocupado y la interacción solo espera 3 s.
+        """
         lista_actual = self.lista()
         if self.i >= len(lista_actual):
             self.i = 0
+        if self.columnas:
+            self.pagina %= self.total_paginas()
+            self.imagen_pagina = await self.dibujar(self.pagina)
+            if self.imagen_pagina is None:
+                # No se pudo dibujar: se vuelve a carta a carta
+                self.columnas = None
+                self.etiqueta_vista()
         embed, archivo = self.mostrar()
         if self.message:
-            if archivo:
-                await self.message.edit(embed=embed, attachments=[archivo], view=self)
-            else:
-                await self.message.edit(embed=embed, view=self)
+            # Sin archivo se quitan los adjuntos (la imagen de la cuadrícula)
+            await self.message.edit(embed=embed, attachments=[archivo] if archivo else [], view=self)
+        if self.columnas:
+            self.precargar()
+
+    def etiqueta_vista(self):
+        for item in self.children:
+            if isinstance(item, discord.ui.Button) and item.custom_id == "vista":
+                item.label = f"🔲 View: grid {self.columnas}x{self.columnas}" if self.columnas else "🃏 View: single"
 
     # Botón para ir a la carta anterior
     @discord.ui.button(label="⬅️", style=discord.ButtonStyle.secondary)
     async def atras(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.i = (self.i - 1) % len(self.lista())
-        await self.actualizar()
+        if self.columnas:
+            self.pagina = (self.pagina - 1) % self.total_paginas()
+        else:
+            self.i = (self.i - 1) % len(self.lista())
         await interaction.response.defer()
+        await self.actualizar()
 
     # Botón para ir a la carta siguiente
     @discord.ui.button(label="➡️", style=discord.ButtonStyle.secondary)
     async def siguiente(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.i = (self.i + 1) % len(self.lista())
-        await self.actualizar()
+        if self.columnas:
+            self.pagina = (self.pagina + 1) % self.total_paginas()
+        else:
+            self.i = (self.i + 1) % len(self.lista())
         await interaction.response.defer()
+        await self.actualizar()
 
     # Botón para cambiar el orden de visualización
-    @discord.ui.button(label="📆 Order: by date", style=discord.ButtonStyle.primary, custom_id="orden")
+    @discord.ui.button(label="🆔 Order: by ID", style=discord.ButtonStyle.primary, custom_id="orden")
     async def cambiar(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Ciclar entre original → alfabetico → rareza
         if self.orden == "original":
@@ -165,11 +258,29 @@ class Navegador(discord.ui.View):
             nuevo_label = "💎 Order: by rarity"
         else:
             self.orden = "original"
-            nuevo_label = "📆 Order: by date"
+            nuevo_label = "🆔 Order: by ID"
 
         self.i = 0
+        self.pagina = 0
         for item in self.children:
             if isinstance(item, discord.ui.Button) and item.custom_id == "orden":
                 item.label = nuevo_label
+        await interaction.response.defer()
         await self.actualizar()
+
+    # Botón para cambiar entre carta a carta y cuadrícula (3x3 → 4x4 → carta a carta)
+    @discord.ui.button(label="🃏 View: single", style=discord.ButtonStyle.primary, custom_id="vista")
+    async def cambiar_vista(self, interaction: discord.Interaction, button: discord.ui.Button):
+        # La nueva vista empieza donde se estaba: la carta actual o la primera de la página
+        if self.columnas:
+            actual = str(self.cartas_pagina(self.pagina)[0][0].get("id"))
+            self.i = [str(c) for c in self.lista()].index(actual)
+        else:
+            actual = str(self.lista()[self.i])
+        self.columnas = VISTAS[(VISTAS.index(self.columnas) + 1) % len(VISTAS)]
+        if self.columnas:
+            ids = [cid for cid, _ in self.unicas()]
+            self.pagina = ids.index(actual) // (self.columnas * self.columnas) if actual in ids else 0
+        self.etiqueta_vista()
         await interaction.response.defer()
+        await self.actualizar()
@@ -1,4 +1,5 @@
 import discord
+from core import variantes
 
 class NavegadorMazo(discord.ui.View):
     def __init__(self, context, cartas_ids, cartas_info, dueño):
@@ -39,7 +40,7 @@ class NavegadorMazo(discord.ui.View):
         nombre = carta.get("nombre", f"ID {carta_id}")
         rareza = carta.get("rareza", "N")
         color = self.colores.get(rareza, 0x8c8c8c)
-        imagen = carta.get("imagen")
+        imagen = variantes.url(carta, "medium")
 
         atributo_raw = str(carta.get("atributo", "—")).lower()
         tipo_raw = str(carta.get("tipo", "—")).lower()
@@ -1,12 +1,16 @@
+import io
 import discord
+from core import composicion, variantes
 
 class NavegadorPaquete(discord.ui.View):
-    def __init__(self, context, cartas_ids, cartas_info, dueño):
+    def __init__(self, context, cartas_ids, cartas_info, dueño, resumen: bytes | None = None):
         super().__init__(timeout=300)
         self.context = context
         self.cartas_ids = cartas_ids or []      # Protección por si viene None
         self.cartas_info = cartas_info or {}
         self.dueño = dueño
+        # Imagen con todas las cartas (core/composicion.py); si está, la página 0 es el resumen
+        self.resumen = resumen if self.cartas_ids else None
         self.i = 0
         self.msg = None
 
@@ -34,12 +38,16 @@ class NavegadorPaquete(discord.ui.View):
             embed.set_footer(text=f"{self.dueño.display_name}'s daily pack")
             return embed, None
 
-        carta_id = str(self.cartas_ids[self.i])
+        if self.resumen is not None and self.i == 0:
+            return self._mostrar_resumen()
+
+        indice = self.i - 1 if self.resumen is not None else self.i
+        carta_id = str(self.cartas_ids[indice])
         carta = self.cartas_info.get(carta_id, {})
         nombre = carta.get("nombre", f"ID {carta_id}")
         rareza = carta.get("rareza", "N")
         color = self.colores.get(rareza, 0x8c8c8c)
-        imagen = carta.get("imagen")
+        imagen = variantes.url(carta, "medium")
 
         atributo_raw = str(carta.get("atributo", "—")).lower()
         tipo_raw = str(carta.get("tipo", "—")).lower()
@@ -57,7 +65,7 @@ class NavegadorPaquete(discord.ui.View):
                          f"🛡️ {carta.get('defense', '—')} | 💨 {carta.get('speed', '—')}")
         )
         embed.set_footer(
-            text=f"Card {self.i + 1} out of {len(self.cartas_ids)} • {self.dueño.display_name}'s daily pack"
+            text=f"Card {indice + 1} out of {len(self.cartas_ids)} • {self.dueño.display_name}'s daily pack"
         )
 
         if imagen and str(imagen).startswith("http"):
@@ -65,7 +73,26 @@ class NavegadorPaquete(discord.ui.View):
         else:
             embed.description += "\n⚠️ Card image not found. Please, contact my creator."
 
-        return embed, None  # archivo=None: no usamos attachments aquí
+        return embed, None  # archivo=None: las cartas sueltas van por URL
+
+    def _mostrar_resumen(self):
+        # Todas las cartas en una imagen adjunta, en el mismo orden que la lista
+        cartas = composicion.ordenar(self.cartas_ids, self.cartas_info)
+        lineas = [f"`{c.get('rareza', 'N')}` {c.get('nombre') or 'ID ' + str(c.get('id'))}" for c in cartas]
+        mejor = cartas[0].get("rareza", "N")
+        embed = discord.Embed(
+            title="Pack opened!",
+            color=self.colores.get(mejor, 0x8c8c8c),
+            description="\n".join(lineas)
+        )
+        embed.set_image(url="attachment://paquete.webp")
+        embed.set_footer(
+            text=f"Use the arrows to see each card • {self.dueño.display_name}'s daily pack"
+        )
+        return embed, discord.File(io.BytesIO(self.resumen), filename="paquete.webp")
+
+    def _paginas(self):
+        return len(self.cartas_ids) + (1 if self.resumen is not None else 0)
 
     async def enviar(self):
         embed, archivo = self.mostrar()
@@ -84,13 +111,15 @@ class NavegadorPaquete(discord.ui.View):
     async def actualizar(self, interaction: discord.Interaction | None = None):
         """Actualiza el embed mostrado al cambiar de carta."""
         embed, archivo = self.mostrar()
+        # La imagen del resumen solo se adjunta en su página; en las demás se quita
+        adjuntos = [archivo] if archivo else []
 
         if interaction:
-            await interaction.response.edit_message(embed=embed, view=self)
+            await interaction.response.edit_message(embed=embed, attachments=adjuntos, view=self)
             return
 
         if self.msg:
-            await self.msg.edit(embed=embed, view=self)
+            await self.msg.edit(embed=embed, attachments=adjuntos, view=self)
 
     @discord.ui.button(label="⬅️", style=discord.ButtonStyle.secondary)
     async def atras(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -98,7 +127,7 @@ class NavegadorPaquete(discord.ui.View):
         if not self.cartas_ids:
             await interaction.response.send_message("No cards to navigate.")
             return
-        self.i = (self.i - 1) % len(self.cartas_ids)
+        self.i = (self.i - 1) % self._paginas()
         await self.actualizar(interaction)
 
     @discord.ui.button(label="➡️", style=discord.ButtonStyle.secondary)
@@ -107,7 +136,7 @@ class NavegadorPaquete(discord.ui.View):
         if not self.cartas_ids:
             await interaction.response.send_message("No cards to navigate.")
             return
-        self.i = (self.i + 1) % len(self.cartas_ids)
+        self.i = (self.i + 1) % self._paginas()
         await self.actualizar(interaction)
 
     async def on_timeout(self):
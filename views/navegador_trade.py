@@ -1,45 +1,12 @@
 import discord, asyncio
-from discord.ui import View, button
+from discord.ui import button
 
-from core.firebase_storage import (
-    cargar_propiedades,
-    guardar_propiedades,
-    cargar_inventario_usuario,
-    quitar_cartas_inventario,
-    agregar_cartas_inventario
-)
+from core.cartas import resolver_carta, texto_sugerencias
+from core import transferencias
+from views.errores import VistaAlmacen
 
-from core.cartas import cargar_cartas
-from core.firebase_storage import cargar_mazo
 
-
-def puede_trade(sid: str, uid: str, cid: str):
-    """
-    Devuelve (True, None) si puede intercambiar.
-    Devuelve (False, razon) si no puede.
-    """
-    cid = str(cid)
-
-    inv = [str(c) for c in cargar_inventario_usuario(sid, uid)]
-    total_inv = inv.count(cid)
-
-    if total_inv == 0:
-        return False, "You don't own that card."
-
-    ma = [str(c) for c in cargar_mazo(sid, uid, "A")]
-    mb = [str(c) for c in cargar_mazo(sid, uid, "B")]
-    mc = [str(c) for c in cargar_mazo(sid, uid, "C")]
-
-    total_mazos = ma.count(cid) + mb.count(cid) + mc.count(cid)
-
-    if total_inv <= total_mazos:
-        return False, "All your copies of that card are currently in your decks."
-
-    return True, None
-
-
-
-class TradeView(View):
+class TradeView(VistaAlmacen):
     """
     Primera fase del intercambio.
     user1 ofrece una carta y user2 decide si acepta.
@@ -79,25 +46,23 @@ class TradeView(View):
             self.stop()
             return
 
-        carta2_nombre = respuesta.content.strip().lower()
+        carta2_nombre = respuesta.content.strip()
 
-        # Búsqueda exacta de la carta ofrecida
-        cartas = cargar_cartas()
-        carta2_obj = next(
-            (c for c in cartas if c["nombre"].lower() == carta2_nombre),
-            None
-        )
+        # Búsqueda de la carta ofrecida con el resolvedor compartido
+        carta2_obj, sugerencias = resolver_carta(carta2_nombre)
 
         if not carta2_obj:
-            await interaction.followup.send(f"The card '{carta2_nombre}' was not found. Trade cancelled.")
+            await interaction.followup.send(
+                f"The card '{carta2_nombre}' was not found. Trade cancelled.{texto_sugerencias(sugerencias)}"
+            )
             self.stop()
             return
 
         sid = str(interaction.guild.id)
         uid2 = str(self.user2.id)
 
-        # Validación completa usando puede_trade
-        ok, reason = puede_trade(sid, uid2, carta2_obj["id"])
+        # Comprobación previa: que tenga una copia libre de la carta
+        ok, reason = await transferencias.puede_transferir(sid, uid2, carta2_obj["id"])
         if not ok:
             await interaction.followup.send(reason)
             self.stop()
@@ -130,7 +95,7 @@ class TradeView(View):
 
 
 
-class ConfirmTradeView(View):
+class ConfirmTradeView(VistaAlmacen):
     """
     Segunda fase del intercambio.
     user1 confirma o rechaza el intercambio final.
@@ -155,26 +120,15 @@ class ConfirmTradeView(View):
         id1 = str(self.carta1_obj["id"])
         id2 = str(self.carta2_obj["id"])
 
-        # Validación final usando puede_trade
-        ok1, r1 = puede_trade(sid, uid1, id1)
-        if not ok1:
-            await interaction.response.send_message(r1, ephemeral=True)
-            self.stop()
-            return
-
-        ok2, r2 = puede_trade(sid, uid2, id2)
-        if not ok2:
-            await interaction.response.send_message(r2, ephemeral=True)
+        # Validación final e intercambio en una única transacción
+        try:
+            await transferencias.intercambiar(sid, uid1, id1, uid2, id2)
+        except transferencias.TransferenciaRechazada as e:
+            quien = self.user1 if e.usuario_id == uid1 else self.user2
+            await interaction.response.send_message(f"{quien.display_name}: {e.motivo}", ephemeral=True)
             self.stop()
             return
 
-        # Intercambio real
-        quitar_cartas_inventario(sid, uid1, [id1])
-        quitar_cartas_inventario(sid, uid2, [id2])
-
-        agregar_cartas_inventario(sid, uid1, [id2])
-        agregar_cartas_inventario(sid, uid2, [id1])
-
         await interaction.message.edit(
             content=(
                 f"Trade completed:\n"
@@ -2,12 +2,12 @@ import discord
 import os
 
 # Sustituimos propiedades por inventario
-from core.firebase_storage import (
+from core.firebase_async import (
     agregar_cartas_inventario,
     cargar_inventario_usuario
 )
 
-from core.cartas import cargar_cartas
+from core.cartas import catalogo
 
 
 class ReclamarCarta(discord.ui.View):
@@ -38,14 +38,13 @@ class ReclamarCarta(discord.ui.View):
             servidor_id = str(interaction.guild.id)
 
             # Buscar carta en la base de datos
-            cartas_guardadas = cargar_cartas()
-            carta_info = next((c for c in cartas_guardadas if c["id"] == self.carta_id), None)
+            carta_info = catalogo().por_id.get(str(self.carta_id))
             if carta_info is None:
                 await interaction.response.send_message("No se encontró información de esta carta.", ephemeral=True)
                 return
 
             # Guardar la carta en el inventario del usuario
-            agregar_cartas_inventario(servidor_id, usuario_id, [self.carta_id])
+            await agregar_cartas_inventario(servidor_id, usuario_id, [self.carta_id])
 
             # Reconstruir embed
             nombre_carta = carta_info.get("nombre", f"ID {self.carta_id}")